@@ -0,0 +1,108 @@
+import argparse
+import dataclasses
+import json
+import pathlib
+import platform
+import sys
+
+from static_server import __version__
+
+from .compare import compare
+from .corpus import CorpusSpec
+from .stages import STAGES, run_stage
+
+
+def main(argv: list[str] | None = None) -> int:
+    defaults = CorpusSpec()
+    parser = argparse.ArgumentParser(
+        prog="benchmarks",
+        description="benchmark each build stage on a synthetic corpus",
+    )
+    parser.add_argument("--pages", type=int, default=defaults.pages)
+    parser.add_argument(
+        "--page-size", type=int, default=defaults.page_size, metavar="BYTES"
+    )
+    parser.add_argument(
+        "--inline-density",
+        type=float,
+        default=defaults.inline_density,
+        help="fraction of words wrapped in inline markup",
+    )
+    parser.add_argument(
+        "--depth", type=int, default=defaults.depth, help="directory nesting depth"
+    )
+    parser.add_argument(
+        "--fanout", type=int, default=defaults.fanout, help="directories per level"
+    )
+    parser.add_argument("--code-ratio", type=float, default=defaults.code_ratio)
+    parser.add_argument("--list-ratio", type=float, default=defaults.list_ratio)
+    parser.add_argument("--quote-ratio", type=float, default=defaults.quote_ratio)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument(
+        "--stage",
+        dest="stages",
+        action="append",
+        choices=list(STAGES),
+        help="run only this stage (repeatable)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="report the best of this many runs"
+    )
+    parser.add_argument(
+        "-o", "--output", type=pathlib.Path, help="write the JSON report here"
+    )
+    parser.add_argument(
+        "--baseline",
+        type=pathlib.Path,
+        help="compare against a saved report and fail on regressions",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative change tolerated before a metric counts as regressed",
+    )
+    args = parser.parse_args(argv)
+
+    spec = CorpusSpec(
+        pages=args.pages,
+        page_size=args.page_size,
+        inline_density=args.inline_density,
+        depth=args.depth,
+        fanout=args.fanout,
+        code_ratio=args.code_ratio,
+        list_ratio=args.list_ratio,
+        quote_ratio=args.quote_ratio,
+        seed=args.seed,
+    )
+    report = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "corpus": dataclasses.asdict(spec),
+        "stages": {
+            name: run_stage(name, spec, args.repeat).to_json()
+            for name in args.stages or STAGES
+        },
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(text + "\n")
+    print(text)
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["corpus"] != report["corpus"]:
+        print("warning: baseline was measured on a different corpus", file=sys.stderr)
+
+    regressions = compare(report, baseline, args.threshold)
+    for regression in regressions:
+        print(f"regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
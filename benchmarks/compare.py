@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+HIGHER_IS_BETTER = ("pages_per_second", "mb_per_second")
+LOWER_IS_BETTER = ("peak_memory_bytes",)
+
+
+@dataclass(frozen=True)
+class Regression:
+    stage: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return (self.current - self.baseline) / self.baseline
+
+    def __str__(self) -> str:
+        return (
+            f"{self.stage}: {self.metric} {self.baseline:g} -> {self.current:g}"
+            f" ({self.change:+.1%})"
+        )
+
+
+def compare(
+    report: dict[str, Any], baseline: dict[str, Any], threshold: float = 0.1
+) -> list[Regression]:
+    regressions = []
+    for stage, current in report["stages"].items():
+        previous = baseline["stages"].get(stage)
+        if previous is None:
+            continue
+
+        for metric in HIGHER_IS_BETTER:
+            if current[metric] < previous[metric] * (1 - threshold):
+                regressions.append(
+                    Regression(stage, metric, previous[metric], current[metric])
+                )
+        for metric in LOWER_IS_BETTER:
+            if current[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    Regression(stage, metric, previous[metric], current[metric])
+                )
+    return regressions
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import pathlib
+import random
+from dataclasses import dataclass
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog while elves sing in ancient halls"
+    " of stone and silver under starlight across mountains rivers forests"
+    " hobbits wander far from home seeking treasure wisdom and second breakfast"
+).split()
+LANGUAGES = ("", "python", "go", "rust", "javascript")
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    pages: int = 200
+    page_size: int = 8 * 1024
+    inline_density: float = 0.1
+    depth: int = 2
+    fanout: int = 8
+    code_ratio: float = 0.15
+    list_ratio: float = 0.2
+    quote_ratio: float = 0.1
+    seed: int = 0
+
+
+def page_path(spec: CorpusSpec, index: int) -> pathlib.PurePosixPath:
+    directories = [
+        f"section_{(index // spec.fanout**level) % spec.fanout}"
+        for level in range(spec.depth)
+    ]
+    return pathlib.PurePosixPath(*directories, f"page_{index}.md")
+
+
+def generate_corpus(spec: CorpusSpec) -> dict[pathlib.PurePosixPath, str]:
+    rng = random.Random(spec.seed)
+    return {
+        page_path(spec, index): generate_page(spec, rng, index)
+        for index in range(spec.pages)
+    }
+
+
+def write_corpus(spec: CorpusSpec, root: str | pathlib.Path) -> int:
+    root_path = pathlib.Path(root)
+    total = 0
+    for path, text in generate_corpus(spec).items():
+        destination = root_path / path
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        destination.write_text(text)
+        total += len(text.encode())
+    return total
+
+
+def generate_page(spec: CorpusSpec, rng: random.Random, index: int) -> str:
+    blocks = [f"# Page {index}"]
+    size = len(blocks[0])
+    while size < spec.page_size:
+        if len(blocks) % 6 == 0:
+            block = f"## {sentence(spec, rng, 3, 6, markup=False)}"
+        else:
+            roll = rng.random()
+            if roll < spec.code_ratio:
+                block = code_block(rng)
+            elif roll < spec.code_ratio + spec.list_ratio:
+                block = list_block(spec, rng)
+            elif roll < spec.code_ratio + spec.list_ratio + spec.quote_ratio:
+                block = quote_block(spec, rng)
+            else:
+                block = " ".join(sentence(spec, rng) for _ in range(rng.randint(2, 6)))
+        blocks.append(block)
+        size += len(block) + 2
+    return "\n\n".join(blocks) + "\n"
+
+
+def sentence(
+    spec: CorpusSpec,
+    rng: random.Random,
+    shortest: int = 6,
+    longest: int = 16,
+    markup: bool = True,
+) -> str:
+    words = []
+    for _ in range(rng.randint(shortest, longest)):
+        word = rng.choice(WORDS)
+        if markup and rng.random() < spec.inline_density:
+            word = inline_markup(rng, word)
+        words.append(word)
+    words[0] = words[0][0].upper() + words[0][1:]
+    return " ".join(words) + "."
+
+
+def inline_markup(rng: random.Random, word: str) -> str:
+    kind = rng.randrange(5)
+    if kind == 0:
+        return f"**{word}**"
+    if kind == 1:
+        return f"*{word}*"
+    if kind == 2:
+        return f"`{word}`"
+    if kind == 3:
+        return f"[{word}](/{word})"
+    return f"![{word}](/images/{word}.png)"
+
+
+def list_block(spec: CorpusSpec, rng: random.Random) -> str:
+    count = rng.randint(3, 8)
+    if rng.random() < 0.5:
+        marker = rng.choice(("* ", "- "))
+        return "\n".join(marker + sentence(spec, rng, 3, 10) for _ in range(count))
+    return "\n".join(
+        f"{number}. {sentence(spec, rng, 3, 10)}" for number in range(1, count + 1)
+    )
+
+
+def quote_block(spec: CorpusSpec, rng: random.Random) -> str:
+    return "\n".join(
+        f"> {sentence(spec, rng)}" for _ in range(rng.randint(1, 4))
+    )
+
+
+def code_block(rng: random.Random) -> str:
+    lines = [f"```{rng.choice(LANGUAGES)}"]
+    for number in range(rng.randint(3, 15)):
+        indent = "    " * rng.randint(0, 2)
+        lines.append(f"{indent}{rng.choice(WORDS)}_{number} = {rng.choice(WORDS)}()")
+    lines.append("```")
+    return "\n".join(lines)
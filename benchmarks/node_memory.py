@@ -0,0 +1,43 @@
+import argparse
+import json
+import tracemalloc
+
+from static_server import LeafNode, ParentNode, TextNode, TextNodeType
+
+
+def measure(factory, count: int) -> float:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    nodes = [factory(index) for index in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del nodes
+    return (after - before) / count
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="bytes per node for each node class")
+    parser.add_argument("-n", "--count", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    # the node contents are shared so only the node objects themselves are measured
+    text = "some text"
+    children = [LeafNode(text)]
+    factories = {
+        "TextNode": lambda _: TextNode(text, TextNodeType.BOLD),
+        "LeafNode": lambda _: LeafNode(text, tag="b"),
+        "ParentNode": lambda _: ParentNode("p", children),
+        "checkbox LeafNode": lambda _: TextNode(
+            "", TextNodeType.UNMARKED_CHECKBOX
+        ).to_html_node(),
+    }
+
+    report = {
+        name: round(measure(factory, args.count), 1)
+        for name, factory in factories.items()
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import contextlib
+import gc
+import os
+import pathlib
+import shutil
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from static_server import BlockList, TextNode, TextNodeList
+from static_server.build import generate_folder
+from static_server.textblock import BlockType
+
+from .corpus import CorpusSpec, generate_corpus, write_corpus
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+INLINE_BLOCK_TYPES = (
+    BlockType.PARAGRAPH,
+    BlockType.QUOTE,
+    BlockType.UNORDERED_LIST,
+    BlockType.ORDERED_LIST,
+)
+
+
+@dataclass
+class Measurement:
+    pages: int
+    bytes: int
+    seconds: float
+    peak_bytes: int
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / self.seconds / 1024 / 1024
+
+    def to_json(self) -> dict[str, float]:
+        return {
+            "pages": self.pages,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 6),
+            "pages_per_second": round(self.pages_per_second, 2),
+            "mb_per_second": round(self.mb_per_second, 3),
+            "peak_memory_bytes": self.peak_bytes,
+        }
+
+
+@dataclass
+class Workload:
+    run: Callable[[], object]
+    pages: int
+    bytes: int
+
+
+def measure(workload: Workload, repeat: int = 3) -> Measurement:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        workload.run()
+        best = min(best, time.perf_counter() - started)
+
+    # tracing slows the stage down, so peak memory gets a run of its own
+    gc.collect()
+    tracemalloc.start()
+    workload.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return Measurement(workload.pages, workload.bytes, best, peak)
+
+
+@contextlib.contextmanager
+def blocks_stage(spec: CorpusSpec) -> Iterator[Workload]:
+    texts = list(generate_corpus(spec).values())
+    yield Workload(
+        lambda: [BlockList.from_text(text) for text in texts],
+        len(texts),
+        _size(texts),
+    )
+
+
+@contextlib.contextmanager
+def inline_stage(spec: CorpusSpec) -> Iterator[Workload]:
+    texts = list(generate_corpus(spec).values())
+    inputs = [
+        block.content
+        for text in texts
+        for block in BlockList.from_text(text).blocks
+        if block.block_type in INLINE_BLOCK_TYPES
+    ]
+    yield Workload(
+        lambda: [TextNodeList(TextNode(text)).parse_all() for text in inputs],
+        len(texts),
+        _size(inputs),
+    )
+
+
+@contextlib.contextmanager
+def html_stage(spec: CorpusSpec) -> Iterator[Workload]:
+    texts = list(generate_corpus(spec).values())
+    nodes = [BlockList.from_text(text).to_html_node() for text in texts]
+    yield Workload(lambda: [node.to_html() for node in nodes], len(texts), _size(texts))
+
+
+@contextlib.contextmanager
+def generate_folder_stage(spec: CorpusSpec) -> Iterator[Workload]:
+    with tempfile.TemporaryDirectory() as directory:
+        root = pathlib.Path(directory)
+        size = write_corpus(spec, root / "content")
+        (root / "template.html").write_text(TEMPLATE)
+
+        def build() -> None:
+            shutil.rmtree(root / "public", ignore_errors=True)
+            with open(os.devnull, "w") as devnull:
+                with contextlib.redirect_stdout(devnull):
+                    generate_folder(
+                        root / "content", root / "template.html", root / "public"
+                    )
+
+        yield Workload(build, spec.pages, size)
+
+
+StageFactory = Callable[[CorpusSpec], contextlib.AbstractContextManager[Workload]]
+STAGES: dict[str, StageFactory] = {
+    "blocks": blocks_stage,
+    "inline": inline_stage,
+    "html": html_stage,
+    "generate_folder": generate_folder_stage,
+}
+
+
+def run_stage(name: str, spec: CorpusSpec, repeat: int = 3) -> Measurement:
+    BlockList.block_cache = None
+    with STAGES[name](spec) as workload:
+        return measure(workload, repeat)
+
+
+def _size(texts: list[str]) -> int:
+    return sum(len(text.encode()) for text in texts)
@@ -1,2 +1,2 @@
-python -m static_server
-cd public && python -m http.server 8888
+python -m static_server --generations 2
+python -m static_server serve 8888
@@ -1,6 +1,12 @@
-from .textnode import TextNode, TextNodeType, TextNodeList
-from .htmlnode import HTMLNode, LeafNode, ParentNode
-from .textblock import Block, BlockList
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .htmlnode import HTMLNode, LeafNode, ParentNode
+    from .textblock import Block, BlockList
+    from .textnode import TextNode, TextNodeList, TextNodeType
 
 __version__ = "0.0.1"
 
@@ -14,3 +20,28 @@ __all__ = [
     "LeafNode",
     "ParentNode",
 ]
+
+# the renderer is imported on first use, so `python -m static_server.client`
+# starts without compiling the markdown and highlighter regexes
+_EXPORTS = {
+    "Block": "textblock",
+    "BlockList": "textblock",
+    "HTMLNode": "htmlnode",
+    "LeafNode": "htmlnode",
+    "ParentNode": "htmlnode",
+    "TextNode": "textnode",
+    "TextNodeList": "textnode",
+    "TextNodeType": "textnode",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_EXPORTS])
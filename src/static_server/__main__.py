@@ -1,82 +1,401 @@
+import argparse
 import pathlib
-import shutil
+import sys
+import time
 
+from . import __version__
+from .build import PageRenderError
+from .cache import BlockCache, RenderCache
+from .client import DEFAULT_SOCKET
+from .daemon import run_daemon
+from .generations import rollback
+from .ondemand import serve_rendered
+from .serve import serve as serve_directory
+from .profiling import BuildProfile
+from .site import Site
 from .textblock import BlockList
+from .watch import create_watcher, watch
 
 
-def main():
-    recursive_copy("static", "public")
-    generate_folder("content", "templates/template.html", "public")
+COMMANDS = ("build", "watch", "daemon", "serve", "ondemand", "rollback")
+DAEMON_BLOCK_CACHE_MB = 64
 
 
-def generate_folder(
-    source: str | pathlib.Path,
-    template: str | pathlib.Path,
-    destination: str | pathlib.Path,
-) -> None:
-    source_path = pathlib.Path(source)
-    destination_path = pathlib.Path(destination)
+def main(argv: list[str] | None = None):
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    options.add_argument(
+        "--link",
+        action="store_true",
+        help="hardlink static files into public/ when on the same filesystem",
+    )
+    options.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes rendering pages (0 = one per CPU)",
+    )
+    options.add_argument(
+        "--block-cache",
+        type=float,
+        metavar="MB",
+        help="memoise rendered blocks across pages in an LRU cache of this size"
+        f" (daemon default: {DAEMON_BLOCK_CACHE_MB})",
+    )
+    options.add_argument(
+        "--cache-dir",
+        type=pathlib.Path,
+        help="persistent render cache shared between builds (e.g. restored in CI)",
+    )
+    options.add_argument(
+        "--cache-size",
+        type=float,
+        default=256,
+        metavar="MB",
+        help="evict least recently used render cache entries above this size",
+    )
+    options.add_argument(
+        "--compress",
+        action="store_true",
+        help="write gzip (.gz) and zlib (.zz) siblings for compressible outputs",
+    )
+    options.add_argument(
+        "--compress-min-size",
+        type=int,
+        default=1024,
+        metavar="BYTES",
+        help="leave files smaller than this uncompressed",
+    )
+    options.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="also emit content-hashed copies of static files (index.3f9a1c2b.css)"
+        " and rewrite references in pages to them",
+    )
+    options.add_argument(
+        "--images",
+        action="store_true",
+        help="add intrinsic width/height and lazy loading to <img> tags",
+    )
+    options.add_argument(
+        "--image-widths",
+        type=lambda value: tuple(int(width) for width in value.split(",")),
+        default=(),
+        metavar="W1,W2,...",
+        help="with --images, also write downscaled variants and a srcset"
+        " (needs Pillow)",
+    )
+    options.add_argument(
+        "--minify",
+        action="store_true",
+        help="minify generated pages and copied CSS/JS (<pre> and <code> are kept)",
+    )
+    options.add_argument(
+        "--highlight",
+        action="store_true",
+        help="highlight code blocks at build time and drop the prism.js script",
+    )
+    options.add_argument(
+        "--generations",
+        type=int,
+        metavar="N",
+        help="build into a fresh directory, atomically point the public/ symlink"
+        " at it and keep N previous builds for rollback; every build hardlinks"
+        " the whole previous output, so watch and daemon updates are written to"
+        " the live generation in place instead",
+    )
 
-    markdown_files = source_path.glob("*.md")
-    dirs = [path for path in source_path.glob("*") if path.is_dir()]
+    parser = argparse.ArgumentParser(prog="static_server")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser(
+        "build", parents=[options], help="build the site into public/ (default)"
+    )
+    build.add_argument(
+        "--clean", action="store_true", help="wipe public/ and rebuild everything"
+    )
+    build.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print the build plan (what would be created, copied and rendered)"
+        " without writing anything",
+    )
+    build.add_argument(
+        "--profile",
+        nargs="?",
+        const=pathlib.Path("build-profile.json"),
+        type=pathlib.Path,
+        metavar="PATH",
+        help="time every build stage per page and write a JSON report"
+        " (default: build-profile.json)",
+    )
+    build.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="number of slowest pages listed in the profile summary",
+    )
+    build.add_argument(
+        "--profile-page",
+        type=pathlib.Path,
+        metavar="SOURCE",
+        help="also dump cProfile stats for rendering this one page",
+    )
+    watch = commands.add_parser(
+        "watch",
+        parents=[options],
+        help="build, then rebuild affected files whenever sources change",
+    )
+    watch.add_argument(
+        "--poll",
+        action="store_true",
+        help="poll file stats instead of using inotify",
+    )
+    watch.add_argument(
+        "--debounce",
+        type=float,
+        default=50,
+        metavar="MS",
+        help="wait this long for a burst of events to settle before rebuilding",
+    )
 
-    for file in markdown_files:
-        relative_file = file.relative_to(source)
-        print(f"generating file {file.absolute()}")
-        generate_page(
-            file,
-            template,
-            str(destination_path / relative_file).rsplit(".", 1)[0] + ".html",
-        )
+    daemon = commands.add_parser(
+        "daemon",
+        parents=[options],
+        help="build, then keep caches warm and take build/render requests"
+        " from `python -m static_server.client` over a Unix socket; pages are"
+        " rendered in the daemon process against its warm caches, so --jobs is"
+        " ignored",
+    )
+    daemon.add_argument(
+        "-s",
+        "--socket",
+        type=pathlib.Path,
+        default=DEFAULT_SOCKET,
+        help=f"socket to listen on (default: {DEFAULT_SOCKET})",
+    )
+
+    serve = commands.add_parser("serve", help="serve public/ over HTTP")
+    serve.add_argument(
+        "port", type=int, nargs="?", default=8888, help="port to listen on"
+    )
+    serve.add_argument(
+        "-b",
+        "--bind",
+        default="",
+        metavar="ADDRESS",
+        help="address to bind to (default: all interfaces)",
+    )
+    serve.add_argument(
+        "-d",
+        "--directory",
+        type=pathlib.Path,
+        default=pathlib.Path("public"),
+        help="directory to serve",
+    )
+
+    ondemand = commands.add_parser(
+        "ondemand",
+        help="serve the site without building it: pages are rendered from"
+        " content/ on first request and static files come straight from static/",
+    )
+    ondemand.add_argument(
+        "port", type=int, nargs="?", default=8888, help="port to listen on"
+    )
+    ondemand.add_argument(
+        "-b",
+        "--bind",
+        default="",
+        metavar="ADDRESS",
+        help="address to bind to (default: all interfaces)",
+    )
+    ondemand.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=0,
+        help="number of worker processes rendering pages (default: one per CPU)",
+    )
+    ondemand.add_argument(
+        "--page-cache",
+        type=float,
+        default=64,
+        metavar="MB",
+        help="keep this much rendered HTML in memory, least recently used first out",
+    )
+    ondemand.add_argument(
+        "--block-cache",
+        type=float,
+        metavar="MB",
+        help="memoise rendered blocks in each worker in an LRU cache of this size",
+    )
+    ondemand.add_argument(
+        "--highlight",
+        action="store_true",
+        help="highlight code blocks on the server and drop the prism.js script",
+    )
+    ondemand.add_argument(
+        "--content",
+        type=pathlib.Path,
+        default=pathlib.Path("content"),
+        help="directory of markdown pages",
+    )
+    ondemand.add_argument(
+        "--static",
+        type=pathlib.Path,
+        default=pathlib.Path("static"),
+        help="directory of files served as they are",
+    )
+    ondemand.add_argument(
+        "--template",
+        type=pathlib.Path,
+        default=pathlib.Path("templates/template.html"),
+        help="page template",
+    )
 
-    for dir in dirs:
-        relative_dir = dir.relative_to(source)
-        (destination_path / relative_dir).mkdir(exist_ok=True)
-        generate_folder(dir, template, destination_path / relative_dir)
+    rollback_parser = commands.add_parser(
+        "rollback", help="point public/ back at the previous build generation"
+    )
+    rollback_parser.add_argument(
+        "-d",
+        "--directory",
+        type=pathlib.Path,
+        default=pathlib.Path("public"),
+        help="output symlink to switch",
+    )
 
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv or argv[0] not in (*COMMANDS, "-h", "--help"):
+        argv = ["build", *argv]
+    args = parser.parse_args(argv)
 
-def recursive_copy(source: str | pathlib.Path, destination: str | pathlib.Path) -> None:
-    source_path = pathlib.Path(source)
-    destination_path = pathlib.Path(destination)
+    if args.command == "serve":
+        try:
+            serve_directory(args.directory, args.bind, args.port)
+        except KeyboardInterrupt:
+            pass
+        return
 
-    if destination_path.exists():
-        print(f"removing path: {destination_path.absolute()}")
-        shutil.rmtree(destination_path)
+    if args.command == "ondemand":
+        try:
+            serve_rendered(
+                args.content,
+                args.static,
+                args.template,
+                host=args.bind,
+                port=args.port,
+                jobs=args.jobs,
+                page_cache_bytes=int(args.page_cache * 1024 * 1024),
+                highlight=args.highlight,
+                block_cache_bytes=(
+                    None
+                    if args.block_cache is None
+                    else int(args.block_cache * 1024 * 1024)
+                ),
+            )
+        except KeyboardInterrupt:
+            pass
+        return
 
-    print(f"creating directory: {destination_path.absolute()}")
-    destination_path.mkdir()
+    if args.command == "rollback":
+        try:
+            generation = rollback(args.directory)
+        except ValueError as error:
+            raise SystemExit(str(error))
+        print(f"switched {args.directory} to {generation}")
+        return
 
-    files = [file for file in source_path.glob("*") if file.is_file()]
-    dirs = [path for path in source_path.glob("*") if path.is_dir()]
+    if args.command == "daemon" and args.block_cache is None:
+        # keeping rendered blocks between requests is what the daemon is for
+        args.block_cache = DAEMON_BLOCK_CACHE_MB
+    if args.command == "daemon" and args.jobs != 1:
+        # a worker pool is created per build and its workers start with empty
+        # block caches, so only the daemon process itself renders warm
+        print("the daemon renders pages in its own process, ignoring --jobs")
+        args.jobs = 1
+    if args.block_cache:
+        BlockList.block_cache = BlockCache(int(args.block_cache * 1024 * 1024))
 
-    for file in files:
-        relative_file = file.relative_to(source_path)
-        print(
-            f"copying file {file.absolute()} to {(destination / relative_file).absolute()}"
+    render_cache = None
+    if args.cache_dir is not None:
+        render_cache = RenderCache(
+            args.cache_dir, int(args.cache_size * 1024 * 1024), __version__
         )
-        shutil.copy(file, destination / relative_file)
 
-    for dir in dirs:
-        relative_dir = dir.relative_to(source)
-        recursive_copy(dir, destination / relative_dir)
+    profile_path = getattr(args, "profile", None)
+    site = Site(
+        jobs=args.jobs,
+        render_cache=render_cache,
+        checksum=args.checksum,
+        link=args.link,
+        compress=args.compress,
+        compress_min_size=args.compress_min_size,
+        profile=None if profile_path is None else BuildProfile(),
+        fingerprint=args.fingerprint,
+        images=args.images,
+        image_widths=args.image_widths,
+        minify=args.minify,
+        highlight=args.highlight,
+        generations=args.generations,
+    )
+    if getattr(args, "dry_run", False):
+        site.dry_run()
+        return
 
+    if args.command == "daemon":
+        try:
+            site.build()
+        except PageRenderError as error:
+            print(error)
+        try:
+            run_daemon(site, args.socket)
+        except KeyboardInterrupt:
+            pass
+        return
 
-def generate_page(
-    from_path: str | pathlib.Path, template_path: str | pathlib.Path, dest_path: str
-) -> None:
-    with open(from_path) as f:
-        markdown = f.read()
+    try:
+        site.build(clean=getattr(args, "clean", False))
+        if site.profile is not None:
+            site.profile.save(profile_path)
+            print(site.profile.summary(args.profile_top))
+            print(f"profile written to {profile_path}")
+        if getattr(args, "profile_page", None) is not None:
+            dump = (profile_path or pathlib.Path("build-profile.json")).with_suffix(
+                ".prof"
+            )
+            try:
+                site.profile_page(args.profile_page, dump)
+            except ValueError as error:
+                raise SystemExit(str(error))
+        if args.command == "watch":
+            run_watch(site, args.poll, args.debounce / 1000)
+    except PageRenderError as error:
+        raise SystemExit(str(error))
+    except KeyboardInterrupt:
+        pass
 
-    with open(template_path) as f:
-        template = f.read()
 
-    title = BlockList.get_title(markdown)
-    content = BlockList.from_text(markdown).to_html_node().to_html()
+def run_watch(site: Site, polling: bool, delay: float) -> None:
+    watcher = create_watcher([site.content, site.static, site.template.parent], polling)
+    print(f"watching {site.content}, {site.static} and {site.template.parent}")
 
-    with open(dest_path, "w") as f:
-        f.write(
-            template.replace("{{ Title }}", title).replace("{{ Content }}", content)
-        )
+    def rebuild(changed: set[pathlib.Path]) -> None:
+        started = time.perf_counter()
+        try:
+            site.update(changed)
+        except PageRenderError as error:
+            print(error)
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"rebuilt {len(changed)} changed paths in {elapsed:.1f} ms")
+
+    watch(watcher, rebuild, delay)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import os
+import pathlib
+import shutil
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from .console import log
+from .manifest import AssetEntry, BuildManifest, file_hash
+from .minify import is_minifiable
+from .output import temporary_path
+from .tree import scan_tree
+
+
+@dataclass
+class SyncStats:
+    copied: list[pathlib.Path] = field(default_factory=list)
+    unchanged: list[pathlib.Path] = field(default_factory=list)
+    removed: list[pathlib.Path] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class CopyJob:
+    source: pathlib.Path
+    destination: pathlib.Path
+
+
+def sync_tree(
+    source: str | pathlib.Path,
+    destination: str | pathlib.Path,
+    manifest: BuildManifest,
+    checksum: bool = False,
+    link: bool = False,
+    minify: bool = False,
+) -> SyncStats:
+    source_path = pathlib.Path(source)
+    destination_path = pathlib.Path(destination)
+    tree = scan_tree(source_path)
+
+    destination_path.mkdir(parents=True, exist_ok=True)
+    for directory in tree.directories:
+        (destination_path / directory.relative_to(source_path)).mkdir(exist_ok=True)
+
+    copies = [
+        CopyJob(file, destination_path / file.relative_to(source_path))
+        for file in tree.files
+    ]
+    return sync_files(source_path, copies, manifest, checksum, link, minify)
+
+
+def sync_files(
+    source: str | pathlib.Path,
+    copies: Iterable[CopyJob],
+    manifest: BuildManifest,
+    checksum: bool = False,
+    link: bool = False,
+    minify: bool = False,
+) -> SyncStats:
+    source_path = pathlib.Path(source)
+    stats = SyncStats()
+    seen = set()
+
+    for copy in copies:
+        seen.add(copy.destination.relative_to(manifest.root).as_posix())
+        if sync_file(
+            copy.source, copy.destination, manifest, checksum, link, minify
+        ):
+            stats.copied.append(copy.destination)
+        else:
+            stats.unchanged.append(copy.destination)
+
+    for key in sorted(set(manifest.assets) - seen):
+        orphan = manifest.root / key
+        if manifest.assets[key].fingerprinted:
+            continue
+        if pathlib.Path(manifest.assets[key].source).is_relative_to(source_path):
+            if orphan.exists():
+                log(f"removing orphaned file {orphan.absolute()}")
+                orphan.unlink()
+                stats.removed.append(orphan)
+            del manifest.assets[key]
+
+    return stats
+
+
+def sync_file(
+    source: pathlib.Path,
+    destination: pathlib.Path,
+    manifest: BuildManifest,
+    checksum: bool = False,
+    link: bool = False,
+    minify: bool = False,
+) -> bool:
+    key = destination.relative_to(manifest.root).as_posix()
+    entry = manifest.assets.get(key)
+    if is_current(source, destination, entry, checksum, minify):
+        return False
+
+    log(f"copying file {source.absolute()} to {destination.absolute()}")
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    copy_file(source, destination, link)
+    stat = source.stat()
+    manifest.assets[key] = AssetEntry(
+        source=str(source),
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        source_hash=file_hash(source) if checksum else None,
+        minified=minify and is_minifiable(destination),
+    )
+    return True
+
+
+def is_current(
+    source: pathlib.Path,
+    destination: pathlib.Path,
+    entry: AssetEntry | None,
+    checksum: bool = False,
+    minify: bool = False,
+) -> bool:
+    if not destination.exists():
+        return False
+    # the copy in the output is minified in place, so toggling --minify has to
+    # replace it even though the source did not change
+    minified = entry.minified if entry is not None else False
+    if minified != (minify and is_minifiable(destination)):
+        return False
+
+    if checksum:
+        if entry is not None and entry.source_hash is not None:
+            return entry.source_hash == file_hash(source)
+        return file_hash(source) == file_hash(destination)
+
+    source_stat = source.stat()
+    if entry is not None:
+        return (entry.size, entry.mtime_ns) == (
+            source_stat.st_size,
+            source_stat.st_mtime_ns,
+        )
+
+    destination_stat = destination.stat()
+    return (destination_stat.st_size, destination_stat.st_mtime_ns) == (
+        source_stat.st_size,
+        source_stat.st_mtime_ns,
+    )
+
+
+def copy_file(
+    source: str | pathlib.Path, destination: str | pathlib.Path, link: bool = False
+) -> None:
+    source_path = pathlib.Path(source)
+    destination_path = pathlib.Path(destination)
+
+    # copy under a temporary name and rename over the destination: an existing
+    # file (which may be a hardlink to the source) is never written through and
+    # readers never see a partial copy
+    temporary = temporary_path(destination_path)
+    try:
+        _copy_to(source_path, temporary, link)
+        os.replace(temporary, destination_path)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+def _copy_to(source: pathlib.Path, temporary: pathlib.Path, link: bool) -> None:
+    if link and source.stat().st_dev == temporary.parent.stat().st_dev:
+        temporary.unlink()
+        try:
+            os.link(source, temporary)
+            return
+        except OSError:
+            pass
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            _copy_file_range(source, temporary)
+            shutil.copystat(source, temporary)
+            return
+        except OSError:
+            pass
+
+    shutil.copy2(source, temporary)
+
+
+def _copy_file_range(source: pathlib.Path, destination: pathlib.Path) -> None:
+    with open(source, "rb") as fsrc, open(destination, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
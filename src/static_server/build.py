@@ -0,0 +1,454 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import itertools
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import IO, Iterable, Iterator, Mapping
+
+from .cache import BlockCache, CacheStats, RenderCache
+from .console import log
+from .fingerprint import AssetFingerprints, RewritingStream
+from .highlight import CLIENT_HIGHLIGHTER, Highlighter, unsupported_languages
+from .images import ImageIndex
+from .manifest import BuildManifest
+from .minify import Minifier, MinifyStats, is_minifiable
+from .output import WriteStats, atomic_write
+from .profiling import BuildProfile, PageProfile, StageTimer
+from .template import Template
+from .textblock import Block, BlockList
+from .textnode import TextNode
+from .tree import scan_tree
+
+
+@dataclass(frozen=True)
+class PageJob:
+    source: pathlib.Path
+    destination: pathlib.Path
+
+
+class PageRenderError(Exception):
+    def __init__(self, source: str, reason: str) -> None:
+        super().__init__(source, reason)
+        self.source = source
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f"failed to render {self.source}: {self.reason}"
+
+
+@dataclass
+class PageRenderer:
+    template: Template
+    render_cache: RenderCache | None = None
+    profile: bool = False
+    fingerprints: AssetFingerprints | None = None
+    minifier: Minifier | None = None
+    write_stats: WriteStats = field(default_factory=WriteStats)
+    # the template with the client highlighter still in it, for pages with
+    # code the server cannot highlight
+    client_template: Template | None = None
+    unsupported: set[str] = field(default_factory=set)
+
+    def render(self, page: PageJob) -> PageProfile | None:
+        index = TextNode.image_index
+        TextNode.page_base = "" if index is None else index.base_for(page.destination)
+        if self.profile:
+            return self.render_profiled(page)
+
+        if self.render_cache is None and self.minifier is None:
+            with open(page.source) as source, self.open_output(page) as f:
+                template = self.template
+                if self.client_template is not None:
+                    template = self.template_for(source)
+                    source.seek(0)
+                stream_page(source, template, f)
+            return None
+
+        with open(page.source, "rb") as source:
+            data = source.read()
+        template = self.template
+        if self.client_template is not None:
+            template = self.template_for(data.decode().splitlines())
+
+        entry = None
+        if self.render_cache is not None:
+            key = self.cache_key(data)
+            entry = self.render_cache.get(key)
+        if entry is None:
+            markdown = io.StringIO(data.decode(), newline=None).read()
+            title = BlockList.get_title(markdown)
+            content = BlockList.from_text(markdown).to_html_node().to_html()
+            if self.render_cache is not None:
+                self.render_cache.put(key, title, content)
+        else:
+            title, content = entry
+
+        if self.minifier is None:
+            with self.open_output(page) as f:
+                template.render_to(f, {"Title": title, "Content": content})
+            return None
+
+        html = template.render({"Title": title, "Content": content})
+        html = self.minifier.minify(".html", html)
+        with self.open_output(page) as f:
+            f.write(html)
+        return None
+
+    def render_profiled(self, page: PageJob) -> PageProfile:
+        timer = StageTimer()
+        with open(page.source, "rb") as source:
+            data = source.read()
+        template = self.template
+        if self.client_template is not None:
+            template = self.template_for(data.decode().splitlines())
+        timer.lap("read")
+
+        entry = None
+        if self.render_cache is not None:
+            key = self.cache_key(data)
+            entry = self.render_cache.get(key)
+            timer.lap("cache")
+
+        if entry is None:
+            markdown = io.StringIO(data.decode(), newline=None).read()
+            title = BlockList.get_title(markdown)
+            blocks = BlockList.from_text(markdown)
+            timer.lap("block split")
+            node = blocks.to_html_node(timer)
+            timer.lap("inline parse")
+            content = node.to_html()
+            timer.lap("html serialize")
+            if self.render_cache is not None:
+                self.render_cache.put(key, title, content)
+                timer.lap("cache")
+        else:
+            title, content = entry
+
+        html = template.render({"Title": title, "Content": content})
+        timer.lap("template fill")
+        if self.minifier is not None:
+            html = self.minifier.minify(".html", html)
+            timer.lap("minify")
+        with self.open_output(page) as f:
+            f.write(html)
+        timer.lap("write")
+        return PageProfile(str(page.source), timer.stages)
+
+    def template_for(self, lines: Iterable[str]) -> Template:
+        if self.client_template is None:
+            return self.template
+        languages = unsupported_languages(lines)
+        self.unsupported |= languages
+        return self.client_template if languages else self.template
+
+    def cache_key(self, data: bytes) -> str:
+        if self.render_cache is None:  # pragma: no cover
+            raise RuntimeError("no render cache")
+        if TextNode.image_index is not None and TextNode.page_base:
+            # relative image sources resolve differently in other directories
+            data = TextNode.page_base.encode() + b"\0" + data
+        return self.render_cache.key(data)
+
+    @contextlib.contextmanager
+    def open_output(self, page: PageJob) -> Iterator[IO[str]]:
+        with atomic_write(page.destination, stats=self.write_stats) as f:
+            if self.fingerprints is None:
+                yield f
+            else:
+                base = self.fingerprints.base_for(page.destination)
+                yield RewritingStream(f, self.fingerprints, base)
+
+    def cache_stats(self) -> tuple[CacheStats, CacheStats]:
+        block_cache = BlockList.block_cache
+        return (
+            CacheStats() if block_cache is None else replace(block_cache.stats),
+            CacheStats()
+            if self.render_cache is None
+            else replace(self.render_cache.stats),
+        )
+
+    def minify_stats(self) -> MinifyStats:
+        if self.minifier is None:
+            return MinifyStats()
+        return replace(self.minifier.stats)
+
+
+def generate_folder(
+    source: str | pathlib.Path,
+    template: str | pathlib.Path,
+    destination: str | pathlib.Path,
+    manifest: BuildManifest | None = None,
+    jobs: int = 1,
+    render_cache: RenderCache | None = None,
+    profile: BuildProfile | None = None,
+) -> list[PageJob]:
+    return render_pages(
+        collect_pages(source, destination),
+        template,
+        manifest,
+        jobs,
+        render_cache,
+        profile,
+    )
+
+
+def collect_pages(
+    source: str | pathlib.Path, destination: str | pathlib.Path
+) -> list[PageJob]:
+    source_path = pathlib.Path(source)
+    destination_path = pathlib.Path(destination)
+
+    return [
+        PageJob(
+            file,
+            destination_path / file.relative_to(source_path).with_suffix(".html"),
+        )
+        for file in scan_tree(source_path).files
+        if file.suffix == ".md"
+    ]
+
+
+def render_pages(
+    pages: list[PageJob],
+    template: str | pathlib.Path,
+    manifest: BuildManifest | None = None,
+    jobs: int = 1,
+    render_cache: RenderCache | None = None,
+    profile: BuildProfile | None = None,
+    fingerprints: AssetFingerprints | None = None,
+    minifier: Minifier | None = None,
+    assets: Iterable[pathlib.Path] = (),
+    write_stats: WriteStats | None = None,
+) -> list[PageJob]:
+    page_template = Template.from_file(template)
+    client_template = None
+    if Block.highlighter is not None:
+        client_template = page_template
+        page_template = page_template.without_script(CLIENT_HIGHLIGHTER)
+        if page_template == client_template:
+            client_template = None
+    if write_stats is None:
+        write_stats = WriteStats()
+    renderer = PageRenderer(
+        page_template,
+        render_cache,
+        profile is not None,
+        fingerprints,
+        minifier,
+        write_stats,
+        client_template,
+    )
+    minified_assets = []
+    if minifier is not None:
+        minified_assets = sorted(path for path in assets if is_minifiable(path))
+
+    pending = []
+    directories = set()
+    for page in pages:
+        if manifest is not None and not manifest.needs_build(
+            page.source, page.destination
+        ):
+            log(f"skipping unchanged file {page.source.absolute()}")
+            continue
+        if page.destination.parent not in directories:
+            page.destination.parent.mkdir(parents=True, exist_ok=True)
+            directories.add(page.destination.parent)
+        pending.append(page)
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    if jobs == 1 or len(pending) + len(minified_assets) <= 1:
+        for path in minified_assets:
+            minifier.minify_file(path)
+        for page in pending:
+            log(f"generating file {page.source.absolute()}")
+            try:
+                page_profile = renderer.render(page)
+            except Exception as error:
+                raise PageRenderError(str(page.source), repr(error)) from error
+            if page_profile is not None and profile is not None:
+                profile.pages.append(page_profile)
+            if manifest is not None:
+                manifest.record(page.source, page.destination)
+        log_unsupported(renderer.unsupported)
+        return pending
+
+    block_cache = BlockList.block_cache
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(
+            renderer,
+            None if block_cache is None else block_cache.max_bytes,
+            TextNode.image_index,
+            Block.highlighter,
+        ),
+    ) as executor:
+        asset_futures = [
+            executor.submit(_minify_job, path) for path in minified_assets
+        ]
+        futures = [executor.submit(_render_job, page) for page in pending]
+        for future in asset_futures:
+            try:
+                minify_stats = future.result()
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
+            minifier.stats += minify_stats
+        for page, future in zip(pending, futures):
+            try:
+                (
+                    block_stats,
+                    render_stats,
+                    minify_stats,
+                    written,
+                    page_profile,
+                    unsupported,
+                ) = future.result()
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
+            log(f"generated file {page.source.absolute()}")
+            if minifier is not None:
+                minifier.stats += minify_stats
+            write_stats.written += written.written
+            write_stats.unchanged += written.unchanged
+            renderer.unsupported |= unsupported
+            if page_profile is not None and profile is not None:
+                profile.pages.append(page_profile)
+            if block_cache is not None:
+                block_cache.stats += block_stats
+            if render_cache is not None:
+                render_cache.stats += render_stats
+            if manifest is not None:
+                manifest.record(page.source, page.destination)
+
+    log_unsupported(renderer.unsupported)
+    return pending
+
+
+def log_unsupported(languages: set[str]) -> None:
+    for language in sorted(languages):
+        log(
+            f"no server-side highlighting for {language} code,"
+            f" kept {CLIENT_HIGHLIGHTER} on the pages that use it"
+        )
+
+
+def generate_page(
+    from_path: str | pathlib.Path,
+    template_path: str | pathlib.Path,
+    dest_path: str | pathlib.Path,
+) -> None:
+    PageRenderer(Template.from_file(template_path)).render(
+        PageJob(pathlib.Path(from_path), pathlib.Path(dest_path))
+    )
+
+
+def stream_page(
+    source: IO[str],
+    template: Template,
+    stream: IO[str],
+    metadata: Mapping[str, str] | None = None,
+) -> None:
+    first_line = source.readline()
+    template.render_to(
+        stream,
+        {
+            **(metadata or {}),
+            "Title": BlockList.get_title(first_line),
+            "Content": BlockList.stream_html_node(
+                itertools.chain([first_line], source)
+            ),
+        },
+    )
+
+
+def render_page(
+    markdown: str,
+    template: str | Template,
+    metadata: Mapping[str, str] | None = None,
+) -> str:
+    if isinstance(template, str):
+        template = Template.parse(template)
+
+    stream = io.StringIO()
+    write_page(markdown, template, stream, metadata)
+    return stream.getvalue()
+
+
+def write_page(
+    markdown: str,
+    template: Template,
+    stream: IO[str],
+    metadata: Mapping[str, str] | None = None,
+) -> None:
+    template.render_to(
+        stream,
+        {
+            **(metadata or {}),
+            "Title": BlockList.get_title(markdown),
+            "Content": BlockList.from_text(markdown).to_html_node(),
+        },
+    )
+
+
+_worker_renderer: PageRenderer | None = None
+
+
+def _init_worker(
+    renderer: PageRenderer,
+    block_cache_bytes: int | None,
+    image_index: ImageIndex | None,
+    highlighter: Highlighter | None,
+) -> None:
+    global _worker_renderer
+    _worker_renderer = renderer
+    TextNode.image_index = image_index
+    Block.highlighter = highlighter
+    BlockList.block_cache = (
+        None if block_cache_bytes is None else BlockCache(block_cache_bytes)
+    )
+
+
+def _render_job(
+    page: PageJob,
+) -> tuple[
+    CacheStats, CacheStats, MinifyStats, WriteStats, PageProfile | None, set[str]
+]:
+    if _worker_renderer is None:  # pragma: no cover
+        raise RuntimeError("worker was not initialised with a renderer")
+
+    block_before, render_before = _worker_renderer.cache_stats()
+    minify_before = _worker_renderer.minify_stats()
+    write_before = replace(_worker_renderer.write_stats)
+    _worker_renderer.unsupported = set()
+    try:
+        page_profile = _worker_renderer.render(page)
+    except Exception as error:
+        raise PageRenderError(str(page.source), repr(error)) from None
+
+    block_after, render_after = _worker_renderer.cache_stats()
+    return (
+        block_after - block_before,
+        render_after - render_before,
+        _worker_renderer.minify_stats() - minify_before,
+        _worker_renderer.write_stats - write_before,
+        page_profile,
+        _worker_renderer.unsupported,
+    )
+
+
+def _minify_job(path: pathlib.Path) -> MinifyStats:
+    minifier = None if _worker_renderer is None else _worker_renderer.minifier
+    if minifier is None:  # pragma: no cover
+        raise RuntimeError("worker was not initialised with a minifier")
+
+    before = replace(minifier.stats)
+    minifier.minify_file(path)
+    return minifier.stats - before
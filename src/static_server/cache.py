@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, TypeVar
+
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def __add__(self, other: CacheStats) -> CacheStats:
+        return CacheStats(
+            self.hits + other.hits,
+            self.misses + other.misses,
+            self.evictions + other.evictions,
+        )
+
+    def __sub__(self, other: CacheStats) -> CacheStats:
+        return CacheStats(
+            self.hits - other.hits,
+            self.misses - other.misses,
+            self.evictions - other.evictions,
+        )
+
+    def __str__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {self.evictions} evictions"
+
+
+class BlockCache(Generic[V]):
+    # values are sized with len() unless a sizeof is given
+    def __init__(
+        self, max_bytes: int, sizeof: Callable[[Any], int] = len
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.size = 0
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, V] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def get(self, key: str) -> V | None:
+        value = self._entries.get(key)
+        if value is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: V) -> None:
+        entry_size = len(key) + self.sizeof(value)
+        if entry_size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self.size -= len(key) + self.sizeof(self._entries.pop(key))
+
+        self._entries[key] = value
+        self.size += entry_size
+        while self.size > self.max_bytes:
+            old_key, old_value = self._entries.popitem(last=False)
+            self.size -= len(old_key) + self.sizeof(old_value)
+            self.stats.evictions += 1
+
+
+class RenderCache:
+    def __init__(
+        self, directory: str | pathlib.Path, max_bytes: int, version: str
+    ) -> None:
+        self.directory = pathlib.Path(directory)
+        self.max_bytes = max_bytes
+        self.version = version
+        self.salt = ""
+        self.stats = CacheStats()
+
+    def key(self, markdown: bytes) -> str:
+        digest = hashlib.sha256(self.version.encode())
+        if self.salt:
+            digest.update(b"\0" + self.salt.encode())
+        digest.update(b"\0")
+        digest.update(markdown)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> tuple[str, str] | None:
+        # Entries hold a whole rendered page, so a hit reads it into memory
+        # instead of streaming block by block. The cached path already reads
+        # the whole source to key it; pages that must stay bounded in memory
+        # are rendered without --cache-dir.
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        except (OSError, ValueError):
+            entry = None
+
+        if (
+            not isinstance(entry, dict)
+            or not isinstance(entry.get("title"), str)
+            or not isinstance(entry.get("html"), str)
+        ):
+            # truncated or foreign entry: a miss, and the next put replaces it
+            path.unlink(missing_ok=True)
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        return entry["title"], entry["html"]
+
+    def put(self, key: str, title: str, html: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, suffix=".tmp", delete=False
+        ) as f:
+            json.dump({"title": title, "html": html}, f)
+        os.replace(f.name, path)
+
+    def get_text(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            path.unlink(missing_ok=True)
+            return None
+        return text
+
+    def put_text(self, key: str, text: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, suffix=".tmp", delete=False, encoding="utf-8"
+        ) as f:
+            f.write(text)
+        os.replace(f.name, path)
+
+    def prune(self) -> int:
+        if not self.directory.exists():
+            return 0
+
+        entries = []
+        for path in self.directory.glob("??/*"):
+            stat = path.stat()
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+
+        self.stats.evictions += evicted
+        return evicted
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / key
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pathlib
+import socket
+from typing import Any
+
+# only the standard library is imported here: the client runs on every editor
+# save and pre-commit hook, so it must not pay for the renderer's imports
+DEFAULT_SOCKET = pathlib.Path(".static_server.sock")
+
+
+def request(
+    message: dict[str, Any],
+    socket_path: str | pathlib.Path = DEFAULT_SOCKET,
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(str(socket_path))
+        connection.sendall(json.dumps(message).encode() + b"\n")
+        with connection.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError(f"build daemon on {socket_path} closed the connection")
+    return json.loads(line)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="static_server.client",
+        description="send a request to a running `static_server daemon`",
+    )
+    parser.add_argument(
+        "-s",
+        "--socket",
+        type=pathlib.Path,
+        default=DEFAULT_SOCKET,
+        help=f"daemon socket (default: {DEFAULT_SOCKET})",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="run an incremental build")
+    build.add_argument(
+        "--clean", action="store_true", help="wipe public/ and rebuild everything"
+    )
+    render = commands.add_parser(
+        "render", help="rebuild what depends on these changed files"
+    )
+    render.add_argument("paths", nargs="+", type=pathlib.Path, metavar="PATH")
+    commands.add_parser("stats", help="print daemon and cache statistics")
+    commands.add_parser("stop", help="shut the daemon down")
+    args = parser.parse_args(argv)
+
+    message: dict[str, Any] = {"command": args.command}
+    if args.command == "build":
+        message["clean"] = args.clean
+    elif args.command == "render":
+        # the daemon may run in another directory than the client
+        message["paths"] = [os.path.abspath(path) for path in args.paths]
+
+    try:
+        response = request(message, args.socket)
+    except (FileNotFoundError, ConnectionRefusedError):
+        raise SystemExit(
+            f"no build daemon listening on {args.socket}"
+            " (start one with `python -m static_server daemon`)"
+        )
+
+    if response.get("output"):
+        print(response["output"], end="")
+    if not response["ok"]:
+        raise SystemExit(response["error"])
+    for name, value in response.get("stats", {}).items():
+        print(f"{name}: {value}")
+    if "elapsed_ms" in response:
+        print(f"{args.command} took {response['elapsed_ms']:.1f} ms in the daemon")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import gzip
+import os
+import pathlib
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from .console import log
+from .manifest import BuildManifest, CompressedEntry
+from .output import atomic_write
+from .tree import scan_tree
+
+COMPRESSIBLE_SUFFIXES = frozenset(
+    {".html", ".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".xml"}
+)
+ENCODERS = {
+    ".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0),
+    ".zz": lambda data: zlib.compress(data, 9),
+}
+
+
+@dataclass
+class CompressStats:
+    compressed: list[pathlib.Path] = field(default_factory=list)
+    unchanged: list[pathlib.Path] = field(default_factory=list)
+    original_bytes: int = 0
+    compressed_bytes: int = 0
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.original_bytes - self.compressed_bytes
+
+    def __str__(self) -> str:
+        percent = 0.0
+        if self.original_bytes:
+            percent = 100 * self.saved_bytes / self.original_bytes
+        return (
+            f"{len(self.compressed)} compressed, {len(self.unchanged)} unchanged,"
+            f" {self.saved_bytes} bytes saved ({percent:.1f}%)"
+        )
+
+
+def is_compressible(path: pathlib.Path, min_size: int) -> bool:
+    return path.suffix in COMPRESSIBLE_SUFFIXES and path.stat().st_size >= min_size
+
+
+def sibling(path: pathlib.Path, suffix: str) -> pathlib.Path:
+    return path.with_name(path.name + suffix)
+
+
+def compress_tree(
+    root: str | pathlib.Path,
+    min_size: int = 1024,
+    jobs: int = 1,
+    manifest: BuildManifest | None = None,
+) -> CompressStats:
+    root_path = pathlib.Path(root)
+    files = [
+        path
+        for path in scan_tree(root_path).files
+        if path.name != BuildManifest.FILENAME
+    ]
+    if manifest is not None:
+        # only siblings recorded in the manifest were written here; a .gz that
+        # came from static/ is an asset like any other and is left alone
+        for key in sorted(manifest.compressed):
+            if not (root_path / key).is_file():
+                remove_siblings(root_path / key, manifest)
+
+    return compress_files(files, min_size, jobs, manifest)
+
+
+def compress_files(
+    files: Iterable[pathlib.Path],
+    min_size: int = 1024,
+    jobs: int = 1,
+    manifest: BuildManifest | None = None,
+) -> CompressStats:
+    stats = CompressStats()
+    candidates = []
+    for path in files:
+        if is_owned_sibling(path, manifest):
+            continue
+        if path.is_file() and is_compressible(path, min_size):
+            candidates.append(path)
+        else:
+            remove_siblings(path, manifest)
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    previous = [_entry(path, manifest) for path in candidates]
+    reserved = [_reserved(path, manifest) for path in candidates]
+    # zlib releases the GIL while compressing, so threads scale without pickling
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(compress_file, candidates, previous, reserved)
+        for path, (written, original, compressed, entry) in zip(candidates, results):
+            (stats.compressed if written else stats.unchanged).append(path)
+            stats.original_bytes += original
+            stats.compressed_bytes += compressed
+            if manifest is not None:
+                manifest.compressed[manifest.key(path)] = entry
+
+    return stats
+
+
+def compress_file(
+    path: pathlib.Path,
+    previous: CompressedEntry | None = None,
+    reserved: frozenset[str] = frozenset(),
+) -> tuple[bool, int, int, CompressedEntry]:
+    stat = path.stat()
+    if previous is not None:
+        # recorded results include "did not shrink", so those files are not
+        # compressed again on every build
+        if (
+            previous.size == stat.st_size
+            and previous.mtime_ns == stat.st_mtime_ns
+            and all(_is_current(stat, sibling(path, s)) for s in previous.siblings)
+        ):
+            sizes = [sibling(path, s).stat().st_size for s in previous.siblings]
+            return False, stat.st_size, min(sizes, default=stat.st_size), previous
+    else:
+        siblings = [sibling(path, suffix) for suffix in ENCODERS]
+        if all(_is_current(stat, output) for output in siblings):
+            smallest = min(output.stat().st_size for output in siblings)
+            entry = CompressedEntry(stat.st_size, stat.st_mtime_ns, list(ENCODERS))
+            return False, stat.st_size, smallest, entry
+
+    data = path.read_bytes()
+    smallest = stat.st_size
+    written = []
+    for suffix, encoder in ENCODERS.items():
+        if suffix in reserved:
+            continue
+        output = sibling(path, suffix)
+        encoded = encoder(data)
+        if len(encoded) >= len(data):
+            if previous is not None and suffix in previous.siblings:
+                output.unlink(missing_ok=True)
+            continue
+
+        _write(output, encoded, stat)
+        smallest = min(smallest, len(encoded))
+        written.append(suffix)
+
+    entry = CompressedEntry(stat.st_size, stat.st_mtime_ns, written)
+    return bool(written), stat.st_size, smallest, entry
+
+
+def is_owned_sibling(path: pathlib.Path, manifest: BuildManifest | None) -> bool:
+    if manifest is None or path.suffix not in ENCODERS:
+        return False
+    entry = manifest.compressed.get(manifest.key(path.with_suffix("")))
+    return entry is not None and path.suffix in entry.siblings
+
+
+def remove_siblings(
+    path: pathlib.Path, manifest: BuildManifest | None = None
+) -> None:
+    # without a manifest nothing is known to be ours, so nothing is deleted
+    if manifest is None:
+        return
+    entry = manifest.compressed.pop(manifest.key(path), None)
+    for suffix in [] if entry is None else entry.siblings:
+        output = sibling(path, suffix)
+        if output.exists():
+            log(f"removing orphaned file {output.absolute()}")
+            output.unlink()
+
+
+def remove_compressed(root: str | pathlib.Path, manifest: BuildManifest) -> None:
+    # a build without --compress must not leave stale siblings to be served in
+    # place of the pages it just rewrote
+    for key in sorted(manifest.compressed):
+        remove_siblings(pathlib.Path(root) / key, manifest)
+
+
+def _entry(
+    path: pathlib.Path, manifest: BuildManifest | None
+) -> CompressedEntry | None:
+    if manifest is None:
+        return None
+    return manifest.compressed.get(manifest.key(path))
+
+
+def _reserved(path: pathlib.Path, manifest: BuildManifest | None) -> frozenset[str]:
+    # a sibling copied from static/ wins over the one we would write
+    if manifest is None:
+        return frozenset()
+    return frozenset(
+        suffix
+        for suffix in ENCODERS
+        if manifest.key(sibling(path, suffix)) in manifest.assets
+    )
+
+
+def _is_current(source_stat: os.stat_result, output: pathlib.Path) -> bool:
+    try:
+        return output.stat().st_mtime_ns == source_stat.st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _write(path: pathlib.Path, data: bytes, source_stat: os.stat_result) -> None:
+    # the sibling carries the source's mtime so a rewritten source is detected
+    # even when it was copied with an older timestamp
+    with atomic_write(path, "wb", mtime_ns=source_stat.st_mtime_ns) as f:
+        f.write(data)
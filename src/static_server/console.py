@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+from typing import IO, Iterator
+
+# Build messages go to sys.stdout unless a caller asks for them elsewhere.
+# The destination is a context variable, not a swapped sys.stdout, so it
+# only affects the task or thread that set it (asyncio.to_thread copies it).
+_stream: contextvars.ContextVar[IO[str] | None] = contextvars.ContextVar(
+    "log_stream", default=None
+)
+
+
+def log(*values: object) -> None:
+    print(*values, file=_stream.get())
+
+
+@contextlib.contextmanager
+def log_to(stream: IO[str]) -> Iterator[None]:
+    token = _stream.set(stream)
+    try:
+        yield
+    finally:
+        _stream.reset(token)
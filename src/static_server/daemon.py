@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import asyncio
+import errno
+import functools
+import io
+import json
+import os
+import pathlib
+import socket
+import stat
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from .build import PageRenderError
+from .client import DEFAULT_SOCKET
+from .console import log_to
+from .site import Site
+from .textblock import Block, BlockList
+
+REQUEST_LIMIT = 1024 * 1024
+
+
+@dataclass
+class DaemonStats:
+    started: float = field(default_factory=time.monotonic)
+    requests: int = 0
+    builds: int = 0
+    renders: int = 0
+    failures: int = 0
+    last_build_ms: float | None = None
+
+
+@dataclass
+class BuildDaemon:
+    site: Site
+    socket_path: pathlib.Path = DEFAULT_SOCKET
+    stats: DaemonStats = field(default_factory=DaemonStats)
+    # builds mutate the site and the class-level caches, so they run one at a
+    # time; stats requests are answered while a build is in progress
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+    _stopped: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    async def start(self) -> asyncio.Server:
+        claim_socket(self.socket_path)
+        server = await asyncio.start_unix_server(
+            self.handle, self.socket_path, limit=REQUEST_LIMIT
+        )
+        # the daemon writes wherever it is told to, so only its owner may talk to it
+        os.chmod(self.socket_path, 0o600)
+        return server
+
+    async def wait_stopped(self) -> None:
+        await self._stopped.wait()
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            line = await reader.readline()
+            try:
+                message = json.loads(line)
+            except ValueError:
+                response = {"ok": False, "error": "malformed request"}
+            else:
+                response = await self.dispatch(message)
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def dispatch(self, message: Any) -> dict[str, Any]:
+        self.stats.requests += 1
+        command = message.get("command") if isinstance(message, dict) else None
+        if command == "stats":
+            return {"ok": True, "stats": self.snapshot()}
+        if command == "stop":
+            self._stopped.set()
+            return {"ok": True}
+
+        job: Callable[[], Any]
+        if command == "build":
+            job = functools.partial(self.site.build, bool(message.get("clean")))
+        elif command == "render":
+            try:
+                paths = self.site_paths(message.get("paths"))
+            except ValueError as error:
+                return {"ok": False, "error": str(error)}
+            job = functools.partial(self.site.update, paths)
+        else:
+            return {"ok": False, "error": f"unknown command {command!r}"}
+
+        async with self._lock:
+            return await asyncio.to_thread(self.run, command, job)
+
+    def run(self, command: str, job: Callable[[], Any]) -> dict[str, Any]:
+        output = io.StringIO()
+        started = time.perf_counter()
+        try:
+            with log_to(output):
+                result = job()
+        except PageRenderError as error:
+            self.stats.failures += 1
+            return {"ok": False, "error": str(error), "output": output.getvalue()}
+        except Exception as error:
+            # a broken source must not take the daemon (and its warm caches) down
+            self.stats.failures += 1
+            traceback.print_exc()
+            return {"ok": False, "error": repr(error), "output": output.getvalue()}
+        elapsed = (time.perf_counter() - started) * 1000
+
+        response: dict[str, Any] = {
+            "ok": True,
+            "output": output.getvalue(),
+            "elapsed_ms": elapsed,
+        }
+        if command == "build":
+            self.stats.builds += 1
+            self.stats.last_build_ms = elapsed
+        else:
+            self.stats.renders += 1
+            response["rendered"] = [str(page.destination) for page in result]
+        return response
+
+    def site_paths(self, names: Any) -> list[pathlib.Path]:
+        if not isinstance(names, list) or not names:
+            raise ValueError("render needs a list of paths")
+
+        cwd = pathlib.Path.cwd()
+        roots = (self.site.content, self.site.static, self.site.template)
+        paths = []
+        for name in names:
+            path = pathlib.Path(name)
+            if path.is_absolute() and path.is_relative_to(cwd):
+                path = path.relative_to(cwd)
+            if not any(path.is_relative_to(root) for root in roots):
+                raise ValueError(f"{name} is not part of the site")
+            paths.append(path)
+        return paths
+
+    def snapshot(self) -> dict[str, Any]:
+        snapshot: dict[str, Any] = {
+            "pid": os.getpid(),
+            "uptime_s": round(time.monotonic() - self.stats.started, 1),
+            "requests": self.stats.requests,
+            "builds": self.stats.builds,
+            "renders": self.stats.renders,
+            "failures": self.stats.failures,
+            "busy": self._lock.locked(),
+        }
+        if self.stats.last_build_ms is not None:
+            snapshot["last_build_ms"] = round(self.stats.last_build_ms, 1)
+        block_cache = BlockList.block_cache
+        if block_cache is not None:
+            snapshot["block_cache"] = (
+                f"{len(block_cache)} entries, {block_cache.size} bytes,"
+                f" {block_cache.stats}"
+            )
+        if Block.highlighter is not None:
+            snapshot["highlight_cache"] = str(Block.highlighter.cache.stats)
+        if self.site.render_cache is not None:
+            snapshot["render_cache"] = str(self.site.render_cache.stats)
+        return snapshot
+
+
+def claim_socket(path: pathlib.Path) -> None:
+    # a socket file left behind by a daemon that died is removed, a live
+    # daemon is never replaced
+    try:
+        mode = path.lstat().st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(errno.EEXIST, "not a socket", str(path))
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            path.unlink(missing_ok=True)
+            return
+    raise OSError(errno.EADDRINUSE, "a build daemon is already listening", str(path))
+
+
+def run_daemon(site: Site, socket_path: str | pathlib.Path = DEFAULT_SOCKET) -> None:
+    async def run() -> None:
+        daemon = BuildDaemon(site, pathlib.Path(socket_path))
+        server = await daemon.start()
+        print(f"build daemon listening on {socket_path}")
+        try:
+            async with server:
+                await daemon.wait_stopped()
+        finally:
+            pathlib.Path(socket_path).unlink(missing_ok=True)
+        print("build daemon stopped")
+
+    asyncio.run(run())
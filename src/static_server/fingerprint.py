@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import pathlib
+import posixpath
+import re
+import urllib.parse
+from dataclasses import dataclass
+from typing import IO, ClassVar, Iterable, Pattern
+
+from .assets import copy_file
+from .console import log
+from .manifest import AssetEntry, BuildManifest, file_hash
+from .minify import is_minifiable
+from .output import atomic_write
+from .tree import scan_tree
+
+FINGERPRINT_LENGTH = 8
+FINGERPRINT_REGEX = re.compile(rf"\.[0-9a-f]{{{FINGERPRINT_LENGTH}}}(\.[^./]+)?$")
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    path = pathlib.PurePosixPath(name)
+    return f"{path.stem}.{digest[:FINGERPRINT_LENGTH]}{path.suffix}"
+
+
+@dataclass
+class AssetFingerprints:
+    root: pathlib.Path
+    names: dict[str, str]
+
+    FILENAME: ClassVar[str] = "asset-manifest.json"
+    url_regex: ClassVar[Pattern[str]] = re.compile(
+        r"""(\b(src|href|srcset)=)(["'])([^"']*)\3"""
+        r"|<(/?)(?:pre|code)\b[^>]*>",
+        re.IGNORECASE,
+    )
+
+    @classmethod
+    def load(cls, root: str | pathlib.Path) -> AssetFingerprints:
+        root_path = pathlib.Path(root)
+        try:
+            with open(root_path / cls.FILENAME) as f:
+                names = json.load(f)
+        except (OSError, ValueError):
+            names = {}
+        return cls(root_path, names)
+
+    def save(self) -> None:
+        with atomic_write(self.root / self.FILENAME) as f:
+            json.dump(self.names, f, indent=2, sort_keys=True)
+
+    def digest(self) -> str:
+        return hashlib.sha256(
+            json.dumps(self.names, sort_keys=True).encode()
+        ).hexdigest()
+
+    def rewrite_url(self, url: str, base: str = "") -> str:
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme or parts.netloc or not parts.path:
+            return url
+
+        if parts.path.startswith("/"):
+            key = posixpath.normpath(parts.path).lstrip("/")
+        else:
+            key = posixpath.normpath(posixpath.join(base, parts.path))
+
+        fingerprinted = self.names.get(key)
+        if fingerprinted is None:
+            return url
+
+        directory = parts.path.rpartition("/")[0]
+        new_path = posixpath.basename(fingerprinted)
+        if directory or parts.path.startswith("/"):
+            new_path = f"{directory}/{new_path}"
+        return urllib.parse.urlunsplit(parts._replace(path=new_path))
+
+    def rewrite_html(self, html: str, base: str = "") -> str:
+        return self.rewrite_chunk(html, base)[0]
+
+    def rewrite_chunk(
+        self, html: str, base: str = "", verbatim: int = 0
+    ) -> tuple[str, int]:
+        # URLs inside <pre> and <code> are sample text, not references;
+        # verbatim counts the open elements so a stream can carry it across
+        # chunks that split a code block
+        def rewrite(match: re.Match[str]) -> str:
+            nonlocal verbatim
+            if match[1] is None:
+                verbatim = max(0, verbatim - 1) if match[5] else verbatim + 1
+                return match[0]
+            if verbatim:
+                return match[0]
+
+            value = match[4]
+            if match[2] == "srcset":
+                candidates = []
+                for candidate in value.split(","):
+                    url, _, descriptor = candidate.strip().partition(" ")
+                    rewritten = self.rewrite_url(url, base)
+                    candidates.append(f"{rewritten} {descriptor}".rstrip())
+                value = ", ".join(candidates)
+            else:
+                value = self.rewrite_url(value, base)
+            return f"{match[1]}{match[3]}{value}{match[3]}"
+
+        rewritten = self.url_regex.sub(rewrite, html)
+        return rewritten, verbatim
+
+    def base_for(self, destination: pathlib.Path) -> str:
+        relative = destination.parent.relative_to(self.root).as_posix()
+        return "" if relative == "." else relative
+
+
+class RewritingStream:
+    def __init__(
+        self, stream: IO[str], fingerprints: AssetFingerprints, base: str
+    ) -> None:
+        self.stream = stream
+        self.fingerprints = fingerprints
+        self.base = base
+        self.verbatim = 0
+
+    def write(self, text: str) -> int:
+        rewritten, self.verbatim = self.fingerprints.rewrite_chunk(
+            text, self.base, self.verbatim
+        )
+        return self.stream.write(rewritten)
+
+    def writelines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.write(line)
+
+
+def fingerprint_tree(
+    source: str | pathlib.Path,
+    destination: str | pathlib.Path,
+    link: bool = False,
+    manifest: BuildManifest | None = None,
+    minify: bool = False,
+) -> AssetFingerprints:
+    source_path = pathlib.Path(source)
+    destination_path = pathlib.Path(destination)
+    previous = AssetFingerprints.load(destination_path)
+    fingerprints = AssetFingerprints(destination_path, {})
+
+    for file in scan_tree(source_path).files:
+        relative = file.relative_to(source_path)
+        name = fingerprinted_name(relative.name, file_hash(file))
+        target = destination_path / relative.parent / name
+        minified = minify and is_minifiable(target)
+        entry = None if manifest is None else manifest.assets.get(manifest.key(target))
+        # like a plain copy, a fingerprinted one is minified in place
+        if not target.exists() or (entry is not None and entry.minified != minified):
+            log(f"fingerprinting file {file.absolute()} as {target.absolute()}")
+            target.parent.mkdir(parents=True, exist_ok=True)
+            copy_file(file, target, link)
+        fingerprints.names[relative.as_posix()] = (relative.parent / name).as_posix()
+        if manifest is not None:
+            stat = file.stat()
+            manifest.assets[manifest.key(target)] = AssetEntry(
+                str(file),
+                stat.st_size,
+                stat.st_mtime_ns,
+                minified=minified,
+                fingerprinted=True,
+            )
+
+    current = set(fingerprints.names.values())
+    stale = set(previous.names.values()) - current
+    for name in sorted(stale):
+        path = destination_path / name
+        if path.exists():
+            log(f"removing stale fingerprinted file {path.absolute()}")
+            path.unlink()
+
+    fingerprints.save()
+    if manifest is not None:
+        current.add(AssetFingerprints.FILENAME)
+        remove_fingerprinted(manifest, keep=current)
+        stat = (destination_path / AssetFingerprints.FILENAME).stat()
+        manifest.assets[AssetFingerprints.FILENAME] = AssetEntry(
+            str(source_path), stat.st_size, stat.st_mtime_ns, fingerprinted=True
+        )
+    return fingerprints
+
+
+def remove_fingerprinted(
+    manifest: BuildManifest, keep: Iterable[str] = ()
+) -> None:
+    # fingerprinted copies and asset-manifest.json are recorded as ours, so a
+    # build without --fingerprint (or a changed source) does not leave them
+    kept = set(keep)
+    for key in sorted(manifest.assets):
+        if not manifest.assets[key].fingerprinted or key in kept:
+            continue
+        path = manifest.root / key
+        if path.exists():
+            log(f"removing stale fingerprinted file {path.absolute()}")
+            path.unlink()
+        del manifest.assets[key]
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import pathlib
+import shutil
+
+from .console import log
+from .fingerprint import AssetFingerprints
+from .images import ImageIndex
+from .manifest import BuildManifest
+from .tree import scan_tree
+
+# rewritten in place by their save() methods, so never shared between generations
+METADATA_FILES = frozenset(
+    {BuildManifest.FILENAME, AssetFingerprints.FILENAME, ImageIndex.FILENAME}
+)
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+
+def generations_root(output: pathlib.Path) -> pathlib.Path:
+    return output.with_name(f"{output.name}.generations")
+
+
+def list_generations(output: pathlib.Path) -> list[pathlib.Path]:
+    root = generations_root(output)
+    if not root.is_dir():
+        return []
+    return sorted(
+        (path for path in root.iterdir() if path.name.isdigit() and path.is_dir()),
+        key=lambda path: int(path.name),
+    )
+
+
+def current_generation(output: pathlib.Path) -> pathlib.Path | None:
+    if not output.is_symlink():
+        return None
+    return generations_root(output) / pathlib.Path(os.readlink(output)).name
+
+
+def create_generation(output: pathlib.Path, seed: bool = True) -> pathlib.Path:
+    existing = list_generations(output)
+    number = int(existing[-1].name) + 1 if existing else 0
+    if is_plain_directory(output):
+        # a plain output directory is kept as the generation before this one;
+        # its number is reserved now and taken over by activate()
+        (generations_root(output) / f"{number:06d}").mkdir(parents=True)
+        number += 1
+    number = max(number, 1)
+    generation = generations_root(output) / f"{number:06d}"
+    generation.mkdir(parents=True)
+
+    previous = output if output.is_dir() else None
+    if seed and previous is not None:
+        seed_generation(previous, generation)
+    return generation
+
+
+def seed_generation(previous: pathlib.Path, generation: pathlib.Path) -> None:
+    # every build step replaces files through a rename, so hardlinked outputs
+    # are shared with the previous generation until they actually change
+    tree = scan_tree(previous)
+    for directory in tree.directories:
+        (generation / directory.relative_to(previous)).mkdir(exist_ok=True)
+    for file in tree.files:
+        target = generation / file.relative_to(previous)
+        if file.name in METADATA_FILES:
+            shutil.copy2(file, target)
+            continue
+        try:
+            os.link(file, target)
+        except OSError:
+            shutil.copy2(file, target)
+
+
+def discard_generation(output: pathlib.Path, generation: pathlib.Path) -> None:
+    shutil.rmtree(generation)
+    if is_plain_directory(output):
+        previous_slot(generation).rmdir()
+
+
+def activate(output: pathlib.Path, generation: pathlib.Path) -> None:
+    link = output.with_name(f".{output.name}.link")
+    link.unlink(missing_ok=True)
+    link.symlink_to(os.path.relpath(generation, output.parent))
+
+    if not is_plain_directory(output):
+        os.replace(link, output)
+        return
+
+    # First switch from a plain directory. A symlink cannot replace a
+    # directory in one rename, so the two are swapped atomically where the
+    # kernel supports it; otherwise output is missing between two renames.
+    slot = previous_slot(generation)
+    if exchange(link, output):
+        os.replace(link, slot)
+    else:
+        os.replace(output, slot)
+        os.replace(link, output)
+
+
+def is_plain_directory(path: pathlib.Path) -> bool:
+    return path.is_dir() and not path.is_symlink()
+
+
+def previous_slot(generation: pathlib.Path) -> pathlib.Path:
+    return generation.with_name(f"{int(generation.name) - 1:06d}")
+
+
+def exchange(first: pathlib.Path, second: pathlib.Path) -> bool:
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        return False
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    renameat2 = getattr(libc, "renameat2", None)
+    if renameat2 is None:
+        return False
+    renameat2.argtypes = [
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_uint,
+    ]
+    result = renameat2(
+        AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE
+    )
+    if result == 0:
+        return True
+    error = ctypes.get_errno()
+    if error in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+        return False
+    raise OSError(error, os.strerror(error), str(second))
+
+
+def prune_generations(output: pathlib.Path, keep: int) -> list[pathlib.Path]:
+    current = current_generation(output)
+    previous = [path for path in list_generations(output) if path != current]
+    stale = previous[: max(0, len(previous) - keep)]
+    for generation in stale:
+        log(f"removing old generation {generation.absolute()}")
+        shutil.rmtree(generation)
+    return stale
+
+
+def rollback(output: pathlib.Path) -> pathlib.Path:
+    current = current_generation(output)
+    older = [
+        path
+        for path in list_generations(output)
+        if current is None or int(path.name) < int(current.name)
+    ]
+    if not older:
+        raise ValueError(f"no generation older than {current} to roll back to")
+    activate(output, older[-1])
+    return older[-1]
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import hashlib
+import html
+import re
+from dataclasses import dataclass
+from typing import Iterable, Pattern
+
+from .cache import BlockCache
+
+CLIENT_HIGHLIGHTER = "prism.js"
+FENCE_REGEX = re.compile(r"```(\w*)")
+
+C_COMMENT = r"//.*|/\*[\s\S]*?\*/"
+DOUBLE_QUOTED = r'"(?:\\.|[^"\\\n])*"'
+SINGLE_QUOTED = r"'(?:\\.|[^'\\\n])*'"
+NUMBER = (
+    r"\b0[xX][\da-fA-F_]+\b|(?:\b\d[\d_]*(?:\.[\d_]*)?|\B\.\d+)(?:[eE][+-]?\d+)?"
+)
+FUNCTION = r"\b[A-Za-z_$][\w$]*(?=\s*\()"
+PUNCTUATION = r"[{}[\];(),.:]"
+
+
+def words(names: str) -> str:
+    return rf"\b(?:{'|'.join(names.split())})\b"
+
+
+@dataclass(frozen=True)
+class Rule:
+    token: str
+    pattern: str
+    inside: Grammar | None = None
+
+
+class Grammar:
+    def __init__(self, *rules: Rule) -> None:
+        self.rules = rules
+        self.regex: Pattern[str] = re.compile(
+            "|".join(f"(?P<r{i}>{rule.pattern})" for i, rule in enumerate(rules)),
+            re.MULTILINE,
+        )
+
+    def highlight(self, code: str) -> str:
+        chunks = []
+        position = 0
+        for match in self.regex.finditer(code):
+            chunks.append(html.escape(code[position : match.start()], quote=False))
+            rule = self.rules[int(match.lastgroup[1:])]  # type: ignore[index]
+            if rule.inside is None:
+                body = html.escape(match[0], quote=False)
+            else:
+                body = rule.inside.highlight(match[0])
+            chunks.append(f'<span class="token {rule.token}">{body}</span>')
+            position = match.end()
+        chunks.append(html.escape(code[position:], quote=False))
+        return "".join(chunks)
+
+
+PYTHON = Grammar(
+    Rule("comment", r"#.*"),
+    Rule(
+        "string",
+        r"(?i:[rbuf]{0,2})(?:\"\"\"[\s\S]*?\"\"\"|'''[\s\S]*?'''"
+        rf"|{DOUBLE_QUOTED}|{SINGLE_QUOTED})",
+    ),
+    Rule("decorator annotation", r"(?<!\S)@\w[\w.]*"),
+    Rule("class-name", r"(?<=\bclass )\w+"),
+    Rule(
+        "keyword",
+        words(
+            "and as assert async await break case class continue def del elif else "
+            "except finally for from global if import in is lambda match nonlocal not "
+            "or pass raise return try while with yield"
+        ),
+    ),
+    Rule(
+        "builtin",
+        words(
+            "bool bytes dict enumerate filter float int isinstance len list map object "
+            "open print range repr set sorted str super tuple type zip"
+        ),
+    ),
+    Rule("boolean", words("True False None")),
+    Rule("number", NUMBER),
+    Rule("function", FUNCTION),
+    Rule("operator", r"[-+%=]=?|!=|:=|\*\*?=?|//?=?|<[<=>]?|>[=>]?|[&|^~]"),
+    Rule("punctuation", PUNCTUATION),
+)
+
+JAVASCRIPT = Grammar(
+    Rule("comment", C_COMMENT),
+    Rule("template-string string", r"`(?:\\[\s\S]|[^\\`])*`"),
+    Rule("string", rf"{DOUBLE_QUOTED}|{SINGLE_QUOTED}"),
+    Rule("class-name", r"(?<=\bclass )[\w$]+|(?<=\bnew )[\w$]+"),
+    Rule(
+        "keyword",
+        words(
+            "as async await break case catch class const continue debugger default "
+            "delete do else enum export extends finally for from function if "
+            "implements import in instanceof interface let new null of return static "
+            "super switch this throw try type typeof undefined var void while with "
+            "yield"
+        ),
+    ),
+    Rule("boolean", words("true false")),
+    Rule("number", NUMBER),
+    Rule("function", FUNCTION),
+    Rule(
+        "operator",
+        r"--|\+\+|\*\*=?|=>|&&=?|\|\|=?|[!=]==?|\?\?=?|\.{3}|<<=?|>>>?=?"
+        r"|[-+*/%&|^!=<>]=?|[~?]",
+    ),
+    Rule("punctuation", PUNCTUATION),
+)
+
+BASH = Grammar(
+    Rule("shebang important", r"\A#!.*"),
+    Rule("comment", r"(?<!\S)#.*"),
+    Rule("string", r'"(?:\\[\s\S]|[^"\\])*"|\'[^\']*\''),
+    Rule("variable", r"\$(?:\w+|\{[^}\n]*\}|[@#?$!*0-9-])"),
+    Rule(
+        "keyword",
+        words(
+            "case do done elif else esac export fi for function if in local readonly "
+            "return select then until while"
+        ),
+    ),
+    Rule(
+        "builtin",
+        words(
+            "alias cd echo eval exec exit printf pwd read set shift source test unset"
+        ),
+    ),
+    Rule("boolean", words("true false")),
+    Rule("number", r"(?<![\w-])\d+\b"),
+    Rule("operator", r"&&|\|\||[|&]|\d?>>?|<<?|=="),
+    Rule("punctuation", r"[{}[\]();]"),
+)
+
+JSON = Grammar(
+    Rule("comment", C_COMMENT),
+    Rule("property", rf"{DOUBLE_QUOTED}(?=\s*:)"),
+    Rule("string", DOUBLE_QUOTED),
+    Rule("number", r"-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b"),
+    Rule("boolean", words("true false")),
+    Rule("null keyword", words("null")),
+    Rule("operator", r":"),
+    Rule("punctuation", r"[{}[\],]"),
+)
+
+CSS = Grammar(
+    Rule("comment", r"/\*[\s\S]*?\*/"),
+    Rule("atrule", r"@[\w-]+"),
+    Rule("string", rf"{DOUBLE_QUOTED}|{SINGLE_QUOTED}"),
+    Rule("selector", r"[^{}\s][^{};]*?(?=\s*\{)"),
+    Rule("property", r"(?<![\w-])-{0,2}[a-zA-Z][\w-]*(?=\s*:)"),
+    Rule("important", r"!important\b"),
+    Rule("function", r"[\w-]+(?=\()"),
+    Rule("hexcode color", r"#[\da-fA-F]{3,8}\b"),
+    Rule("number", r"-?(?:\b\d+(?:\.\d+)?|\B\.\d+)(?:%|[a-zA-Z]+\b)?"),
+    Rule("punctuation", r"[(){};:,]"),
+)
+
+MARKUP_ATTRIBUTE_VALUE = Grammar(
+    Rule("punctuation attr-equals", r"\A="),
+    Rule("punctuation", r"(?<==)\s*[\"']|[\"']\Z"),
+)
+MARKUP_TAG = Grammar(
+    Rule("tag", r"\A</?[^\s>/]+", Grammar(Rule("punctuation", r"\A</?"))),
+    Rule(
+        "attr-value",
+        r"=\s*(?:\"[^\"]*\"|'[^']*'|[^\s'\">=]+)",
+        MARKUP_ATTRIBUTE_VALUE,
+    ),
+    Rule("attr-name", r"[^\s>/=]+"),
+    Rule("punctuation", r"/?>\Z"),
+)
+MARKUP = Grammar(
+    Rule("comment", r"<!--[\s\S]*?-->"),
+    Rule("prolog", r"<\?[\s\S]+?\?>"),
+    Rule("doctype", r"(?i:<!DOCTYPE)[^>]*>"),
+    Rule("cdata", r"<!\[CDATA\[[\s\S]*?\]\]>"),
+    Rule(
+        "tag",
+        r"</?[^\s>/=!?]+(?:\s+[^\s>/=]+(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'"
+        r"|[^\s'\">=]+))?)*\s*/?>",
+        MARKUP_TAG,
+    ),
+    Rule("entity named-entity", r"&#?[\da-zA-Z]{1,8};"),
+)
+
+GO = Grammar(
+    Rule("comment", C_COMMENT),
+    Rule("string", rf"{DOUBLE_QUOTED}|{SINGLE_QUOTED}|`[^`]*`"),
+    Rule(
+        "keyword",
+        words(
+            "break case chan const continue default defer else fallthrough for func go "
+            "goto if import interface map package range return select struct switch "
+            "type var"
+        ),
+    ),
+    Rule("boolean", words("true false iota nil")),
+    Rule(
+        "builtin",
+        words(
+            "append bool byte cap close complex copy delete error float32 float64 imag "
+            "int int8 int16 int32 int64 len make new panic print println real recover "
+            "rune string uint uint8 uint16 uint32 uint64 uintptr"
+        ),
+    ),
+    Rule("number", NUMBER),
+    Rule("function", FUNCTION),
+    Rule(
+        "operator",
+        r":=|\.{3}|&&|\|\||<-|\+\+|--|<<=?|>>=?|&\^=?|[-+*/%&|^!=<>]=?",
+    ),
+    Rule("punctuation", PUNCTUATION),
+)
+
+GRAMMARS: dict[str, Grammar] = {
+    "python": PYTHON,
+    "py": PYTHON,
+    "javascript": JAVASCRIPT,
+    "js": JAVASCRIPT,
+    "jsx": JAVASCRIPT,
+    "typescript": JAVASCRIPT,
+    "ts": JAVASCRIPT,
+    "bash": BASH,
+    "sh": BASH,
+    "shell": BASH,
+    "zsh": BASH,
+    "json": JSON,
+    "css": CSS,
+    "markup": MARKUP,
+    "html": MARKUP,
+    "xml": MARKUP,
+    "svg": MARKUP,
+    "go": GO,
+}
+
+
+class Highlighter:
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024) -> None:
+        self.cache = BlockCache(max_bytes)
+
+    def highlight(self, language: str, code: str) -> str | None:
+        grammar = GRAMMARS.get(language.lower())
+        if grammar is None:
+            return None
+
+        key = hashlib.sha256(f"{language}\0{code}".encode()).hexdigest()
+        highlighted = self.cache.get(key)
+        if highlighted is None:
+            highlighted = grammar.highlight(code)
+            self.cache.put(key, highlighted)
+        return highlighted
+
+
+def unsupported_languages(lines: Iterable[str]) -> set[str]:
+    # languages of the fenced blocks no grammar covers, named the way the
+    # block renderer names them; those pages still need the client script
+    languages = set()
+    opening = True
+    for line in lines:
+        match = FENCE_REGEX.match(line)
+        if match is None:
+            continue
+        language = match[1] or "plain"
+        if opening and language.lower() not in GRAMMARS:
+            languages.add(language)
+        opening = not opening
+    return languages
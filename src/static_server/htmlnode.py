@@ -1,18 +1,29 @@
 from __future__ import annotations
+import io
 from dataclasses import dataclass
-from typing import Sequence
+from typing import IO, Iterable, Iterator, Mapping
 
 
-@dataclass
+@dataclass(slots=True)
 class HTMLNode:
     tag: str | None = None
     value: str | None = None
-    children: Sequence[HTMLNode] | None = None
-    props: dict[str, str | None] | None = None
+    children: Iterable[HTMLNode] | None = None
+    props: Mapping[str, str | None] | None = None
 
     def to_html(self) -> str:
         raise NotImplementedError()  # pragma: no cover
 
+    def iter_html(self) -> Iterator[str]:
+        yield self.to_html()
+
+    def write_to(self, stream: IO[str] | IO[bytes]) -> None:
+        chunks = self.iter_html()
+        if is_binary(stream):
+            stream.writelines(chunk.encode() for chunk in chunks)
+        else:
+            stream.writelines(chunks)
+
     def props_to_html(self) -> str:
         if not self.props:
             return ""
@@ -23,8 +34,13 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
-        self, value: str, tag: str | None = None, props: dict[str, str | None] | None = None
+        self,
+        value: str,
+        tag: str | None = None,
+        props: Mapping[str, str | None] | None = None,
     ) -> None:
         super().__init__(tag=tag, value=value, props=props)
 
@@ -36,21 +52,30 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str,
-        children: Sequence[HTMLNode],
-        props: dict[str, str | None] | None = None,
+        children: Iterable[HTMLNode],
+        props: Mapping[str, str | None] | None = None,
     ) -> None:
         super().__init__(tag=tag, children=children, props=props)
 
     def to_html(self) -> str:
+        return "".join(self.iter_html())
 
+    def iter_html(self) -> Iterator[str]:
         if self.children is None:
             raise Exception()  # pragma: no cover
 
-        return (
-            f"<{self.tag}{self.props_to_html()}>"
-            + "".join(child.to_html() for child in self.children)
-            + f"</{self.tag}>"
-        )
+        yield f"<{self.tag}{self.props_to_html()}>"
+        for child in self.children:
+            yield from child.iter_html()
+        yield f"</{self.tag}>"
+
+
+def is_binary(stream: IO[str] | IO[bytes]) -> bool:
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    return "b" in getattr(stream, "mode", "")
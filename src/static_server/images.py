@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import json
+import os
+import pathlib
+import posixpath
+import struct
+import urllib.parse
+from dataclasses import asdict, dataclass, field, replace
+from typing import IO, ClassVar
+
+from .console import log
+from .manifest import file_hash
+from .output import FILE_MODE, atomic_write, temporary_path
+from .tree import scan_tree
+
+IMAGE_SUFFIXES = frozenset({".png", ".jpg", ".jpeg", ".gif"})
+JPEG_SOF_MARKERS = frozenset(
+    {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+)
+
+
+def image_size(path: str | pathlib.Path) -> tuple[int, int] | None:
+    with open(path, "rb") as f:
+        header = f.read(26)
+        if header.startswith(b"\x89PNG\r\n\x1a\n") and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", header[6:10])
+        if header.startswith(b"\xff\xd8"):
+            f.seek(2)
+            return _jpeg_size(f)
+    return None
+
+
+def _jpeg_size(f: IO[bytes]) -> tuple[int, int] | None:
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        while marker[1] == 0xFF:
+            marker = marker[1:] + f.read(1)
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        (length,) = struct.unpack(">H", length_bytes)
+        if marker[1] in JPEG_SOF_MARKERS:
+            segment = f.read(5)
+            if len(segment) < 5:
+                return None
+            height, width = struct.unpack(">xHH", segment)
+            return width, height
+        f.seek(length - 2, 1)
+
+
+@dataclass
+class ImageInfo:
+    source_hash: str
+    width: int
+    height: int
+    variants: list[tuple[int, str]] = field(default_factory=list)
+    # the source's stat when it was hashed, so unchanged images are not read
+    size: int = 0
+    mtime_ns: int = 0
+
+
+class ImageIndex:
+    FILENAME: ClassVar[str] = ".image-manifest.json"
+
+    def __init__(self, root: str | pathlib.Path, images: dict[str, ImageInfo]):
+        self.root = pathlib.Path(root)
+        self.images = images
+
+    @classmethod
+    def load(cls, root: str | pathlib.Path) -> ImageIndex:
+        root_path = pathlib.Path(root)
+        try:
+            with open(root_path / cls.FILENAME) as f:
+                data = json.load(f)
+            images = {
+                key: ImageInfo(
+                    entry["source_hash"],
+                    entry["width"],
+                    entry["height"],
+                    [tuple(variant) for variant in entry["variants"]],
+                    entry.get("size", 0),
+                    entry.get("mtime_ns", 0),
+                )
+                for key, entry in data.items()
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            images = {}
+        return cls(root_path, images)
+
+    def save(self) -> None:
+        with atomic_write(self.root / self.FILENAME) as f:
+            json.dump(
+                {key: asdict(info) for key, info in self.images.items()},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+
+    def digest(self) -> str:
+        # only what pages are rendered from: touching an image changes nothing
+        return hashlib.sha256(
+            json.dumps(
+                {
+                    key: [info.source_hash, info.width, info.height, info.variants]
+                    for key, info in self.images.items()
+                },
+                sort_keys=True,
+            ).encode()
+        ).hexdigest()
+
+    def attributes(self, src: str, base: str = "") -> dict[str, str]:
+        parts = urllib.parse.urlsplit(src)
+        if parts.scheme or parts.netloc or not parts.path:
+            return {}
+
+        # relative sources are resolved against the page's directory
+        if parts.path.startswith("/"):
+            key = posixpath.normpath(parts.path).lstrip("/")
+        else:
+            key = posixpath.normpath(posixpath.join(base, parts.path))
+        info = self.images.get(key)
+        if info is None:
+            return {}
+
+        attributes = {
+            "width": str(info.width),
+            "height": str(info.height),
+            "loading": "lazy",
+            "decoding": "async",
+        }
+        if info.variants:
+            candidates = [f"/{name} {width}w" for width, name in info.variants]
+            candidates.append(f"{src} {info.width}w")
+            attributes["srcset"] = ", ".join(candidates)
+            attributes["sizes"] = f"(max-width: {info.width}px) 100vw, {info.width}px"
+        return attributes
+
+    def base_for(self, destination: pathlib.Path) -> str:
+        try:
+            relative = destination.parent.relative_to(self.root).as_posix()
+        except ValueError:
+            return ""
+        return "" if relative == "." else relative
+
+
+def build_image_index(
+    source: str | pathlib.Path,
+    destination: str | pathlib.Path,
+    widths: tuple[int, ...] = (),
+) -> ImageIndex:
+    source_path = pathlib.Path(source)
+    destination_path = pathlib.Path(destination)
+    if widths and importlib.util.find_spec("PIL") is None:
+        log("Pillow is not installed, skipping downscaled image variants")
+        widths = ()
+
+    previous = ImageIndex.load(destination_path)
+    index = ImageIndex(destination_path, {})
+
+    for file in scan_tree(source_path).files:
+        if file.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+
+        key = file.relative_to(source_path).as_posix()
+        stat = file.stat()
+        cached = previous.images.get(key)
+        if cached is not None and (cached.size, cached.mtime_ns) == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            source_hash = cached.source_hash
+        else:
+            source_hash = file_hash(file)
+        if (
+            cached is not None
+            and cached.source_hash == source_hash
+            and all((destination_path / name).exists() for _, name in cached.variants)
+            and [width for width, _ in cached.variants] == _variant_widths(
+                cached.width, widths
+            )
+        ):
+            index.images[key] = replace(
+                cached, size=stat.st_size, mtime_ns=stat.st_mtime_ns
+            )
+            continue
+
+        dimensions = image_size(file)
+        if dimensions is None:
+            log(f"skipping unrecognised image {file.absolute()}")
+            continue
+
+        width, height = dimensions
+        log(f"indexing image {file.absolute()} ({width}x{height})")
+        info = ImageInfo(source_hash, width, height, [], stat.st_size, stat.st_mtime_ns)
+        for width in _variant_widths(info.width, widths):
+            name = _variant_name(key, width, source_hash)
+            make_variant(file, destination_path / name, width)
+            info.variants.append((width, name))
+        index.images[key] = info
+
+    stale = {name for info in previous.images.values() for _, name in info.variants}
+    stale -= {name for info in index.images.values() for _, name in info.variants}
+    for name in sorted(stale):
+        (destination_path / name).unlink(missing_ok=True)
+
+    index.save()
+    return index
+
+
+def make_variant(source: pathlib.Path, destination: pathlib.Path, width: int) -> None:
+    from PIL import Image
+
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    temporary = temporary_path(destination)
+    try:
+        with Image.open(source) as image:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            resized.save(
+                temporary,
+                format=Image.registered_extensions()[destination.suffix.lower()],
+                optimize=True,
+            )
+        os.chmod(temporary, FILE_MODE)
+        os.replace(temporary, destination)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+def _variant_widths(width: int, widths: tuple[int, ...]) -> list[int]:
+    return sorted(candidate for candidate in set(widths) if candidate < width)
+
+
+def _variant_name(key: str, width: int, source_hash: str) -> str:
+    path = pathlib.PurePosixPath(key)
+    return str(path.with_name(f"{path.stem}.{width}w.{source_hash[:8]}{path.suffix}"))
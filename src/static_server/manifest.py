@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import pathlib
+from dataclasses import asdict, dataclass
+
+from . import __version__
+from .console import log
+from .output import atomic_write, file_hash
+
+
+@dataclass
+class ManifestEntry:
+    source: str
+    source_hash: str
+    template_hash: str
+    version: str
+
+
+@dataclass
+class AssetEntry:
+    source: str
+    size: int
+    mtime_ns: int
+    source_hash: str | None = None
+    minified: bool = False
+    # written by fingerprint_tree rather than copied by sync_files
+    fingerprinted: bool = False
+
+
+@dataclass
+class CompressedEntry:
+    size: int
+    mtime_ns: int
+    # suffixes of the siblings written; empty when no encoding made it smaller
+    siblings: list[str]
+
+
+class BuildManifest:
+    FILENAME = ".build-manifest.json"
+
+    def __init__(
+        self,
+        root: str | pathlib.Path,
+        template_hash: str,
+        entries: dict[str, ManifestEntry] | None = None,
+        assets: dict[str, AssetEntry] | None = None,
+        compressed: dict[str, CompressedEntry] | None = None,
+    ) -> None:
+        self.root = pathlib.Path(root)
+        self.template_hash = template_hash
+        self.entries = entries if entries is not None else {}
+        self.assets = assets if assets is not None else {}
+        self.compressed = compressed if compressed is not None else {}
+        self.seen: set[str] = set()
+        self._source_hashes: dict[pathlib.Path, str] = {}
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self.root / self.FILENAME
+
+    @classmethod
+    def load(
+        cls, root: str | pathlib.Path, template: str | pathlib.Path
+    ) -> BuildManifest:
+        manifest = cls(root, file_hash(template))
+        if not manifest.path.exists():
+            return manifest
+
+        try:
+            with open(manifest.path) as f:
+                raw = json.load(f)
+            entries = {
+                destination: ManifestEntry(**entry)
+                for destination, entry in raw["pages"].items()
+            }
+            assets = {
+                destination: AssetEntry(**entry)
+                for destination, entry in raw.get("assets", {}).items()
+            }
+            compressed = {
+                destination: CompressedEntry(**entry)
+                for destination, entry in raw.get("compressed", {}).items()
+            }
+            manifest.entries, manifest.assets = entries, assets
+            manifest.compressed = compressed
+        except (ValueError, KeyError, TypeError):
+            log(f"ignoring unreadable build manifest {manifest.path.absolute()}")
+
+        return manifest
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self.path) as f:
+            json.dump(
+                {
+                    "version": __version__,
+                    "pages": {
+                        destination: asdict(entry)
+                        for destination, entry in sorted(self.entries.items())
+                    },
+                    "assets": {
+                        destination: asdict(entry)
+                        for destination, entry in sorted(self.assets.items())
+                    },
+                    "compressed": {
+                        destination: asdict(entry)
+                        for destination, entry in sorted(self.compressed.items())
+                    },
+                },
+                f,
+                indent=2,
+            )
+
+    def add_dependency(self, digest: str) -> None:
+        combined = hashlib.sha256(f"{self.template_hash}\0{digest}".encode())
+        self.template_hash = combined.hexdigest()
+
+    def needs_build(
+        self, source: str | pathlib.Path, destination: str | pathlib.Path
+    ) -> bool:
+        key = self.key(destination)
+        self.seen.add(key)
+
+        entry = self.entries.get(key)
+        if entry is None or not pathlib.Path(destination).exists():
+            return True
+
+        return (
+            entry.version != __version__
+            or entry.template_hash != self.template_hash
+            or entry.source_hash != self._source_hash(source)
+        )
+
+    def record(
+        self, source: str | pathlib.Path, destination: str | pathlib.Path
+    ) -> None:
+        key = self.key(destination)
+        self.seen.add(key)
+        self.entries[key] = ManifestEntry(
+            source=str(source),
+            source_hash=self._source_hash(source),
+            template_hash=self.template_hash,
+            version=__version__,
+        )
+
+    def prune(self) -> list[pathlib.Path]:
+        removed = []
+        for key in sorted(set(self.entries) - self.seen):
+            output = self.root / key
+            if output.exists():
+                log(f"removing stale file {output.absolute()}")
+                output.unlink()
+                removed.append(output)
+            del self.entries[key]
+
+        return removed
+
+    def forget(self, source: str | pathlib.Path) -> list[pathlib.Path]:
+        source_path = pathlib.Path(source)
+        removed = []
+        for entries in (self.entries, self.assets):
+            for key in sorted(entries):
+                if not pathlib.Path(entries[key].source).is_relative_to(source_path):
+                    continue
+                output = self.root / key
+                if output.exists():
+                    log(f"removing stale file {output.absolute()}")
+                    output.unlink()
+                    removed.append(output)
+                del entries[key]
+
+        return removed
+
+    def key(self, destination: str | pathlib.Path) -> str:
+        return pathlib.Path(destination).relative_to(self.root).as_posix()
+
+    def _source_hash(self, source: str | pathlib.Path) -> str:
+        source_path = pathlib.Path(source)
+        if source_path not in self._source_hashes:
+            self._source_hashes[source_path] = file_hash(source_path)
+        return self._source_hashes[source_path]
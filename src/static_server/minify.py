@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import pathlib
+import re
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .cache import RenderCache
+from .console import log
+from .output import atomic_write
+
+BLOCK_TAGS = (
+    "html|head|body|title|meta|link|style|script|noscript|base|header|footer|main"
+    "|nav|section|article|aside|h[1-6]|p|div|ul|ol|li|dl|dt|dd|table|thead|tbody"
+    "|tfoot|tr|th|td|blockquote|figure|figcaption|form|fieldset|hr|br|pre|!doctype"
+)
+HTML_PRESERVED_REGEX = re.compile(
+    r"<(pre|code|textarea|script|style)\b[^>]*>.*?</\1\s*>|<!--(?!\[if).*?-->",
+    re.DOTALL | re.IGNORECASE,
+)
+HTML_BLOCK_PRESERVED = frozenset({"pre", "script", "style"})
+HTML_WHITESPACE_REGEX = re.compile(r"\s+")
+HTML_BLOCK_SPACE_REGEX = re.compile(
+    rf"\s*(</?(?:{BLOCK_TAGS})\b[^>]*>)\s*", re.IGNORECASE
+)
+CSS_TOKEN_REGEX = re.compile(
+    r"""(?P<string>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')"""
+    r"|(?P<comment>/\*.*?\*/)",
+    re.DOTALL,
+)
+CSS_PUNCTUATION_REGEX = re.compile(r"\s*([{};,>~])\s*|(:)\s+")
+JS_REGEX_PRECEDERS = frozenset("(,=:[!&|?{}};+-*%<>~^")
+JS_REGEX_KEYWORDS = frozenset(
+    {"return", "typeof", "case", "do", "else", "in", "of", "void", "yield"}
+)
+JS_WORD_REGEX = re.compile(r"(?<![\w$.])([\w$]+)\s*$")
+
+
+def minify_html(html: str) -> str:
+    chunks = []
+    position = 0
+    for match in HTML_PRESERVED_REGEX.finditer(html):
+        chunk = _collapse_html(html[position : match.start()])
+        element = match[0]
+        tag = "" if element.startswith("<!--") else match[1].lower()
+        if tag in HTML_BLOCK_PRESERVED:
+            chunk = chunk.rstrip()
+        if chunks and chunks[-1][1] in HTML_BLOCK_PRESERVED:
+            chunk = chunk.lstrip()
+        chunks.append((chunk, ""))
+
+        if tag == "style":
+            element = _minify_element(element, minify_css)
+        elif tag == "script":
+            element = _minify_element(element, minify_js)
+        elif not tag:
+            element = ""
+        chunks.append((element, tag))
+        position = match.end()
+
+    chunk = _collapse_html(html[position:])
+    if chunks and chunks[-1][1] in HTML_BLOCK_PRESERVED:
+        chunk = chunk.lstrip()
+    chunks.append((chunk, ""))
+    return "".join(chunk for chunk, _ in chunks).strip()
+
+
+def _collapse_html(html: str) -> str:
+    collapsed = HTML_WHITESPACE_REGEX.sub(" ", html)
+    return HTML_BLOCK_SPACE_REGEX.sub(r"\1", collapsed)
+
+
+def _minify_element(element: str, minify: Callable[[str], str]) -> str:
+    open_end = element.index(">") + 1
+    close_start = element.rindex("<")
+    content = element[open_end:close_start]
+    return element[:open_end] + minify(content) + element[close_start:]
+
+
+def minify_css(css: str) -> str:
+    chunks = []
+    position = 0
+    for match in CSS_TOKEN_REGEX.finditer(css):
+        chunks.append(_collapse_css(css[position : match.start()]))
+        if match["string"] is not None or match[0].startswith("/*!"):
+            chunks.append(match[0])
+        position = match.end()
+    chunks.append(_collapse_css(css[position:]))
+    return "".join(chunks).strip()
+
+
+def _collapse_css(css: str) -> str:
+    collapsed = HTML_WHITESPACE_REGEX.sub(" ", css)
+    collapsed = CSS_PUNCTUATION_REGEX.sub(
+        lambda match: match[1] or match[2], collapsed
+    )
+    return collapsed.replace(";}", "}")
+
+
+def minify_js(js: str) -> str:
+    # comments and blank lines go, and each line is trimmed; line breaks stay so
+    # automatic semicolon insertion keeps working
+    output = []
+    line: list[str] = []
+    index = 0
+    length = len(js)
+    previous = ""
+
+    def end_line() -> None:
+        text = "".join(line).strip()
+        if text:
+            output.append(text)
+        line.clear()
+
+    while index < length:
+        char = js[index]
+        following = js[index + 1] if index + 1 < length else ""
+
+        if char in "\"'`":
+            end = _skip_string(js, index)
+            line.append(js[index:end])
+            previous = char
+            index = end
+        elif char == "/" and following == "/":
+            end = js.find("\n", index)
+            index = length if end == -1 else end
+        elif char == "/" and following == "*":
+            end = js.find("*/", index + 2)
+            end = length if end == -1 else end + 2
+            if js.startswith("/*!", index):
+                line.append(js[index:end])
+            elif "\n" in js[index:end]:
+                end_line()
+            else:
+                line.append(" ")
+            index = end
+        elif char == "/" and _regex_allowed(previous, line):
+            end = _skip_regex(js, index)
+            line.append(js[index:end])
+            previous = "/"
+            index = end
+        elif char == "\n":
+            end_line()
+            index += 1
+        else:
+            line.append(char)
+            if not char.isspace():
+                previous = char
+            index += 1
+
+    end_line()
+    return "\n".join(output)
+
+
+def _regex_allowed(previous: str, line: list[str]) -> bool:
+    # a misread division is copied through verbatim, so lean towards regex
+    if previous == "" or previous in JS_REGEX_PRECEDERS:
+        return True
+    word = JS_WORD_REGEX.search("".join(line))
+    return word is not None and word[1] in JS_REGEX_KEYWORDS
+
+
+def _skip_string(js: str, start: int) -> int:
+    quote = js[start]
+    index = start + 1
+    depth = 0
+    while index < len(js):
+        char = js[index]
+        if char == "\\":
+            index += 2
+            continue
+        if quote == "`" and char == "$" and js.startswith("${", index):
+            depth += 1
+            index += 2
+            continue
+        if quote == "`" and depth and char == "}":
+            depth -= 1
+        elif char == quote and not depth:
+            return index + 1
+        elif char == "\n" and quote != "`":
+            return index
+        index += 1
+    return index
+
+
+def _skip_regex(js: str, start: int) -> int:
+    index = start + 1
+    in_class = False
+    while index < len(js):
+        char = js[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == "\n":
+            return index
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            index += 1
+            while index < len(js) and (js[index].isalnum() or js[index] in "_$"):
+                index += 1
+            return index
+        index += 1
+    return index
+
+
+MINIFIERS: dict[str, Callable[[str], str]] = {
+    ".html": minify_html,
+    ".css": minify_css,
+    ".js": minify_js,
+    ".mjs": minify_js,
+}
+
+
+@dataclass
+class MinifyStats:
+    files: int = 0
+    original_bytes: int = 0
+    minified_bytes: int = 0
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.original_bytes - self.minified_bytes
+
+    def __add__(self, other: MinifyStats) -> MinifyStats:
+        return MinifyStats(
+            self.files + other.files,
+            self.original_bytes + other.original_bytes,
+            self.minified_bytes + other.minified_bytes,
+        )
+
+    def __sub__(self, other: MinifyStats) -> MinifyStats:
+        return MinifyStats(
+            self.files - other.files,
+            self.original_bytes - other.original_bytes,
+            self.minified_bytes - other.minified_bytes,
+        )
+
+    def __str__(self) -> str:
+        percent = 0.0
+        if self.original_bytes:
+            percent = 100 * self.saved_bytes / self.original_bytes
+        return (
+            f"{self.files} minified, {self.saved_bytes} bytes saved ({percent:.1f}%)"
+        )
+
+
+@dataclass
+class Minifier:
+    cache: RenderCache | None = None
+    stats: MinifyStats = field(default_factory=MinifyStats)
+
+    def minify(self, suffix: str, text: str) -> str:
+        if self.cache is None:
+            minified = MINIFIERS[suffix](text)
+        else:
+            key = self.cache.key(f"minify{suffix}\0{text}".encode())
+            cached = self.cache.get_text(key)
+            if cached is None:
+                minified = MINIFIERS[suffix](text)
+                self.cache.put_text(key, minified)
+            else:
+                minified = cached
+
+        self.stats.files += 1
+        self.stats.original_bytes += len(text.encode())
+        self.stats.minified_bytes += len(minified.encode())
+        return minified
+
+    def minify_file(self, path: pathlib.Path) -> None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        except UnicodeDecodeError:
+            log(f"skipping minification of non UTF-8 file {path.absolute()}")
+            return
+
+        minified = self.minify(path.suffix, text)
+        if minified == text:
+            return
+
+        # never write through the existing file: it may be a hardlink to the source
+        with atomic_write(path, encoding="utf-8") as f:
+            f.write(minified)
+
+
+def is_minifiable(path: pathlib.Path) -> bool:
+    return path.suffix in MINIFIERS
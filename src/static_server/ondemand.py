@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import hashlib
+import os
+import pathlib
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+from .build import PageRenderError, render_page
+from .cache import BlockCache
+from .console import log
+from .highlight import CLIENT_HIGHLIGHTER, Highlighter, unsupported_languages
+from .serve import Representation, Request, StaticServer, not_modified
+from .template import Template
+from .textblock import Block, BlockList
+
+HTML_TYPE = "text/html; charset=utf-8"
+
+
+@dataclass
+class RenderServer(StaticServer):
+    # pages are rendered from content/ on first request; everything else is
+    # served from the static root, exactly as a build would have copied it
+    content: pathlib.Path = field(default_factory=lambda: pathlib.Path("content"))
+    template: pathlib.Path = field(
+        default_factory=lambda: pathlib.Path("templates/template.html")
+    )
+    jobs: int = 0
+    page_cache_bytes: int = 64 * 1024 * 1024
+    highlight: bool = False
+    block_cache_bytes: int | None = None
+
+    _pages: BlockCache[tuple[Representation, bytes]] | None = field(
+        default=None, repr=False
+    )
+    _rendering: dict[str, asyncio.Task[tuple[Representation, bytes]]] = field(
+        default_factory=dict, repr=False
+    )
+    _executor: ProcessPoolExecutor | None = field(default=None, repr=False)
+
+    async def start(self, host: str, port: int) -> asyncio.Server:
+        # entries are encoded once, so a hit is a lookup and nothing else
+        self._pages = BlockCache(self.page_cache_bytes, sizeof=lambda e: len(e[1]))
+        self._executor = self.create_executor()
+        return await super().start(host, port)
+
+    def create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.jobs or os.cpu_count() or 1,
+            initializer=_init_worker,
+            initargs=(
+                Highlighter() if self.highlight else None,
+                self.block_cache_bytes,
+            ),
+        )
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    async def respond(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        if request.method not in ("GET", "HEAD"):
+            await super().respond(request, writer)
+            return
+
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(request.target).path)
+        path = self.resolve(url_path, self.content)
+        if (
+            path is not None
+            and not url_path.endswith("/")
+            and await asyncio.to_thread(path.is_dir)
+        ):
+            location = urllib.parse.quote(url_path + "/")
+            await self.send_error(
+                writer, 301, request.keep_alive, {"Location": location}, request.method
+            )
+            return
+
+        source = await asyncio.to_thread(self.page_source, url_path, path)
+        if source is None:
+            await super().respond(request, writer)
+        else:
+            await self.respond_page(request, source, writer)
+
+    def page_source(
+        self, url_path: str, path: pathlib.Path | None
+    ) -> pathlib.Path | None:
+        # the same URLs a build would produce: dir/ -> dir/index.md and
+        # page.html -> page.md
+        if path is None:
+            return None
+        if url_path.endswith("/"):
+            source = path / "index.md"
+        elif path.suffix == ".html":
+            source = path.with_suffix(".md")
+        else:
+            return None
+        return source if source.is_file() else None
+
+    async def respond_page(
+        self, request: Request, source: pathlib.Path, writer: asyncio.StreamWriter
+    ) -> None:
+        keep_alive = request.keep_alive
+        try:
+            representation, body = await self.page(source)
+        except PageRenderError as error:
+            log(error)
+            await self.send_error(writer, 500, keep_alive, method=request.method)
+            return
+        except BrokenProcessPool:
+            log(f"render worker died while rendering {source}, pool restarted")
+            await self.send_error(writer, 500, keep_alive, method=request.method)
+            return
+
+        headers = {
+            "Content-Type": representation.content_type,
+            "ETag": representation.etag,
+            "Last-Modified": email.utils.formatdate(representation.mtime, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+        if not_modified(request.headers, representation):
+            await self.send_head(writer, 304, keep_alive, headers)
+            return
+
+        headers["Content-Length"] = str(representation.size)
+        await self.send_head(writer, 200, keep_alive, headers)
+        if request.method != "HEAD":
+            writer.write(body)
+            await writer.drain()
+
+    async def page(self, source: pathlib.Path) -> tuple[Representation, bytes]:
+        if self._pages is None:
+            raise RuntimeError("render server was not started")
+
+        # an edited source or template gives a new key; the stale rendering is
+        # never looked up again and ages out of the LRU
+        try:
+            key, source_stat, template_stat = await asyncio.to_thread(
+                self.version, source
+            )
+        except OSError as error:
+            raise PageRenderError(str(source), repr(error)) from None
+
+        entry = self._pages.get(key)
+        if entry is None:
+            # concurrent requests for the same cold page share one render
+            task = self._rendering.get(key)
+            if task is None:
+                mtime = max(source_stat.st_mtime, template_stat.st_mtime)
+                task = asyncio.create_task(self.render(key, source, mtime))
+                self._rendering[key] = task
+                task.add_done_callback(lambda _: self._rendering.pop(key, None))
+            entry = await asyncio.shield(task)
+        return entry
+
+    def version(
+        self, source: pathlib.Path
+    ) -> tuple[str, os.stat_result, os.stat_result]:
+        source_stat = source.stat()
+        template_stat = self.template.stat()
+        version = (
+            f"{source.resolve()}\0{source_stat.st_mtime_ns}\0{source_stat.st_size}"
+            f"\0{template_stat.st_mtime_ns}\0{template_stat.st_size}"
+        )
+        return hashlib.sha256(version.encode()).hexdigest(), source_stat, template_stat
+
+    def restart_executor(self, broken: ProcessPoolExecutor | None) -> None:
+        # every render in flight on the broken pool fails with it, so only the
+        # first one to notice replaces it
+        if broken is None or self._executor is not broken:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = self.create_executor()
+
+    async def render(
+        self, key: str, source: pathlib.Path, mtime: float
+    ) -> tuple[Representation, bytes]:
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            body = await loop.run_in_executor(
+                executor, render_source, source, self.template
+            )
+        except BrokenProcessPool:
+            # a worker died (killed, out of memory); later requests get a
+            # fresh pool instead of failing until the server is restarted
+            self.restart_executor(executor)
+            raise
+        etag = f'"{key[:32]}"'
+        entry = Representation(source, len(body), mtime, etag, HTML_TYPE), body
+        if self._pages is not None:
+            self._pages.put(key, entry)
+        return entry
+
+
+def render_source(source: pathlib.Path, template: pathlib.Path) -> bytes:
+    try:
+        page_template = Template.from_file(template)
+        with open(source) as f:
+            markdown = f.read()
+        # pages with code no grammar covers keep the client highlighter
+        if Block.highlighter is not None and not unsupported_languages(
+            markdown.splitlines()
+        ):
+            page_template = page_template.without_script(CLIENT_HIGHLIGHTER)
+        # encoded in the worker, off the event loop
+        return render_page(markdown, page_template).encode()
+    except Exception as error:
+        raise PageRenderError(str(source), repr(error)) from None
+
+
+def _init_worker(
+    highlighter: Highlighter | None, block_cache_bytes: int | None
+) -> None:
+    Block.highlighter = highlighter
+    BlockList.block_cache = (
+        None if block_cache_bytes is None else BlockCache(block_cache_bytes)
+    )
+
+
+def serve_rendered(
+    content: str | pathlib.Path = "content",
+    static: str | pathlib.Path = "static",
+    template: str | pathlib.Path = "templates/template.html",
+    host: str = "",
+    port: int = 8888,
+    jobs: int = 0,
+    page_cache_bytes: int = 64 * 1024 * 1024,
+    highlight: bool = False,
+    block_cache_bytes: int | None = None,
+) -> None:
+    async def run() -> None:
+        renderer = RenderServer(
+            pathlib.Path(static),
+            content=pathlib.Path(content),
+            template=pathlib.Path(template),
+            jobs=jobs,
+            page_cache_bytes=page_cache_bytes,
+            highlight=highlight,
+            block_cache_bytes=block_cache_bytes,
+        )
+        server = await renderer.start(host, port)
+        for sock in server.sockets:
+            address, bound_port = sock.getsockname()[:2]
+            log(f"rendering {content} on demand on http://{address}:{bound_port}/")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            renderer.close()
+
+    asyncio.run(run())
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import pathlib
+import tempfile
+from dataclasses import dataclass
+from typing import IO, Any, Iterator
+
+
+def file_hash(path: str | pathlib.Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# temporary files are created 0600; outputs get the usual permissions instead
+FILE_MODE = 0o666 & ~_umask()
+
+
+@dataclass
+class WriteStats:
+    written: int = 0
+    unchanged: int = 0
+
+    def __add__(self, other: WriteStats) -> WriteStats:
+        return WriteStats(
+            self.written + other.written, self.unchanged + other.unchanged
+        )
+
+    def __sub__(self, other: WriteStats) -> WriteStats:
+        return WriteStats(
+            self.written - other.written, self.unchanged - other.unchanged
+        )
+
+    def __str__(self) -> str:
+        return f"{self.written} written, {self.unchanged} unchanged"
+
+
+def temporary_path(destination: pathlib.Path) -> pathlib.Path:
+    fd, name = tempfile.mkstemp(
+        dir=destination.parent, prefix=f".{destination.name}.", suffix=".tmp"
+    )
+    os.close(fd)
+    return pathlib.Path(name)
+
+
+def same_contents(first: pathlib.Path, second: pathlib.Path) -> bool:
+    try:
+        if first.stat().st_size != second.stat().st_size:
+            return False
+    except FileNotFoundError:
+        return False
+    return file_hash(first) == file_hash(second)
+
+
+@contextlib.contextmanager
+def atomic_write(
+    path: str | pathlib.Path,
+    mode: str = "w",
+    encoding: str | None = None,
+    stats: WriteStats | None = None,
+    mtime_ns: int | None = None,
+) -> Iterator[IO[Any]]:
+    # the new contents go to a temporary file that replaces the destination
+    # only if it differs, so readers never see a partial file and identical
+    # rewrites keep their mtime (and are skipped by rsync and CDN uploads)
+    destination = pathlib.Path(path)
+    temporary = temporary_path(destination)
+    try:
+        with open(temporary, mode, encoding=encoding) as f:
+            yield f
+
+        if same_contents(temporary, destination):
+            temporary.unlink()
+            if mtime_ns is not None:
+                os.utime(destination, ns=(mtime_ns, mtime_ns))
+            if stats is not None:
+                stats.unchanged += 1
+            return
+
+        os.chmod(temporary, FILE_MODE)
+        if mtime_ns is not None:
+            os.utime(temporary, ns=(mtime_ns, mtime_ns))
+        os.replace(temporary, destination)
+        if stats is not None:
+            stats.written += 1
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
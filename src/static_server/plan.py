@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import pathlib
+from dataclasses import dataclass, field
+
+from .assets import CopyJob, is_current
+from .build import PageJob, collect_pages
+from .manifest import BuildManifest
+from .tree import scan_tree
+
+
+@dataclass
+class BuildPlan:
+    directories: list[pathlib.Path] = field(default_factory=list)
+    pages: list[PageJob] = field(default_factory=list)
+    assets: list[CopyJob] = field(default_factory=list)
+
+    def create_directories(self) -> None:
+        # sorted, so every parent is created before its children
+        for directory in self.directories:
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def describe(
+        self,
+        manifest: BuildManifest | None = None,
+        checksum: bool = False,
+        minify: bool = False,
+    ) -> list[str]:
+        lines = [
+            f"create {directory}"
+            for directory in self.directories
+            if not directory.is_dir()
+        ]
+        for copy in self.assets:
+            action = "copy"
+            if manifest is not None:
+                key = copy.destination.relative_to(manifest.root).as_posix()
+                entry = manifest.assets.get(key)
+                if is_current(
+                    copy.source, copy.destination, entry, checksum, minify
+                ):
+                    action = "keep"
+            lines.append(f"{action} {copy.source} -> {copy.destination}")
+        for page in self.pages:
+            action = "render"
+            if manifest is not None and not manifest.needs_build(
+                page.source, page.destination
+            ):
+                action = "keep"
+            lines.append(f"{action} {page.source} -> {page.destination}")
+        return lines
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.directories)} directories, {len(self.pages)} pages,"
+            f" {len(self.assets)} static files"
+        )
+
+
+def plan_build(
+    content: str | pathlib.Path,
+    static: str | pathlib.Path,
+    output: str | pathlib.Path,
+) -> BuildPlan:
+    static_path = pathlib.Path(static)
+    output_path = pathlib.Path(output)
+    static_tree = scan_tree(static_path)
+
+    pages = collect_pages(content, output_path)
+    assets = [
+        CopyJob(file, output_path / file.relative_to(static_path))
+        for file in static_tree.files
+    ]
+    directories = {output_path}
+    directories.update(
+        output_path / directory.relative_to(static_path)
+        for directory in static_tree.directories
+    )
+    directories.update(page.destination.parent for page in pages)
+    return BuildPlan(sorted(directories), pages, assets)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import pathlib
+import time
+from dataclasses import dataclass, field
+from typing import Iterator
+
+PAGE_STAGES = (
+    "read",
+    "cache",
+    "block split",
+    "inline parse",
+    "html serialize",
+    "template fill",
+    "minify",
+    "write",
+)
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.stages: dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+
+@dataclass
+class PageProfile:
+    source: str
+    stages: dict[str, float]
+
+    @property
+    def total(self) -> float:
+        return sum(self.stages.values())
+
+
+@dataclass
+class BuildProfile:
+    pages: list[PageProfile] = field(default_factory=list)
+    stages: dict[str, float] = field(default_factory=dict)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def page_totals(self) -> dict[str, float]:
+        totals: dict[str, float] = {}
+        for page in self.pages:
+            for stage, seconds in page.stages.items():
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def slowest(self, count: int = 10) -> list[PageProfile]:
+        return sorted(self.pages, key=lambda page: page.total, reverse=True)[:count]
+
+    def to_json(self) -> dict:
+        return {
+            "build": _rounded(self.stages),
+            "page_totals": _rounded(self.page_totals()),
+            "pages": [
+                {
+                    "source": page.source,
+                    "total": round(page.total, 6),
+                    "stages": _rounded(page.stages),
+                }
+                for page in self.slowest(len(self.pages))
+            ],
+        }
+
+    def save(self, path: str | pathlib.Path) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f, indent=2)
+            f.write("\n")
+
+    def summary(self, count: int = 10) -> str:
+        stages = [
+            stage
+            for stage in PAGE_STAGES
+            if any(stage in page.stages for page in self.pages)
+        ]
+        header = "".join(f"{stage:>15}" for stage in ("total ms", *stages))
+        lines = [f"slowest {min(count, len(self.pages))} pages:", f"{header}  page"]
+        for page in self.slowest(count):
+            cells = [page.total, *(page.stages.get(stage, 0.0) for stage in stages)]
+            row = "".join(f"{seconds * 1000:>15.2f}" for seconds in cells)
+            lines.append(f"{row}  {page.source}")
+
+        lines.append("build stages:")
+        for stage, seconds in self.stages.items():
+            lines.append(f"{seconds * 1000:>15.2f}  {stage}")
+        return "\n".join(lines)
+
+
+def _rounded(stages: dict[str, float]) -> dict[str, float]:
+    return {stage: round(seconds, 6) for stage, seconds in stages.items()}
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import email.utils
+import hashlib
+import mimetypes
+import os
+import pathlib
+import posixpath
+import re
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import ClassVar, Pattern
+
+from .console import log
+from .fingerprint import FINGERPRINT_REGEX
+
+REASONS = {
+    200: "OK",
+    206: "Partial Content",
+    301: "Moved Permanently",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    416: "Range Not Satisfiable",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+HEADER_LIMIT = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+@dataclass
+class Request:
+    method: str
+    target: str
+    version: str
+    headers: dict[str, str]
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+@dataclass
+class Representation:
+    path: pathlib.Path
+    size: int
+    mtime: float
+    etag: str
+    content_type: str
+    encoding: str | None = None
+
+
+@dataclass
+class StaticServer:
+    root: pathlib.Path
+    idle_timeout: float = 15.0
+
+    range_regex: ClassVar[Pattern[str]] = re.compile(r"bytes=(\d*)-(\d*)")
+    _etags: dict[pathlib.Path, tuple[int, int, str]] = field(default_factory=dict)
+
+    async def start(self, host: str, port: int) -> asyncio.Server:
+        return await asyncio.start_server(
+            self.handle, host, port, limit=HEADER_LIMIT, reuse_address=True
+        )
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), self.idle_timeout
+                    )
+                except asyncio.LimitOverrunError:
+                    await self.send_error(writer, 431, keep_alive=False)
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+
+                request = parse_request(head)
+                if request is None:
+                    await self.send_error(writer, 400, keep_alive=False)
+                    break
+
+                length = request.headers.get("content-length", "0")
+                if not length.isdigit():
+                    await self.send_error(writer, 400, keep_alive=False)
+                    break
+                if int(length):
+                    await reader.readexactly(int(length))
+
+                await self.respond(request, writer)
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def respond(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        keep_alive = request.keep_alive
+        if request.method not in ("GET", "HEAD"):
+            await self.send_error(
+                writer, 405, keep_alive, {"Allow": "GET, HEAD"}, request.method
+            )
+            return
+
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(request.target).path)
+        path = self.resolve(url_path)
+        if path is not None and path.is_dir():
+            if not url_path.endswith("/"):
+                location = urllib.parse.quote(url_path + "/")
+                await self.send_error(
+                    writer, 301, keep_alive, {"Location": location}, request.method
+                )
+                return
+            path = path / "index.html"
+
+        if path is None or not path.is_file():
+            await self.send_error(writer, 404, keep_alive, method=request.method)
+            return
+
+        # stat and (for uncached ETags) hashing a large file must not stall
+        # every other connection on the loop
+        representation = await asyncio.to_thread(
+            self.negotiate, path, request.headers
+        )
+        headers = {
+            "Content-Type": representation.content_type,
+            "ETag": representation.etag,
+            "Last-Modified": email.utils.formatdate(representation.mtime, usegmt=True),
+            "Accept-Ranges": "bytes",
+            "Vary": "Accept-Encoding",
+        }
+        if representation.encoding is not None:
+            headers["Content-Encoding"] = representation.encoding
+        if FINGERPRINT_REGEX.search(path.name):
+            headers["Cache-Control"] = "public, max-age=31536000, immutable"
+
+        if not_modified(request.headers, representation):
+            await self.send_head(writer, 304, keep_alive, headers)
+            return
+
+        size = representation.size
+        status, offset, count = 200, 0, size
+        try:
+            byte_range = self.parse_range(request.headers, representation)
+        except RangeNotSatisfiable:
+            headers = {"Content-Range": f"bytes */{size}"}
+            await self.send_error(writer, 416, keep_alive, headers, request.method)
+            return
+        if byte_range is not None:
+            status, (offset, count) = 206, byte_range
+            headers["Content-Range"] = f"bytes {offset}-{offset + count - 1}/{size}"
+
+        headers["Content-Length"] = str(count)
+        await self.send_head(writer, status, keep_alive, headers)
+        if request.method == "HEAD" or count == 0:
+            return
+
+        with open(representation.path, "rb") as f:
+            await asyncio.get_running_loop().sendfile(
+                writer.transport, f, offset, count
+            )
+
+    def resolve(
+        self, url_path: str, root: pathlib.Path | None = None
+    ) -> pathlib.Path | None:
+        normalized = posixpath.normpath(url_path)
+        parts = [part for part in normalized.split("/") if part not in ("", ".")]
+        if ".." in parts or "\0" in normalized:
+            return None
+        return (self.root if root is None else root).joinpath(*parts)
+
+    def negotiate(
+        self, path: pathlib.Path, headers: dict[str, str]
+    ) -> Representation:
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in (
+            "application/javascript",
+            "application/json",
+            "image/svg+xml",
+        ):
+            content_type += "; charset=utf-8"
+
+        stat = path.stat()
+        if accepts_gzip(headers.get("accept-encoding", "")):
+            compressed = path.with_name(path.name + ".gz")
+            try:
+                compressed_stat = compressed.stat()
+            except OSError:
+                compressed_stat = None
+            if (
+                compressed_stat is not None
+                and compressed_stat.st_mtime_ns >= stat.st_mtime_ns
+            ):
+                return Representation(
+                    compressed,
+                    compressed_stat.st_size,
+                    stat.st_mtime,
+                    self.etag(compressed, compressed_stat),
+                    content_type,
+                    "gzip",
+                )
+
+        return Representation(
+            path, stat.st_size, stat.st_mtime, self.etag(path, stat), content_type
+        )
+
+    def etag(self, path: pathlib.Path, stat: os.stat_result) -> str:
+        cached = self._etags.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()[:32]}"'
+        self._etags[path] = (stat.st_mtime_ns, stat.st_size, etag)
+        return etag
+
+    def parse_range(
+        self, headers: dict[str, str], representation: Representation
+    ) -> tuple[int, int] | None:
+        header = headers.get("range")
+        if header is None:
+            return None
+
+        if_range = headers.get("if-range")
+        if if_range is not None and if_range != representation.etag:
+            return None
+
+        match = self.range_regex.fullmatch(header.strip())
+        if match is None or match[0] == "bytes=-":
+            return None
+
+        size = representation.size
+        start, end = match[1], match[2]
+        if not start:
+            count = min(int(end), size)
+            if count == 0:
+                raise RangeNotSatisfiable(header)
+            return size - count, count
+
+        first = int(start)
+        last = min(int(end), size - 1) if end else size - 1
+        if first >= size or last < first:
+            raise RangeNotSatisfiable(header)
+        return first, last - first + 1
+
+    async def send_head(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        keep_alive: bool,
+        headers: dict[str, str],
+    ) -> None:
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}"]
+        lines.append(f"Date: {email.utils.formatdate(time.time(), usegmt=True)}")
+        lines.append("Server: static_server")
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+    async def send_error(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        keep_alive: bool,
+        headers: dict[str, str] | None = None,
+        method: str = "GET",
+    ) -> None:
+        body = f"{status} {REASONS[status]}\n".encode()
+        headers = {
+            **(headers or {}),
+            "Content-Type": "text/plain; charset=utf-8",
+            "Content-Length": str(len(body)),
+        }
+        await self.send_head(writer, status, keep_alive, headers)
+        if method != "HEAD":
+            writer.write(body)
+            await writer.drain()
+
+
+def parse_request(head: bytes) -> Request | None:
+    try:
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        method, target, version = request_line.split(" ")
+    except ValueError:
+        return None
+    if not version.startswith("HTTP/1.") or not target.startswith("/"):
+        return None
+
+    headers = {}
+    for line in header_lines:
+        if not line:
+            continue
+        name, separator, value = line.partition(":")
+        if not separator:
+            return None
+        headers[name.strip().lower()] = value.strip()
+    return Request(method, target, version, headers)
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00")
+    return False
+
+
+def not_modified(headers: dict[str, str], representation: Representation) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or representation.etag in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+    return int(representation.mtime) <= since.timestamp()
+
+
+def serve(root: str | pathlib.Path, host: str = "", port: int = 8888) -> None:
+    async def run() -> None:
+        server = await StaticServer(pathlib.Path(root)).start(host, port)
+        for sock in server.sockets:
+            address, bound_port = sock.getsockname()[:2]
+            log(f"serving {root} on http://{address}:{bound_port}/")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(run())
@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import pathlib
+import pstats
+import shutil
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from .assets import sync_file, sync_files, sync_tree
+from .build import (
+    PageJob,
+    PageRenderer,
+    PageRenderError,
+    collect_pages,
+    render_pages,
+)
+from .cache import RenderCache
+from .compress import compress_files, compress_tree, remove_compressed
+from .console import log
+from .fingerprint import AssetFingerprints, fingerprint_tree, remove_fingerprinted
+from .generations import (
+    activate,
+    create_generation,
+    discard_generation,
+    prune_generations,
+)
+from .highlight import Highlighter
+from .images import ImageIndex, build_image_index
+from .manifest import BuildManifest
+from .minify import Minifier
+from .output import WriteStats
+from .plan import BuildPlan, plan_build
+from .profiling import BuildProfile
+from .template import Template
+from .textblock import Block, BlockList
+from .textnode import TextNode
+
+
+@dataclass
+class Site:
+    content: pathlib.Path = field(default_factory=lambda: pathlib.Path("content"))
+    static: pathlib.Path = field(default_factory=lambda: pathlib.Path("static"))
+    template: pathlib.Path = field(
+        default_factory=lambda: pathlib.Path("templates/template.html")
+    )
+    output: pathlib.Path = field(default_factory=lambda: pathlib.Path("public"))
+    jobs: int = 1
+    render_cache: RenderCache | None = None
+    checksum: bool = False
+    link: bool = False
+    compress: bool = False
+    compress_min_size: int = 1024
+    profile: BuildProfile | None = None
+    fingerprint: bool = False
+    fingerprints: AssetFingerprints | None = field(default=None, repr=False)
+    images: bool = False
+    image_widths: tuple[int, ...] = ()
+    image_index: ImageIndex | None = field(default=None, repr=False)
+    minify: bool = False
+    highlight: bool = False
+    generations: int | None = None
+
+    def build(self, clean: bool = False) -> None:
+        with self._stage("total"):
+            if self.generations is None:
+                self._build(clean)
+            else:
+                self._build_generation(clean)
+
+    def _build_generation(self, clean: bool) -> None:
+        with self._generation(seed=not clean):
+            self._build(clean=False)
+
+    @contextlib.contextmanager
+    def _generation(self, seed: bool) -> Iterator[None]:
+        # write into a fresh directory and only then flip the output symlink,
+        # so the live site never shows a partial build
+        output = self.output
+        generation = create_generation(output, seed=seed)
+        log(f"building generation {generation}")
+        self._set_output(generation)
+        try:
+            yield
+        except BaseException:
+            log(f"build failed, {output} is unchanged")
+            discard_generation(output, generation)
+            raise
+        finally:
+            self._set_output(output)
+
+        activate(output, generation)
+        log(f"switched {output} to {generation}")
+        prune_generations(output, self.generations or 0)
+
+    def _set_output(self, output: pathlib.Path) -> None:
+        self.output = output
+        if self.fingerprints is not None:
+            self.fingerprints.root = output
+        if self.image_index is not None:
+            self.image_index.root = output
+
+    def _build(self, clean: bool) -> None:
+        if clean and self.output.is_symlink():
+            # a plain build after --generations ones: build into a real
+            # directory again and leave the generations for rollback
+            log(f"removing symlink: {self.output.absolute()}")
+            self.output.unlink()
+        elif clean and self.output.exists():
+            log(f"removing path: {self.output.absolute()}")
+            with self._stage("clean"):
+                shutil.rmtree(self.output)
+
+        self._configure_highlighter()
+        with self._stage("plan"):
+            plan = self.plan()
+            plan.create_directories()
+        log(f"build plan: {plan}")
+
+        with self._stage("manifest load"):
+            manifest = BuildManifest.load(self.output, self.template)
+        assets: list[pathlib.Path] = []
+        with self._stage("asset copy"):
+            stats = sync_files(
+                self.static,
+                plan.assets,
+                manifest,
+                checksum=self.checksum,
+                link=self.link,
+                minify=self.minify,
+            )
+        log(
+            f"static files: {len(stats.copied)} copied,"
+            f" {len(stats.unchanged)} unchanged, {len(stats.removed)} removed"
+        )
+        assets.extend(stats.copied + stats.unchanged)
+        if self.fingerprint:
+            with self._stage("fingerprint"):
+                self.fingerprints = fingerprint_tree(
+                    self.static, self.output, self.link, manifest, self.minify
+                )
+            assets.extend(self._fingerprinted())
+        else:
+            remove_fingerprinted(manifest)
+        if self.images:
+            with self._stage("images"):
+                self._index_images()
+        for digest in self._dependencies():
+            manifest.add_dependency(digest)
+
+        try:
+            with self._stage("render"):
+                self._render(plan.pages, manifest, assets)
+        except PageRenderError:
+            manifest.save()
+            raise
+
+        with self._stage("prune"):
+            manifest.prune()
+
+        if self.compress:
+            with self._stage("compress"):
+                compressed = compress_tree(
+                    self.output, self.compress_min_size, self.jobs, manifest
+                )
+            log(f"precompressed files: {compressed}")
+        else:
+            remove_compressed(self.output, manifest)
+        manifest.save()
+        if BlockList.block_cache is not None:
+            log(f"block cache: {BlockList.block_cache.stats}")
+        if self.render_cache is not None:
+            self.render_cache.prune()
+            log(f"render cache: {self.render_cache.stats}")
+
+    def plan(self) -> BuildPlan:
+        return plan_build(self.content, self.static, self.output)
+
+    def dry_run(self) -> None:
+        plan = self.plan()
+        manifest = BuildManifest.load(self.output, self.template)
+        # dependencies come from the previous build's manifests, nothing is written
+        if self.fingerprint and self.fingerprints is None:
+            self.fingerprints = AssetFingerprints.load(self.output)
+        if self.images and self.image_index is None:
+            self.image_index = ImageIndex.load(self.output)
+        for digest in self._dependencies():
+            manifest.add_dependency(digest)
+
+        for line in plan.describe(manifest, self.checksum, self.minify):
+            log(line)
+        log(f"build plan: {plan}")
+
+    def update(self, paths: Iterable[pathlib.Path]) -> list[PageJob]:
+        # with --generations the live generation is updated in place: seeding a
+        # new one hardlinks every output file, and atomic_write already replaces
+        # each file by rename, so the older generations sharing it are untouched
+        self.output.mkdir(parents=True, exist_ok=True)
+        manifest = BuildManifest.load(self.output, self.template)
+        pages: dict[pathlib.Path, PageJob] = {}
+        outputs: list[pathlib.Path] = []
+
+        self._configure_highlighter()
+        paths = sorted(paths)
+        static_changed = any(path.is_relative_to(self.static) for path in paths)
+        previous = self._dependencies()
+        if self.fingerprint and (self.fingerprints is None or static_changed):
+            self.fingerprints = fingerprint_tree(
+                self.static, self.output, self.link, manifest, self.minify
+            )
+            outputs.extend(self._fingerprinted())
+        elif not self.fingerprint:
+            remove_fingerprinted(manifest)
+        if self.images and (self.image_index is None or static_changed):
+            self._index_images()
+        dependencies = self._dependencies()
+        for digest in dependencies:
+            manifest.add_dependency(digest)
+        if dependencies != previous:
+            for page in collect_pages(self.content, self.output):
+                pages[page.source] = page
+
+        for path in paths:
+            if path == self.template or self.template.is_relative_to(path):
+                for page in collect_pages(self.content, self.output):
+                    pages[page.source] = page
+            elif path.is_relative_to(self.content):
+                outputs.extend(self._update_content(path, manifest, pages))
+            elif path.is_relative_to(self.static):
+                outputs.extend(self._update_static(path, manifest))
+
+        try:
+            rendered = self._render(
+                list(pages.values()),
+                manifest,
+                [path for path in outputs if path.is_file()],
+            )
+            if self.compress:
+                outputs.extend(page.destination for page in rendered)
+                compress_files(outputs, self.compress_min_size, self.jobs, manifest)
+            else:
+                remove_compressed(self.output, manifest)
+        finally:
+            manifest.save()
+        return rendered
+
+    def profile_page(self, source: pathlib.Path, path: str | pathlib.Path) -> None:
+        # accept ./content/x.md and absolute paths as well as content/x.md
+        try:
+            relative = source.resolve().relative_to(self.content.resolve())
+        except ValueError:
+            raise ValueError(f"{source} is not a page in {self.content}") from None
+        if source.suffix != ".md" or not source.is_file():
+            raise ValueError(f"{source} is not a page in {self.content}")
+        source = self.content / relative
+        page = PageJob(source, (self.output / relative).with_suffix(".html"))
+        page.destination.parent.mkdir(parents=True, exist_ok=True)
+        renderer = PageRenderer(Template.from_file(self.template))
+
+        profiler = cProfile.Profile()
+        profiler.runcall(renderer.render, page)
+        profiler.dump_stats(path)
+        log(f"cProfile stats for {source} written to {path}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+    def _index_images(self) -> None:
+        self.image_index = build_image_index(
+            self.static, self.output, self.image_widths
+        )
+        TextNode.image_index = self.image_index
+        if BlockList.block_cache is not None:
+            BlockList.block_cache.clear()
+
+    def _configure_highlighter(self) -> None:
+        if self.highlight == (Block.highlighter is not None):
+            return
+        Block.highlighter = Highlighter() if self.highlight else None
+        if BlockList.block_cache is not None:
+            BlockList.block_cache.clear()
+
+    def _dependencies(self) -> list[str]:
+        dependencies = []
+        if self.fingerprint:
+            fingerprints = self.fingerprints
+            dependencies.append("" if fingerprints is None else fingerprints.digest())
+        if self.images:
+            index = self.image_index
+            dependencies.append("" if index is None else index.digest())
+        if self.minify:
+            dependencies.append("minify")
+        if self.highlight:
+            dependencies.append("highlight")
+        return dependencies
+
+    def _fingerprinted(self) -> list[pathlib.Path]:
+        if self.fingerprints is None:
+            return []
+        return [self.output / name for name in self.fingerprints.names.values()]
+
+    def _stage(self, name: str) -> contextlib.AbstractContextManager[None]:
+        if self.profile is None:
+            return contextlib.nullcontext()
+        return self.profile.stage(name)
+
+    def _update_content(
+        self,
+        path: pathlib.Path,
+        manifest: BuildManifest,
+        pages: dict[pathlib.Path, PageJob],
+    ) -> list[pathlib.Path]:
+        if path.is_dir():
+            relative = path.relative_to(self.content)
+            for page in collect_pages(path, self.output / relative):
+                pages[page.source] = page
+        elif path.is_file():
+            if path.suffix == ".md":
+                relative = path.relative_to(self.content)
+                destination = (self.output / relative).with_suffix(".html")
+                pages[path] = PageJob(path, destination)
+        else:
+            return manifest.forget(path)
+        return []
+
+    def _update_static(
+        self, path: pathlib.Path, manifest: BuildManifest
+    ) -> list[pathlib.Path]:
+        destination = self.output / path.relative_to(self.static)
+        if path.is_dir():
+            stats = sync_tree(
+                path, destination, manifest, self.checksum, self.link, self.minify
+            )
+            return stats.copied + stats.removed
+        if path.is_file():
+            if sync_file(
+                path, destination, manifest, self.checksum, self.link, self.minify
+            ):
+                return [destination]
+            return []
+
+        removed = manifest.forget(path)
+        if destination.is_dir():
+            shutil.rmtree(destination)
+        return removed
+
+    def _render(
+        self,
+        pages: list[PageJob],
+        manifest: BuildManifest,
+        assets: list[pathlib.Path],
+    ) -> list[PageJob]:
+        if self.render_cache is not None:
+            # cached page bodies depend on everything that changes block output
+            salt = []
+            if self.images and self.image_index is not None:
+                salt.append(self.image_index.digest())
+            if self.highlight:
+                salt.append("highlight")
+            self.render_cache.salt = "\0".join(salt)
+        minifier = Minifier(self.render_cache) if self.minify else None
+        write_stats = WriteStats()
+        rendered = render_pages(
+            pages,
+            self.template,
+            manifest,
+            jobs=self.jobs,
+            render_cache=self.render_cache,
+            profile=self.profile,
+            fingerprints=self.fingerprints if self.fingerprint else None,
+            minifier=minifier,
+            assets=assets,
+            write_stats=write_stats,
+        )
+        if pages:
+            skipped = len(pages) - len(rendered)
+            log(f"pages: {write_stats}, {skipped} skipped")
+        if minifier is not None and minifier.stats.saved_bytes:
+            log(f"minified files: {minifier.stats}")
+        return rendered
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import io
+import pathlib
+import re
+from dataclasses import dataclass
+from typing import IO, ClassVar, Mapping, Pattern
+
+from .htmlnode import HTMLNode
+
+
+@dataclass(frozen=True)
+class Placeholder:
+    name: str
+    source: str
+
+
+@dataclass(frozen=True)
+class Template:
+    segments: tuple[str | Placeholder, ...]
+
+    placeholder_regex: ClassVar[Pattern[str]] = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+    _cache: ClassVar[dict[pathlib.Path, tuple[int, Template]]] = {}
+
+    @classmethod
+    def parse(cls, text: str) -> Template:
+        segments: list[str | Placeholder] = []
+        position = 0
+        for match in cls.placeholder_regex.finditer(text):
+            if match.start() > position:
+                segments.append(text[position : match.start()])
+            segments.append(Placeholder(match[1], match[0]))
+            position = match.end()
+
+        if position < len(text):
+            segments.append(text[position:])
+
+        return cls(tuple(segments))
+
+    @classmethod
+    def from_file(cls, path: str | pathlib.Path) -> Template:
+        resolved = pathlib.Path(path).resolve()
+        mtime_ns = resolved.stat().st_mtime_ns
+
+        cached = cls._cache.get(resolved)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+
+        with open(resolved) as f:
+            template = cls.parse(f.read())
+        cls._cache[resolved] = (mtime_ns, template)
+        return template
+
+    def without_script(self, name: str) -> Template:
+        script_regex = re.compile(
+            r"""[ \t]*<script\b[^>]*\bsrc=(["'])(?:[^"']*/)?"""
+            rf"{re.escape(name)}\1[^>]*>\s*</script>[ \t]*\n?"
+        )
+        return Template(
+            tuple(
+                segment
+                if isinstance(segment, Placeholder)
+                else script_regex.sub("", segment)
+                for segment in self.segments
+            )
+        )
+
+    def render(self, context: Mapping[str, str | HTMLNode]) -> str:
+        stream = io.StringIO()
+        self.render_to(stream, context)
+        return stream.getvalue()
+
+    def render_to(self, stream: IO[str], context: Mapping[str, str | HTMLNode]) -> None:
+        # a node used more than once is serialised once and the html reused: a
+        # streamed page body cannot be iterated a second time
+        names = [s.name for s in self.segments if isinstance(s, Placeholder)]
+        repeated = {name for name in names if names.count(name) > 1}
+        rendered: dict[str, str] = {}
+        for segment in self.segments:
+            if not isinstance(segment, Placeholder):
+                stream.write(segment)
+                continue
+
+            value = context.get(segment.name)
+            if value is None:
+                stream.write(segment.source)
+            elif isinstance(value, HTMLNode) and segment.name in repeated:
+                if segment.name not in rendered:
+                    rendered[segment.name] = value.to_html()
+                stream.write(rendered[segment.name])
+            elif isinstance(value, HTMLNode):
+                value.write_to(stream)
+            else:
+                stream.write(value)
@@ -1,30 +1,37 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
-from typing import Any, Literal
-
-from .htmlnode import HTMLNode, ParentNode
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from typing import Any, Callable, ClassVar, Iterable, Iterator, Literal, Pattern
+
+from .cache import BlockCache
+from .highlight import Highlighter
+from .htmlnode import HTMLNode, LeafNode, ParentNode
+from .profiling import StageTimer
 from .textnode import TextNode, TextNodeType
 
 
+class BlockType(Enum):
+    PARAGRAPH = auto()
+    HEADING = auto()
+    CODE = auto()
+    QUOTE = auto()
+    UNORDERED_LIST = auto()
+    ORDERED_LIST = auto()
+
+
 @dataclass
 class Block:
     content: str
+    _block_type: BlockType | None = field(default=None, compare=False, repr=False)
+    _lines: list[str] | None = field(default=None, compare=False, repr=False)
+
+    heading_regex: ClassVar[Pattern[str]] = re.compile(r"^#{1,6} ")
+    highlighter: ClassVar[Highlighter | None] = None
 
     def to_html_node(self) -> HTMLNode:
-        if self.is_code():
-            return self._code_to_html_node()
-        elif self.is_heading():
-            return self._heading_to_html_node()
-        elif self.is_ordered_list():
-            return self._ordered_list_to_html_node()
-        elif self.is_unordered_list():
-            return self._unordered_list_to_html_node()
-        elif self.is_quote():
-            return self._quote_to_html_node()
-
-        return self._paragraph_to_html_node()
+        return self.renderers[self.block_type](self)
 
     def _paragraph_to_html_node(self) -> HTMLNode:
         return ParentNode(
@@ -47,12 +54,20 @@ class Block:
     def _code_to_html_node(self) -> HTMLNode:
         language_match = re.match(r"^```(\w+)\s*", self.lines[0])
         language = "plain" if language_match is None else language_match[1]
+        code = "\n".join(self.lines[1:-1])
+        highlighted = None
+        if self.highlighter is not None:
+            highlighted = self.highlighter.highlight(language, code)
         return ParentNode(
             tag="pre",
             children=[
                 ParentNode(
                     tag="code",
-                    children=[TextNode("\n".join(self.lines[1:-1])).to_html_node()],
+                    children=[
+                        TextNode(code).to_html_node()
+                        if highlighted is None
+                        else LeafNode(highlighted)
+                    ],
                     props=({"class": f"language-{language}"}),
                 )
             ],
@@ -105,45 +120,141 @@ class Block:
 
     @property
     def lines(self) -> list[str]:
-        return self.content.split("\n")
+        if self._lines is None:
+            self._lines = self.content.split("\n")
+        return self._lines
 
-    def is_code(self) -> bool:
-        has_start = self.lines[0].startswith("```")
-        has_end = self.lines[-1].startswith("```")
-        has_enough_lines = len(self.lines) >= 2
+    @property
+    def block_type(self) -> BlockType:
+        if self._block_type is None:
+            self._block_type = self.classify(self.lines)
+        return self._block_type
 
-        return has_start and has_end and has_enough_lines
+    @classmethod
+    def classify(cls, lines: list[str]) -> BlockType:
+        first_line = lines[0]
+
+        if first_line.startswith("```"):
+            if len(lines) >= 2 and lines[-1].startswith("```"):
+                return BlockType.CODE
+        elif first_line.startswith("#"):
+            if len(lines) == 1 and cls.heading_regex.match(first_line):
+                return BlockType.HEADING
+        elif first_line.startswith("1. "):
+            if all(
+                line.startswith(f"{line_no}. ")
+                for line_no, line in enumerate(lines, 1)
+            ):
+                return BlockType.ORDERED_LIST
+        elif first_line.startswith(("* ", "- ")):
+            marker = first_line[:2]
+            if all(line.startswith(marker) for line in lines):
+                return BlockType.UNORDERED_LIST
+        elif first_line.startswith("> "):
+            if all(line.startswith("> ") for line in lines):
+                return BlockType.QUOTE
+
+        return BlockType.PARAGRAPH
+
+    def is_code(self) -> bool:
+        return self.block_type is BlockType.CODE
 
     def is_ordered_list(self) -> bool:
-        return all(
-            line.startswith(f"{line_no}. ")
-            for line_no, line in enumerate(self.lines, 1)
-        )
+        return self.block_type is BlockType.ORDERED_LIST
 
     def is_unordered_list(self) -> bool:
-        return all(line.startswith("* ") for line in self.lines) or all(
-            line.startswith("- ") for line in self.lines
-        )
+        return self.block_type is BlockType.UNORDERED_LIST
 
     def is_heading(self) -> bool:
-        has_heading_mark = re.match(r"^#{1,6} ", self.content) is not None
-        has_single_line = len(self.lines) == 1
-        return has_heading_mark and has_single_line
+        return self.block_type is BlockType.HEADING
 
     def is_quote(self) -> bool:
-        return all(line.startswith("> ") for line in self.lines)
+        return self.block_type is BlockType.QUOTE
+
+    renderers: ClassVar[dict[BlockType, Callable[[Block], HTMLNode]]] = {
+        BlockType.PARAGRAPH: _paragraph_to_html_node,
+        BlockType.HEADING: _heading_to_html_node,
+        BlockType.CODE: _code_to_html_node,
+        BlockType.QUOTE: _quote_to_html_node,
+        BlockType.UNORDERED_LIST: _unordered_list_to_html_node,
+        BlockType.ORDERED_LIST: _ordered_list_to_html_node,
+    }
 
 
 class BlockList:
+    block_cache: ClassVar[BlockCache | None] = None
+
     def __init__(self, *blocks: Block):
         self.blocks = list(blocks)
 
     @classmethod
     def from_text(cls, text: str) -> BlockList:
-        preprocessed_text = re.sub(r"\n{2,}", "\n\n", text).strip()
-        return cls(
-            *[Block(block_text) for block_text in preprocessed_text.split("\n\n")]
-        )
+        return cls(*cls.iter_blocks(text.split("\n")))
+
+    @classmethod
+    def iter_blocks(cls, lines: Iterable[str]) -> Iterator[Block]:
+        # Blocks are separated by blank lines and, like the whole document,
+        # stripped of leading and trailing whitespace. The last block is held
+        # back until the next one arrives so it can be stripped at the end.
+        previous: Block | None = None
+        blank_blocks: list[Block] = []
+
+        for block_lines in cls._split_lines(lines):
+            content = "\n".join(block_lines)
+            if not content.strip():
+                if previous is not None:
+                    blank_blocks.append(
+                        Block(content, BlockType.PARAGRAPH, block_lines)
+                    )
+                continue
+
+            if previous is None:
+                stripped = content.lstrip()
+                block = (
+                    Block(stripped)
+                    if stripped != content
+                    else Block(content, Block.classify(block_lines), block_lines)
+                )
+            else:
+                yield previous
+                yield from blank_blocks
+                blank_blocks.clear()
+                block = Block(content, Block.classify(block_lines), block_lines)
+
+            previous = block
+
+        if previous is None:
+            yield Block("", BlockType.PARAGRAPH, [""])
+            return
+
+        stripped = previous.content.rstrip()
+        yield previous if stripped == previous.content else Block(stripped)
+
+    @classmethod
+    def _split_lines(
+        cls, lines: Iterable[str], fences: bool = True
+    ) -> Iterator[list[str]]:
+        current: list[str] = []
+        in_fence = False
+
+        for line in lines:
+            line = line.removesuffix("\n")
+            if in_fence:
+                current.append(line)
+                in_fence = not line.startswith("```")
+            elif line == "":
+                if current:
+                    yield current
+                    current = []
+            else:
+                in_fence = fences and not current and line.startswith("```")
+                current.append(line)
+
+        if in_fence:
+            # an unterminated fence is not a code block: split it like text
+            yield from cls._split_lines(current, fences=False)
+        elif current:
+            yield current
 
     @staticmethod
     def get_title(text: str) -> str:
@@ -153,11 +264,39 @@ class BlockList:
 
         return re.split(r"# ", first_line)[1].strip()
 
-    def to_html_node(self) -> HTMLNode:
+    def to_html_node(self, timer: StageTimer | None = None) -> HTMLNode:
         return ParentNode(
-            tag="div", children=[block.to_html_node() for block in self.blocks]
+            tag="div",
+            children=[self.render_block(block, timer) for block in self.blocks],
         )
 
+    @classmethod
+    def render_block(cls, block: Block, timer: StageTimer | None = None) -> HTMLNode:
+        if cls.block_cache is None:
+            return block.to_html_node()
+
+        key = block.content
+        if TextNode.image_index is not None and "![" in key:
+            # image dimensions of relative sources depend on the page's directory
+            key = f"{TextNode.page_base}\0{key}"
+        html = cls.block_cache.get(key)
+        if html is None:
+            # a missed block is serialised here, so a profile splits the two
+            node = block.to_html_node()
+            if timer is not None:
+                timer.lap("inline parse")
+            html = node.to_html()
+            if timer is not None:
+                timer.lap("html serialize")
+            cls.block_cache.put(key, html)
+        return LeafNode(html)
+
+    @classmethod
+    def stream_html_node(cls, lines: Iterable[str]) -> HTMLNode:
+        # children are produced while serialising, so only one block is held in
+        # memory at a time
+        return ParentNode(tag="div", children=BlockStream(cls, lines))
+
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, BlockList):
             raise ValueError("BlockList can only be compared to BlockList")
@@ -169,3 +308,23 @@ class BlockList:
         )
 
         return is_equalsize and is_matched
+
+
+class BlockStream:
+    # Re-iterable when the lines are (a list, a str.split result); a one-shot
+    # iterator such as an open file can only be rendered once, and a second
+    # pass raises instead of silently producing an empty page.
+    def __init__(self, block_list: type[BlockList], lines: Iterable[str]) -> None:
+        self.block_list = block_list
+        self.lines = lines
+        self.consumed = False
+
+    def __iter__(self) -> Iterator[HTMLNode]:
+        if iter(self.lines) is self.lines:
+            if self.consumed:
+                raise RuntimeError("a streamed page body can only be rendered once")
+            self.consumed = True
+        return (
+            self.block_list.render_block(block)
+            for block in self.block_list.iter_blocks(self.lines)
+        )
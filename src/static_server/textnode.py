@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import re
-from typing import Any, Callable, ClassVar, Pattern
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, Pattern
 from enum import Enum, auto
 from typing import Optional
 
@@ -9,6 +10,9 @@ from dataclasses import dataclass
 
 from .htmlnode import LeafNode
 
+if TYPE_CHECKING:
+    from .images import ImageIndex
+
 
 class TextNodeType(Enum):
     NORMAL = auto()
@@ -21,7 +25,13 @@ class TextNodeType(Enum):
     UNMARKED_CHECKBOX = auto()
 
 
-@dataclass
+MARKED_CHECKBOX_PROPS = MappingProxyType(
+    {"type": "checkbox", "checked": None, "disabled": None}
+)
+UNMARKED_CHECKBOX_PROPS = MappingProxyType({"type": "checkbox", "disabled": None})
+
+
+@dataclass(frozen=True, slots=True)
 class TextNode:
     content: str
     node_type: TextNodeType = TextNodeType.NORMAL
@@ -29,6 +39,9 @@ class TextNode:
 
     img_regex: ClassVar[Pattern[str]] = re.compile(r"\!\[(.*?)\]\((.*?)\)")
     link_regex: ClassVar[Pattern[str]] = re.compile(r"(?<!\!)\[(.*?)\]\((.*?)\)")
+    image_index: ClassVar[ImageIndex | None] = None
+    # directory of the page being rendered, relative to the site root
+    page_base: ClassVar[str] = ""
 
     def to_html_node(self):
         match self.node_type:
@@ -52,23 +65,18 @@ class TextNode:
             case TextNodeType.IMG:
                 if self.url is None:
                     raise ValueError("TextNode with Image type MUST have url")
-                return LeafNode(
-                    tag="img", value="", props={"src": self.url, "alt": self.content}
-                )
+                props = {"src": self.url, "alt": self.content}
+                if TextNode.image_index is not None:
+                    props.update(
+                        TextNode.image_index.attributes(self.url, TextNode.page_base)
+                    )
+                return LeafNode(tag="img", value="", props=props)
 
             case TextNodeType.MARKED_CHECKBOX:
-                return LeafNode(
-                    tag="input",
-                    value="",
-                    props={"type": "checkbox", "checked": None, "disabled": None},
-                )
+                return LeafNode(tag="input", value="", props=MARKED_CHECKBOX_PROPS)
 
             case TextNodeType.UNMARKED_CHECKBOX:
-                return LeafNode(
-                    tag="input",
-                    value="",
-                    props={"type": "checkbox", "disabled": None},
-                )
+                return LeafNode(tag="input", value="", props=UNMARKED_CHECKBOX_PROPS)
             case _:  # pragma: no cover
                 raise ValueError()  # pragma: no cover
 
@@ -101,20 +109,25 @@ class TextNode:
         if self.content == "":
             return TextNodeList()
 
-        re_delim = delimiter.replace("*", r"\*")
-        if re.search(rf"{re_delim}.*?{re_delim}", self.content) is None:
+        re_delim = re.escape(delimiter)
+        pattern = re.compile(rf"{re_delim}.*?{re_delim}")
+        if pattern.search(self.content) is None:
             return TextNodeList(self)
 
-        start, delimited, rest = self.content.split(delimiter, 2)
-        return TextNodeList(
-            TextNode(content=start, node_type=self.node_type),
-            TextNode(content=delimited, node_type=node_type),
-            *(
-                TextNode(content=rest, node_type=self.node_type)
-                ._parse_delimiter(delimiter, node_type)
-                .nodes
-            ),
-        )
+        nodes = []
+        position = 0
+        while pattern.search(self.content, position) is not None:
+            start = self.content.index(delimiter, position)
+            end = self.content.index(delimiter, start + len(delimiter))
+            delimited = self.content[start + len(delimiter) : end]
+            nodes.append(TextNode(self.content[position:start], self.node_type))
+            nodes.append(TextNode(delimited, node_type))
+            position = end + len(delimiter)
+
+        if position < len(self.content):
+            nodes.append(TextNode(self.content[position:], self.node_type))
+
+        return TextNodeList(*nodes)
 
     def _parse_regex(
         self, regex: Pattern[str], node_type: TextNodeType
@@ -123,17 +136,96 @@ class TextNode:
         if not regex_match:
             return TextNodeList(self)
 
-        re_span = regex_match.span()
-        return TextNodeList(
-            TextNode(self.content[: re_span[0]], self.node_type),
-            TextNode(regex_match[1], node_type, url=regex_match[2]),
-            *(
-                TextNode(self.content[re_span[1] :], self.node_type)
-                ._parse_regex(regex, node_type)
-                .nodes
+        nodes = []
+        position = 0
+        while regex_match:
+            start = regex_match.start()
+            nodes.append(TextNode(self.content[position:start], self.node_type))
+            nodes.append(TextNode(regex_match[1], node_type, url=regex_match[2]))
+            position = regex_match.end()
+            regex_match = regex.search(self.content, position)
+
+        nodes.append(TextNode(self.content[position:], self.node_type))
+        return TextNodeList(*nodes)
+
+
+class InlineScanner:
+    token_regex: ClassVar[Pattern[str]] = re.compile(r"!\[|\[|\*\*|\*|`")
+    delimiters: ClassVar[dict[str, TextNodeType]] = {
+        "**": TextNodeType.BOLD,
+        "*": TextNodeType.ITALIC,
+        "`": TextNodeType.CODE,
+    }
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self._found: dict[str, tuple[int, int]] = {}
+
+    def scan(self) -> list[TextNode]:
+        nodes = []
+        position = search = 0
+        while (token := self.token_regex.search(self.text, search)) is not None:
+            start = token.start()
+            node, end = self._token_at(start, token[0])
+            if node is None:
+                search = start + len(token[0])
+                continue
+
+            if start > position:
+                nodes.append(TextNode(self.text[position:start]))
+            nodes.append(node)
+            position = search = end
+
+        if position < len(self.text):
+            nodes.append(TextNode(self.text[position:]))
+
+        return nodes
+
+    def _token_at(self, start: int, token: str) -> tuple[TextNode | None, int]:
+        line_end = self._find("\n", start)
+        if line_end == -1:
+            line_end = len(self.text)
+
+        if token in self.delimiters:
+            end = self._find(token, start + len(token))
+            if end == -1 or end >= line_end:
+                return None, start
+
+            content = self.text[start + len(token) : end]
+            return TextNode(content, self.delimiters[token]), end + len(token)
+
+        label_end = self._find("]", start + len(token))
+        if (
+            label_end == -1
+            or label_end >= line_end
+            or not self.text.startswith("(", label_end + 1)
+        ):
+            return None, start
+
+        url_end = self._find(")", label_end + 2)
+        if url_end == -1 or url_end >= line_end:
+            return None, start
+
+        return (
+            TextNode(
+                self.text[start + len(token) : label_end],
+                TextNodeType.IMG if token == "![" else TextNodeType.LINK,
+                url=self.text[label_end + 2 : url_end],
             ),
+            url_end + 1,
         )
 
+    def _find(self, needle: str, start: int) -> int:
+        # scanning only moves forward, so a previous lookup stays valid until
+        # the scan passes the occurrence it found
+        searched_from, found = self._found.get(needle, (len(self.text) + 1, 0))
+        if searched_from <= start and (found == -1 or found >= start):
+            return found
+
+        found = self.text.find(needle, start)
+        self._found[needle] = (start, found)
+        return found
+
 
 class TextNodeList:
     def __init__(
@@ -152,7 +244,13 @@ class TextNodeList:
         return [node.to_html_node() for node in self.nodes]
 
     def parse_all(self) -> TextNodeList:
-        return self.parse_image().parse_link().parse_bold().parse_italic().parse_code()
+        nodes = []
+        for node in self.nodes:
+            if node.node_type is TextNodeType.NORMAL:
+                nodes.extend(InlineScanner(node.content).scan())
+            else:
+                nodes.append(node)
+        return TextNodeList(*nodes)
 
     def parse_bold(self) -> TextNodeList:
         return self._parse_nodes(TextNode.parse_bold)
@@ -172,7 +270,10 @@ class TextNodeList:
     def _parse_nodes(
         self, parse_method: Callable[[TextNode], TextNodeList]
     ) -> TextNodeList:
-        return TextNodeList(*sum([parse_method(node).nodes for node in self.nodes], []))
+        nodes = []
+        for node in self.nodes:
+            nodes.extend(parse_method(node).nodes)
+        return TextNodeList(*nodes)
 
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, TextNodeList):
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import os
+import pathlib
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Tree:
+    root: pathlib.Path
+    directories: list[pathlib.Path] = field(default_factory=list)
+    files: list[pathlib.Path] = field(default_factory=list)
+
+
+def scan_tree(root: str | pathlib.Path) -> Tree:
+    # one scandir per directory; DirEntry caches the file type, so no extra
+    # stat calls are made and an explicit stack avoids recursion limits.
+    # Like Path.rglob, symlinked directories are listed but not descended into.
+    tree = Tree(pathlib.Path(root))
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        tree.directories.append(pathlib.Path(entry.path))
+                        if not entry.is_symlink():
+                            stack.append(entry.path)
+                    elif entry.is_file():
+                        tree.files.append(pathlib.Path(entry.path))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+
+    tree.directories.sort()
+    tree.files.sort()
+    return tree
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import pathlib
+import select
+import struct
+import time
+from typing import Callable, Iterable, Protocol
+
+from .console import log
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Watcher(Protocol):
+    def wait(self, timeout: float | None = None) -> set[pathlib.Path]: ...
+
+    def close(self) -> None: ...
+
+
+class InotifyWatcher:
+    def __init__(self, roots: Iterable[str | pathlib.Path]) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self.roots = [pathlib.Path(root) for root in roots]
+        self._watches: dict[int, pathlib.Path] = {}
+        for root in self.roots:
+            self._add_tree(root)
+
+    def wait(self, timeout: float | None = None) -> set[pathlib.Path]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                changed.update(self.roots)
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if not name:
+                changed.add(directory)
+                continue
+
+            path = directory / os.fsdecode(name)
+            changed.add(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                changed.update(self._add_tree(path))
+
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+    def _add_tree(self, root: pathlib.Path) -> list[pathlib.Path]:
+        files = []
+        if not root.is_dir():
+            return files
+
+        self._add_watch(root)
+        for path in sorted(root.rglob("*")):
+            if path.is_dir():
+                self._add_watch(path)
+            else:
+                files.append(path)
+        return files
+
+    def _add_watch(self, directory: pathlib.Path) -> None:
+        wd = self._libc.inotify_add_watch(
+            self.fd, os.fsencode(directory), WATCH_MASK
+        )
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(directory))
+        self._watches[wd] = directory
+
+
+class PollingWatcher:
+    def __init__(
+        self, roots: Iterable[str | pathlib.Path], interval: float = 0.5
+    ) -> None:
+        self.roots = [pathlib.Path(root) for root in roots]
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def wait(self, timeout: float | None = None) -> set[pathlib.Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed:
+                return changed
+
+            remaining = self.interval
+            if deadline is not None:
+                remaining = min(remaining, deadline - time.monotonic())
+                if remaining <= 0:
+                    return set()
+            time.sleep(remaining)
+
+    def close(self) -> None:
+        pass
+
+    def _scan(self) -> dict[pathlib.Path, tuple[int, int]]:
+        snapshot = {}
+        for root in self.roots:
+            if root.is_file():
+                stat = root.stat()
+                snapshot[root] = (stat.st_mtime_ns, stat.st_size)
+                continue
+
+            for directory, _, files in os.walk(root):
+                for name in files:
+                    path = pathlib.Path(directory, name)
+                    try:
+                        stat = path.stat()
+                    except FileNotFoundError:
+                        continue
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+
+def create_watcher(
+    roots: Iterable[str | pathlib.Path], polling: bool = False
+) -> Watcher:
+    roots = list(roots)
+    if not polling:
+        try:
+            return InotifyWatcher(roots)
+        except (AttributeError, OSError) as error:
+            log(f"inotify unavailable ({error}), falling back to polling")
+    return PollingWatcher(roots)
+
+
+def debounce(watcher: Watcher, delay: float = 0.05) -> set[pathlib.Path]:
+    changed = watcher.wait()
+    while True:
+        more = watcher.wait(delay)
+        if not more:
+            return changed
+        changed |= more
+
+
+def watch(
+    watcher: Watcher,
+    on_change: Callable[[set[pathlib.Path]], object],
+    delay: float = 0.05,
+) -> None:
+    try:
+        while True:
+            on_change(debounce(watcher, delay))
+    finally:
+        watcher.close()
@@ -0,0 +1,90 @@
+import os
+import pathlib
+
+import pytest
+
+from static_server.assets import copy_file, sync_tree
+from static_server.manifest import BuildManifest
+
+
+@pytest.fixture
+def tree(tmp_path: pathlib.Path) -> pathlib.Path:
+    (tmp_path / "static" / "images").mkdir(parents=True)
+    (tmp_path / "static" / "index.css").write_text("body {}")
+    (tmp_path / "static" / "images" / "logo.png").write_bytes(b"\x89PNG data")
+    (tmp_path / "template.html").write_text("{{ Content }}")
+    return tmp_path
+
+
+def sync(tree: pathlib.Path, **kwargs):
+    manifest = BuildManifest.load(tree / "public", tree / "template.html")
+    stats = sync_tree(tree / "static", tree / "public", manifest, **kwargs)
+    manifest.save()
+    return stats
+
+
+def test_first_sync_copies_everything(tree):
+    stats = sync(tree)
+
+    assert len(stats.copied) == 2
+    assert (tree / "public" / "images" / "logo.png").read_bytes() == b"\x89PNG data"
+
+
+def test_second_sync_copies_nothing(tree):
+    sync(tree)
+
+    stats = sync(tree)
+
+    assert stats.copied == []
+    assert len(stats.unchanged) == 2
+
+
+def test_changed_file_is_recopied(tree):
+    sync(tree)
+    (tree / "static" / "index.css").write_text("body { color: red; }")
+
+    stats = sync(tree)
+
+    assert stats.copied == [tree / "public" / "index.css"]
+    assert (tree / "public" / "index.css").read_text() == "body { color: red; }"
+
+
+def test_checksum_ignores_touched_files(tree):
+    sync(tree, checksum=True)
+    os.utime(tree / "static" / "index.css", ns=(0, 0))
+
+    stats = sync(tree, checksum=True)
+
+    assert stats.copied == []
+
+
+def test_orphans_are_removed_but_pages_kept(tree):
+    sync(tree)
+    (tree / "public" / "index.html").write_text("<p>generated page</p>")
+    (tree / "static" / "index.css").unlink()
+
+    stats = sync(tree)
+
+    assert stats.removed == [tree / "public" / "index.css"]
+    assert (tree / "public" / "index.html").exists()
+
+
+def test_link_mode_hardlinks(tree):
+    sync(tree, link=True)
+
+    source = (tree / "static" / "index.css").stat()
+    copied = (tree / "public" / "index.css").stat()
+    assert source.st_ino == copied.st_ino
+
+
+def test_copy_does_not_write_through_hardlinks(tree):
+    source = tree / "static" / "index.css"
+    other = tree / "other.css"
+    other.write_text("other")
+    destination = tree / "linked.css"
+    os.link(source, destination)
+
+    copy_file(other, destination)
+
+    assert source.read_text() == "body {}"
+    assert destination.read_text() == "other"
@@ -0,0 +1,76 @@
+import pytest
+
+from benchmarks.compare import compare
+from benchmarks.corpus import CorpusSpec, generate_corpus
+from benchmarks.stages import STAGES, run_stage
+from static_server import BlockList
+
+
+def test_corpus_is_deterministic():
+    spec = CorpusSpec(pages=5, page_size=2048)
+
+    assert generate_corpus(spec) == generate_corpus(spec)
+    assert generate_corpus(spec) != generate_corpus(CorpusSpec(pages=5, seed=1))
+
+
+def test_corpus_knobs():
+    spec = CorpusSpec(pages=20, page_size=4096, depth=3, fanout=2, inline_density=0)
+    corpus = generate_corpus(spec)
+
+    assert len(corpus) == 20
+    assert {len(path.parts) for path in corpus} == {4}
+    assert all(len(text) >= 4096 for text in corpus.values())
+    assert not any("**" in text or "](" in text for text in corpus.values())
+
+
+def test_corpus_block_mix():
+    spec = CorpusSpec(pages=1, page_size=20_000, code_ratio=1, list_ratio=0)
+    text = next(iter(generate_corpus(spec).values()))
+
+    block_types = {block.block_type.name for block in BlockList.from_text(text).blocks}
+
+    assert block_types == {"HEADING", "CODE"}
+
+
+@pytest.mark.parametrize("stage", STAGES)
+def test_run_stage_reports_throughput(stage):
+    measurement = run_stage(stage, CorpusSpec(pages=3, page_size=1024), repeat=1)
+
+    assert measurement.pages == 3
+    assert measurement.pages_per_second > 0
+    assert measurement.mb_per_second > 0
+    assert measurement.peak_bytes > 0
+
+
+def test_compare_flags_regressions():
+    baseline = {
+        "stages": {
+            "html": {
+                "pages_per_second": 100,
+                "mb_per_second": 10,
+                "peak_memory_bytes": 1000,
+            }
+        }
+    }
+    report = {
+        "stages": {
+            "html": {
+                "pages_per_second": 95,
+                "mb_per_second": 5,
+                "peak_memory_bytes": 2000,
+            },
+            "blocks": {
+                "pages_per_second": 1,
+                "mb_per_second": 1,
+                "peak_memory_bytes": 1,
+            },
+        }
+    }
+
+    regressions = compare(report, baseline, threshold=0.1)
+
+    assert [(r.stage, r.metric) for r in regressions] == [
+        ("html", "mb_per_second"),
+        ("html", "peak_memory_bytes"),
+    ]
+    assert str(regressions[0]) == "html: mb_per_second 10 -> 5 (-50.0%)"
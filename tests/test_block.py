@@ -1,6 +1,6 @@
 import pytest
 
-from md_to_html.textblock import Block, BlockList
+from md_to_html.textblock import Block, BlockList, BlockType
 
 
 def test_simple_block_conversion():
@@ -69,3 +69,56 @@ def test_extract_title_error():
     )
     with pytest.raises(ValueError):
         BlockList.get_title(markdown)
+
+
+def test_blocks_are_tagged_while_scanning():
+    example_text = "# title\n\n* a\n* b\n\n1. a\n2. b\n\n> quote\n\n```\ncode\n```\n\ntext"
+
+    computed = BlockList.from_text(example_text)
+
+    assert [block.block_type for block in computed.blocks] == [
+        BlockType.HEADING,
+        BlockType.UNORDERED_LIST,
+        BlockType.ORDERED_LIST,
+        BlockType.QUOTE,
+        BlockType.CODE,
+        BlockType.PARAGRAPH,
+    ]
+
+
+def test_fenced_code_keeps_blank_lines():
+    example_text = "before\n\n```python\nimport os\n\n\nos.getcwd()\n```\n\nafter"
+
+    computed = BlockList.from_text(example_text)
+
+    assert computed == BlockList(
+        Block("before"),
+        Block("```python\nimport os\n\n\nos.getcwd()\n```"),
+        Block("after"),
+    )
+
+
+def test_unterminated_fence_is_split_as_text():
+    example_text = "```\nnot code\n\nanother block"
+
+    computed = BlockList.from_text(example_text)
+
+    assert computed == BlockList(Block("```\nnot code"), Block("another block"))
+
+
+def test_document_whitespace_is_stripped():
+    example_text = "  \n\n   first\n\n   \n\nlast   \n\n  \n"
+
+    computed = BlockList.from_text(example_text)
+
+    assert computed == BlockList(Block("first"), Block("   "), Block("last"))
+
+
+def test_iter_blocks_accepts_file_lines(tmp_path):
+    path = tmp_path / "page.md"
+    path.write_text("# title\n\nsome text\nmore text\n")
+
+    with open(path) as f:
+        blocks = list(BlockList.iter_blocks(f))
+
+    assert blocks == [Block("# title"), Block("some text\nmore text")]
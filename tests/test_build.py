@@ -0,0 +1,118 @@
+import io
+import pathlib
+import tracemalloc
+
+import pytest
+
+from static_server.build import (
+    PageJob,
+    PageRenderError,
+    collect_pages,
+    generate_folder,
+    generate_page,
+    render_page,
+    stream_page,
+)
+from static_server.template import Template
+from static_server.textblock import BlockList
+
+
+@pytest.fixture
+def site(tmp_path: pathlib.Path) -> pathlib.Path:
+    for index in range(6):
+        page = tmp_path / "content" / f"section_{index % 2}" / f"page_{index}.md"
+        page.parent.mkdir(parents=True, exist_ok=True)
+        page.write_text(f"# Page {index}\n\nSome **bold** text number {index}")
+    (tmp_path / "content" / "index.md").write_text("# Home\n\nhello")
+    (tmp_path / "template.html").write_text("<title>{{ Title }}</title>{{ Content }}")
+    return tmp_path
+
+
+def read_outputs(root: pathlib.Path) -> dict[str, str]:
+    return {
+        path.relative_to(root).as_posix(): path.read_text()
+        for path in sorted(root.rglob("*.html"))
+    }
+
+
+def test_render_page():
+    html = render_page("# Title\n\ntext", "<h1>{{ Title }}</h1>{{ Content }}")
+    assert html == "<h1>Title</h1><div><h1>Title</h1><p>text</p></div>"
+
+
+def test_collect_pages_is_sorted_and_mirrors_tree(site):
+    pages = collect_pages(site / "content", site / "public")
+
+    assert pages[0] == PageJob(
+        site / "content" / "index.md", site / "public" / "index.html"
+    )
+    assert [page.source for page in pages] == sorted(page.source for page in pages)
+    assert len(pages) == 7
+
+
+def test_parallel_output_matches_sequential(site):
+    generate_folder(site / "content", site / "template.html", site / "serial")
+    generate_folder(site / "content", site / "template.html", site / "parallel", jobs=3)
+
+    assert read_outputs(site / "serial") == read_outputs(site / "parallel")
+    assert len(read_outputs(site / "parallel")) == 7
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_render_error_names_failing_file(site, jobs):
+    broken = site / "content" / "section_1" / "page_3.md"
+    broken.write_text("no title here")
+
+    with pytest.raises(PageRenderError) as error:
+        generate_folder(site / "content", site / "template.html", site / "out", jobs=jobs)
+
+    assert error.value.source == str(broken)
+    assert str(broken) in str(error.value)
+
+
+def test_stream_page_matches_render_page(full_markdown):
+    template = Template.parse("<title>{{ Title }}</title>{{ Content }}")
+    stream = io.StringIO()
+
+    stream_page(io.StringIO(full_markdown), template, stream)
+
+    assert stream.getvalue() == render_page(full_markdown, template)
+
+
+def test_streamed_content_can_be_used_twice_in_a_template():
+    template = Template.parse("{{ Content }}<hr>{{ Content }}")
+    stream = io.StringIO()
+
+    stream_page(io.StringIO("# Title\n\ntext"), template, stream)
+
+    body = "<div><h1>Title</h1><p>text</p></div>"
+    assert stream.getvalue() == f"{body}<hr>{body}"
+
+
+def test_streamed_body_is_rerendered_from_lines_or_refuses_a_second_pass():
+    lines = ["# Title", "", "text"]
+    node = BlockList.stream_html_node(lines)
+    assert node.to_html() == node.to_html() == "<div><h1>Title</h1><p>text</p></div>"
+
+    node = BlockList.stream_html_node(iter(lines))
+    node.to_html()
+    with pytest.raises(RuntimeError, match="only be rendered once"):
+        node.to_html()
+
+
+def test_streaming_memory_is_bounded_by_block_size(tmp_path):
+    source = tmp_path / "big.md"
+    with open(source, "w") as f:
+        f.write("# Changelog\n\n")
+        for index in range(20_000):
+            f.write(f"* change number {index} with **bold** text\n* and `code`\n\n")
+    (tmp_path / "template.html").write_text("{{ Content }}")
+
+    tracemalloc.start()
+    generate_page(source, tmp_path / "template.html", tmp_path / "big.html")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert source.stat().st_size > 1_000_000
+    assert peak < source.stat().st_size / 5
+    assert (tmp_path / "big.html").read_text().endswith("<code>code</code></li></ul></div>")
@@ -0,0 +1,172 @@
+import os
+
+import pytest
+
+from static_server.build import generate_folder
+from static_server.cache import BlockCache, CacheStats, RenderCache
+from static_server.textblock import BlockList
+
+
+@pytest.fixture
+def block_cache():
+    yield BlockCache(1024 * 1024)
+    BlockList.block_cache = None
+
+
+def test_get_and_put():
+    cache = BlockCache(100)
+
+    assert cache.get("key") is None
+    cache.put("key", "value")
+
+    assert cache.get("key") == "value"
+    assert cache.stats == CacheStats(hits=1, misses=1, evictions=0)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = BlockCache(25)
+    cache.put("a", "x" * 9)
+    cache.put("b", "x" * 9)
+    cache.get("a")
+
+    cache.put("c", "x" * 9)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.size <= 25
+    assert cache.stats.evictions == 1
+
+
+def test_oversized_entries_are_not_stored():
+    cache = BlockCache(10)
+    cache.put("key", "x" * 100)
+    assert len(cache) == 0
+
+
+def test_replacing_entry_keeps_size_accurate():
+    cache = BlockCache(100)
+    cache.put("key", "x" * 10)
+    cache.put("key", "x" * 20)
+    assert cache.size == 23
+
+
+def test_blocklist_rendering_uses_cache(block_cache, full_markdown):
+    expected = BlockList.from_text(full_markdown).to_html_node().to_html()
+    BlockList.block_cache = block_cache
+
+    first = BlockList.from_text(full_markdown).to_html_node().to_html()
+    second = BlockList.from_text(full_markdown).to_html_node().to_html()
+
+    assert first == second == expected
+    assert block_cache.stats.hits == block_cache.stats.misses == 7
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_build_reports_cache_stats(block_cache, tmp_path, jobs):
+    for index in range(4):
+        (tmp_path / f"page_{index}.md").write_text(f"# Page {index}\n\nshared disclaimer")
+    (tmp_path / "template.html").write_text("{{ Content }}")
+    BlockList.block_cache = block_cache
+
+    generate_folder(tmp_path, tmp_path / "template.html", tmp_path / "public", jobs=jobs)
+
+    stats = block_cache.stats
+    assert stats.hits + stats.misses == 8
+    assert stats.hits >= 4 - jobs
+    assert (tmp_path / "public" / "page_3.html").read_text() == (
+        "<div><h1>Page 3</h1><p>shared disclaimer</p></div>"
+    )
+
+
+@pytest.fixture
+def render_cache(tmp_path):
+    return RenderCache(tmp_path / "cache", 1024 * 1024, "1.0")
+
+
+def test_render_cache_round_trip(render_cache):
+    key = render_cache.key(b"# Title\n\ntext")
+
+    assert render_cache.get(key) is None
+    render_cache.put(key, "Title", "<div>text</div>")
+
+    assert render_cache.get(key) == ("Title", "<div>text</div>")
+    assert render_cache.stats == CacheStats(hits=1, misses=1, evictions=0)
+
+
+@pytest.mark.parametrize(
+    "contents", ["{}", "[]", '{"title": "Title"}', '{"title": 1, "html": 2}', "{"]
+)
+def test_malformed_render_cache_entries_are_misses(render_cache, contents):
+    key = render_cache.key(b"# Title\n\ntext")
+    path = render_cache.directory / key[:2] / key
+    path.parent.mkdir(parents=True)
+    path.write_text(contents)
+
+    assert render_cache.get(key) is None
+    assert not path.exists()
+    render_cache.put(key, "Title", "<div>text</div>")
+    assert render_cache.get(key) == ("Title", "<div>text</div>")
+
+
+def test_render_cache_key_depends_on_version(render_cache, tmp_path):
+    other = RenderCache(tmp_path / "cache", 1024, "2.0")
+    assert render_cache.key(b"same") != other.key(b"same")
+
+
+def test_render_cache_key_depends_on_salt(render_cache):
+    unsalted = render_cache.key(b"same")
+
+    render_cache.salt = "image index digest"
+
+    assert render_cache.key(b"same") != unsalted
+
+
+def test_block_cache_clear():
+    cache = BlockCache(100)
+    cache.put("a", "b")
+
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_render_cache_prune_evicts_oldest(render_cache):
+    for index in range(3):
+        key = render_cache.key(str(index).encode())
+        render_cache.put(key, "t", "x" * 100)
+        path = render_cache.directory / key[:2] / key
+        os.utime(path, ns=(index, index))
+    entry_size = path.stat().st_size
+    render_cache.max_bytes = 2 * entry_size
+
+    assert render_cache.prune() == 1
+    assert render_cache.get(render_cache.key(b"0")) is None
+    assert render_cache.get(render_cache.key(b"2")) is not None
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_warm_render_cache_skips_rendering(render_cache, tmp_path, jobs):
+    for index in range(3):
+        (tmp_path / f"page_{index}.md").write_text(f"# Page {index}\n\n*text*")
+    (tmp_path / "template.html").write_text("<title>{{ Title }}</title>{{ Content }}")
+
+    generate_folder(
+        tmp_path,
+        tmp_path / "template.html",
+        tmp_path / "cold",
+        jobs=jobs,
+        render_cache=render_cache,
+    )
+    generate_folder(
+        tmp_path,
+        tmp_path / "template.html",
+        tmp_path / "warm",
+        jobs=jobs,
+        render_cache=render_cache,
+    )
+
+    assert render_cache.stats == CacheStats(hits=3, misses=3, evictions=0)
+    assert (tmp_path / "warm" / "page_1.html").read_text() == (
+        (tmp_path / "cold" / "page_1.html").read_text()
+    )
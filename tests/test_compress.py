@@ -0,0 +1,121 @@
+import gzip
+import os
+import pathlib
+import zlib
+
+import pytest
+
+from static_server.compress import compress_files, compress_tree
+from static_server.manifest import AssetEntry, BuildManifest
+
+
+@pytest.fixture
+def public(tmp_path: pathlib.Path) -> pathlib.Path:
+    (tmp_path / "css").mkdir()
+    (tmp_path / "index.html").write_text("<p>hello</p>" * 200)
+    (tmp_path / "css" / "site.css").write_text("body { margin: 0 }\n" * 100)
+    (tmp_path / "small.js").write_text("run()")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" * 1000)
+    return tmp_path
+
+
+def test_writes_gzip_and_zlib_siblings(public):
+    stats = compress_tree(public)
+
+    html = (public / "index.html").read_bytes()
+    assert gzip.decompress((public / "index.html.gz").read_bytes()) == html
+    assert zlib.decompress((public / "index.html.zz").read_bytes()) == html
+    assert sorted(path.name for path in stats.compressed) == ["index.html", "site.css"]
+    assert 0 < stats.compressed_bytes < stats.original_bytes
+
+
+def test_skips_small_and_incompressible_types(public):
+    compress_tree(public)
+
+    assert not (public / "small.js.gz").exists()
+    assert not (public / "logo.png.gz").exists()
+
+
+def test_up_to_date_siblings_are_skipped(public):
+    compress_tree(public)
+
+    stats = compress_tree(public)
+
+    assert stats.compressed == []
+    assert len(stats.unchanged) == 2
+    assert stats.saved_bytes > 0
+
+
+def test_rewritten_source_is_recompressed(public):
+    compress_tree(public)
+    (public / "index.html").write_text("<p>changed</p>" * 200)
+
+    stats = compress_files([public / "index.html"])
+
+    assert stats.compressed == [public / "index.html"]
+    assert gzip.decompress((public / "index.html.gz").read_bytes()).startswith(
+        b"<p>changed</p>"
+    )
+
+
+@pytest.fixture
+def manifest(public):
+    return BuildManifest(public, "")
+
+
+def test_orphaned_siblings_are_removed(public, manifest):
+    compress_tree(public, manifest=manifest)
+    (public / "index.html").unlink()
+    (public / "archive.tar.gz").write_bytes(b"not a sibling")
+
+    compress_tree(public, manifest=manifest)
+
+    assert not (public / "index.html.gz").exists()
+    assert not (public / "index.html.zz").exists()
+    assert (public / "archive.tar.gz").exists()
+    assert "index.html" not in manifest.compressed
+
+
+def test_precompressed_static_files_are_never_removed(public, manifest):
+    (public / "data.json.gz").write_bytes(gzip.compress(b"{}"))
+    (public / "small.js.gz").write_bytes(gzip.compress(b"run()"))
+
+    compress_tree(public, manifest=manifest)
+    compress_tree(public, manifest=manifest)
+
+    assert gzip.decompress((public / "data.json.gz").read_bytes()) == b"{}"
+    assert gzip.decompress((public / "small.js.gz").read_bytes()) == b"run()"
+
+
+def test_static_sibling_wins_over_the_compressed_one(public, manifest):
+    static = gzip.compress(b"precompressed by hand")
+    (public / "index.html.gz").write_bytes(static)
+    manifest.assets["index.html.gz"] = AssetEntry("static/index.html.gz", 0, 0)
+
+    compress_tree(public, manifest=manifest)
+
+    assert (public / "index.html.gz").read_bytes() == static
+    assert (public / "index.html.zz").exists()
+    assert manifest.compressed["index.html"].siblings == [".zz"]
+
+
+def test_files_that_do_not_shrink_are_not_recompressed(public, manifest):
+    (public / "noise.txt").write_bytes(os.urandom(4096))
+
+    compress_tree(public, manifest=manifest)
+    stats = compress_tree(public, manifest=manifest)
+
+    assert not (public / "noise.txt.gz").exists()
+    assert manifest.compressed["noise.txt"].siblings == []
+    assert public / "noise.txt" in stats.unchanged
+    assert stats.compressed == []
+
+
+def test_parallel_matches_serial(public):
+    compress_tree(public, jobs=1)
+    serial = (public / "css" / "site.css.gz").read_bytes()
+    (public / "css" / "site.css.gz").unlink()
+
+    compress_tree(public, jobs=4)
+
+    assert (public / "css" / "site.css.gz").read_bytes() == serial
@@ -0,0 +1,168 @@
+import asyncio
+import pathlib
+import socket
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from static_server import __main__
+from static_server.client import request
+from static_server.console import log
+from static_server.daemon import BuildDaemon, claim_socket
+from static_server.site import Site
+from static_server.textblock import BlockList
+
+
+@pytest.fixture
+def site(tmp_path: pathlib.Path) -> Site:
+    (tmp_path / "content").mkdir()
+    (tmp_path / "content" / "index.md").write_text("# Home\n\nhello")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "template.html").write_text("{{ Content }}")
+    return Site(
+        content=tmp_path / "content",
+        static=tmp_path / "static",
+        template=tmp_path / "templates" / "template.html",
+        output=tmp_path / "public",
+    )
+
+
+@pytest.fixture
+def daemon(site, tmp_path):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    async def start():
+        daemon = BuildDaemon(site, tmp_path / "daemon.sock")
+        return daemon, await daemon.start()
+
+    daemon, server = asyncio.run_coroutine_threadsafe(start(), loop).result()
+    yield daemon
+    server.close()
+    asyncio.run_coroutine_threadsafe(server.wait_closed(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def send(daemon, **message):
+    return request(message, daemon.socket_path, timeout=10)
+
+
+def test_build_request_builds_the_site_and_returns_its_log(daemon, site):
+    response = send(daemon, command="build")
+
+    assert response["ok"]
+    assert "generating file" in response["output"]
+    assert (site.output / "index.html").read_text() == "<div><h1>Home</h1><p>hello</p></div>"
+
+    response = send(daemon, command="build")
+    assert "pages: 0 written, 0 unchanged, 1 skipped" in response["output"]
+
+
+def test_render_request_rebuilds_one_changed_file(daemon, site):
+    send(daemon, command="build")
+    (site.content / "about.md").write_text("# About\n\nus")
+
+    response = send(daemon, command="render", paths=[str(site.content / "about.md")])
+
+    assert response["ok"]
+    assert response["rendered"] == [str(site.output / "about.html")]
+    assert (site.output / "about.html").read_text() == "<div><h1>About</h1><p>us</p></div>"
+
+
+def test_build_log_does_not_capture_other_threads(site, capsys):
+    daemon = BuildDaemon(site)
+    stdout = sys.stdout
+
+    def job():
+        assert sys.stdout is stdout
+        log("from the build")
+        thread = threading.Thread(target=log, args=("from elsewhere",))
+        thread.start()
+        thread.join()
+
+    response = daemon.run("build", job)
+
+    assert response["output"] == "from the build\n"
+    assert capsys.readouterr().out == "from elsewhere\n"
+
+
+def test_render_rejects_paths_outside_the_site(daemon, tmp_path):
+    response = send(daemon, command="render", paths=[str(tmp_path / "elsewhere.md")])
+
+    assert not response["ok"]
+    assert "not part of the site" in response["error"]
+
+
+def test_failed_build_is_reported_and_the_daemon_keeps_running(daemon, site):
+    site.template.unlink()
+
+    response = send(daemon, command="build")
+
+    assert not response["ok"]
+    assert send(daemon, command="stats")["stats"]["failures"] == 1
+
+
+def test_stats_count_requests_and_builds(daemon):
+    send(daemon, command="build")
+    send(daemon, command="nonsense")
+
+    stats = send(daemon, command="stats")["stats"]
+
+    assert stats["requests"] == 3
+    assert stats["builds"] == 1
+    assert stats["busy"] is False
+    assert "last_build_ms" in stats
+
+
+def test_stop_request_releases_the_daemon(daemon):
+    assert send(daemon, command="stop") == {"ok": True}
+    assert daemon._stopped.is_set()
+
+
+def test_stale_socket_is_replaced_but_a_live_one_is_not(tmp_path):
+    path = tmp_path / "stale.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(str(path))
+        listener.listen()
+        with pytest.raises(OSError, match="already listening"):
+            claim_socket(path)
+
+    claim_socket(path)
+    assert not path.exists()
+
+    path.write_text("not a socket")
+    with pytest.raises(FileExistsError):
+        claim_socket(path)
+
+
+def test_client_does_not_import_the_renderer():
+    # run in a fresh interpreter: this one has long since imported everything
+    code = (
+        "import sys, static_server.client;"
+        "print('static_server.textblock' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout == "False\n"
+
+
+def test_daemon_renders_in_its_own_process(site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(BlockList, "block_cache", None)
+    daemons = []
+    monkeypatch.setattr(
+        __main__, "run_daemon", lambda site, socket_path: daemons.append(site)
+    )
+
+    __main__.main(["daemon", "--jobs", "4"])
+
+    assert [daemon.jobs for daemon in daemons] == [1]
+    assert BlockList.block_cache is not None
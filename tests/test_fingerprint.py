@@ -0,0 +1,177 @@
+import pathlib
+
+import pytest
+
+from static_server.fingerprint import (
+    FINGERPRINT_REGEX,
+    AssetFingerprints,
+    fingerprint_tree,
+    fingerprinted_name,
+)
+from static_server.site import Site
+
+
+@pytest.fixture
+def fingerprints(tmp_path: pathlib.Path) -> AssetFingerprints:
+    return AssetFingerprints(
+        tmp_path,
+        {
+            "index.css": "index.1234abcd.css",
+            "images/logo.png": "images/logo.5678ef90.png",
+        },
+    )
+
+
+def test_fingerprinted_name():
+    assert fingerprinted_name("index.css", "1234abcd99") == "index.1234abcd.css"
+    assert fingerprinted_name("jquery.min.js", "1234abcd99") == "jquery.min.1234abcd.js"
+    assert fingerprinted_name("LICENSE", "1234abcd99") == "LICENSE.1234abcd"
+    assert FINGERPRINT_REGEX.search("index.1234abcd.css")
+    assert not FINGERPRINT_REGEX.search("index.css")
+
+
+@pytest.mark.parametrize(
+    "url, base, expected",
+    [
+        ("/index.css", "", "/index.1234abcd.css"),
+        ("index.css", "", "index.1234abcd.css"),
+        ("../index.css?v=1#top", "blog", "../index.1234abcd.css?v=1#top"),
+        ("/images/logo.png", "blog", "/images/logo.5678ef90.png"),
+        ("images/logo.png", "blog", "images/logo.png"),
+        ("https://example.com/index.css", "", "https://example.com/index.css"),
+        ("#index.css", "", "#index.css"),
+    ],
+)
+def test_rewrite_url(fingerprints, url, base, expected):
+    assert fingerprints.rewrite_url(url, base) == expected
+
+
+def test_rewrite_html(fingerprints):
+    html = "<link href='/index.css'><img src=\"/images/logo.png\" alt=\"/index.css\">"
+
+    assert fingerprints.rewrite_html(html) == (
+        "<link href='/index.1234abcd.css'>"
+        '<img src="/images/logo.5678ef90.png" alt="/index.css">'
+    )
+
+
+def test_fingerprint_tree_copies_and_cleans_up(tmp_path):
+    (tmp_path / "static" / "css").mkdir(parents=True)
+    (tmp_path / "static" / "css" / "site.css").write_text("body {}")
+    (tmp_path / "public").mkdir()
+
+    first = fingerprint_tree(tmp_path / "static", tmp_path / "public")
+    old = tmp_path / "public" / first.names["css/site.css"]
+    (tmp_path / "static" / "css" / "site.css").write_text("body { margin: 0 }")
+    second = fingerprint_tree(tmp_path / "static", tmp_path / "public")
+
+    new = tmp_path / "public" / second.names["css/site.css"]
+    assert new.read_text() == "body { margin: 0 }"
+    assert not old.exists()
+    assert AssetFingerprints.load(tmp_path / "public").names == second.names
+
+
+@pytest.fixture
+def site(tmp_path: pathlib.Path) -> Site:
+    (tmp_path / "content" / "blog").mkdir(parents=True)
+    (tmp_path / "content" / "index.md").write_text("# Home\n\n![logo](/logo.png)")
+    (tmp_path / "content" / "blog" / "post.md").write_text("# Post\n\ntext")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "static" / "logo.png").write_bytes(b"png")
+    (tmp_path / "static" / "site.css").write_text("body {}")
+    (tmp_path / "template.html").write_text('<link href="/site.css">{{ Content }}')
+    site = Site(
+        content=tmp_path / "content",
+        static=tmp_path / "static",
+        template=tmp_path / "template.html",
+        output=tmp_path / "public",
+        fingerprint=True,
+    )
+    site.build()
+    return site
+
+
+def test_build_rewrites_template_and_content(site):
+    names = site.fingerprints.names
+    index = (site.output / "index.html").read_text()
+
+    assert f'href="/{names["site.css"]}"' in index
+    assert f'src="/{names["logo.png"]}"' in index
+    post = (site.output / "blog" / "post.html").read_text()
+    assert f'href="/{names["site.css"]}"' in post
+    assert (site.output / names["site.css"]).read_text() == "body {}"
+    assert (site.output / "site.css").exists()
+
+
+def test_changed_asset_rebuilds_pages_with_new_name(site):
+    (site.static / "site.css").write_text("body { color: red }")
+
+    rendered = site.update({site.static / "site.css"})
+
+    assert len(rendered) == 2
+    new_name = site.fingerprints.names["site.css"]
+    assert f'href="/{new_name}"' in (site.output / "index.html").read_text()
+
+
+def test_rewrite_srcset(fingerprints):
+    html = '<img srcset="/images/logo.png 2x, /images/other.png 1x">'
+
+    assert fingerprints.rewrite_html(html) == (
+        '<img srcset="/images/logo.5678ef90.png 2x, /images/other.png 1x">'
+    )
+
+
+def test_urls_inside_pre_and_code_are_not_rewritten(fingerprints):
+    html = (
+        '<link href="/index.css"><pre><code><link href="/index.css"></code></pre>'
+        '<p><code>src="/images/logo.png"</code> <img src="/images/logo.png"></p>'
+    )
+
+    assert fingerprints.rewrite_html(html) == (
+        '<link href="/index.1234abcd.css">'
+        '<pre><code><link href="/index.css"></code></pre>'
+        '<p><code>src="/images/logo.png"</code>'
+        ' <img src="/images/logo.5678ef90.png"></p>'
+    )
+
+
+def test_code_samples_with_asset_urls_are_left_alone(site):
+    source = site.content / "blog" / "post.md"
+    source.write_text(
+        '# Post\n\n```\n<link href="/site.css">\n```\n\nuse `src="/logo.png"`'
+    )
+
+    site.update({source})
+
+    post = (site.output / "blog" / "post.html").read_text()
+    names = site.fingerprints.names
+    assert post.startswith(f'<link href="/{names["site.css"]}">')
+    assert '<link href="/site.css"></code>' in post
+    assert '<code>src="/logo.png"</code>' in post
+
+
+def test_build_without_fingerprints_removes_them(site):
+    names = dict(site.fingerprints.names)
+    assert (site.output / AssetFingerprints.FILENAME).exists()
+
+    site.fingerprint = False
+    site.build()
+
+    assert not (site.output / AssetFingerprints.FILENAME).exists()
+    for name in names.values():
+        assert not (site.output / name).exists()
+    assert (site.output / "site.css").exists()
+    assert (site.output / "logo.png").exists()
+
+
+def test_fingerprinted_copies_follow_the_minify_flag(site):
+    (site.static / "site.css").write_text("body {\n  margin: 0;\n}\n")
+    site.minify = True
+    site.build()
+    fingerprinted = site.output / site.fingerprints.names["site.css"]
+    assert fingerprinted.read_text() == "body{margin:0}"
+
+    site.minify = False
+    site.build()
+
+    assert fingerprinted.read_text() == "body {\n  margin: 0;\n}\n"
@@ -0,0 +1,182 @@
+import os
+import pathlib
+
+import pytest
+
+from static_server import generations
+from static_server.build import PageRenderError
+from static_server.generations import list_generations, rollback
+from static_server.site import Site
+
+
+@pytest.fixture
+def site(tmp_path: pathlib.Path) -> Site:
+    (tmp_path / "content").mkdir()
+    (tmp_path / "content" / "index.md").write_text("# Home\n\nhello")
+    (tmp_path / "content" / "about.md").write_text("# About\n\nus")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "static" / "style.css").write_text("body {}")
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "template.html").write_text("{{ Content }}")
+    return Site(
+        content=tmp_path / "content",
+        static=tmp_path / "static",
+        template=tmp_path / "templates" / "template.html",
+        output=tmp_path / "public",
+        generations=1,
+    )
+
+
+def test_output_is_a_symlink_to_the_new_generation(site):
+    site.build()
+
+    assert site.output.is_symlink()
+    assert os.readlink(site.output) == os.path.join("public.generations", "000001")
+    assert (site.output / "index.html").read_text() == "<div><h1>Home</h1><p>hello</p></div>"
+
+
+def test_unchanged_files_are_hardlinked_from_the_previous_generation(site):
+    site.build()
+    (site.content / "index.md").write_text("# Home\n\nchanged")
+
+    site.build()
+
+    first, second = list_generations(site.output)
+    assert os.readlink(site.output).endswith(second.name)
+    for name in ("about.html", "style.css"):
+        assert (first / name).stat().st_ino == (second / name).stat().st_ino
+    assert (first / "index.html").read_text() == "<div><h1>Home</h1><p>hello</p></div>"
+    assert (second / "index.html").read_text() == "<div><h1>Home</h1><p>changed</p></div>"
+    manifest = ".build-manifest.json"
+    assert (first / manifest).stat().st_ino != (second / manifest).stat().st_ino
+
+
+def test_old_generations_are_pruned(site):
+    for _ in range(4):
+        site.build()
+
+    assert [path.name for path in list_generations(site.output)] == [
+        "000003",
+        "000004",
+    ]
+
+
+def test_failed_build_leaves_the_live_generation_alone(site):
+    site.build()
+    (site.content / "index.md").write_text("no title")
+
+    with pytest.raises(PageRenderError):
+        site.build()
+
+    assert os.readlink(site.output).endswith("000001")
+    assert len(list_generations(site.output)) == 1
+
+
+def test_plain_output_directory_is_migrated(site):
+    site.generations = None
+    site.build()
+    site.generations = 1
+
+    site.build()
+
+    assert site.output.is_symlink()
+    assert [path.name for path in list_generations(site.output)] == [
+        "000000",
+        "000001",
+    ]
+
+
+def test_migration_swaps_the_directory_without_a_gap(site, monkeypatch):
+    site.generations = None
+    site.build()
+    site.generations = 1
+    swapped = []
+    real_exchange = generations.exchange
+
+    def exchange(first, second):
+        swapped.append(second)
+        return real_exchange(first, second)
+
+    monkeypatch.setattr(generations, "exchange", exchange)
+
+    site.build()
+
+    assert swapped == [site.output]
+    old = generations.generations_root(site.output) / "000000"
+    assert (old / "index.html").read_text() == "<div><h1>Home</h1><p>hello</p></div>"
+    assert not site.output.with_name(".public.link").exists()
+
+
+def test_failed_migration_leaves_the_plain_directory_alone(site):
+    site.generations = None
+    site.build()
+    site.generations = 1
+    (site.content / "index.md").write_text("no title")
+
+    with pytest.raises(PageRenderError):
+        site.build()
+
+    assert not site.output.is_symlink()
+    assert list_generations(site.output) == []
+
+
+def test_update_writes_into_the_live_generation(site):
+    site.build()
+    site.build()
+    first, second = list_generations(site.output)
+    assert (first / "index.html").samefile(second / "index.html")
+    (site.content / "index.md").write_text("# Home\n\nchanged")
+
+    site.update({site.content / "index.md"})
+
+    assert list_generations(site.output) == [first, second]
+    assert os.readlink(site.output).endswith(second.name)
+    assert (first / "index.html").read_text() == "<div><h1>Home</h1><p>hello</p></div>"
+    assert (second / "index.html").read_text() == (
+        "<div><h1>Home</h1><p>changed</p></div>"
+    )
+
+
+def test_failed_update_leaves_the_live_generation_alone(site):
+    site.build()
+    (site.content / "index.md").write_text("no title")
+
+    with pytest.raises(PageRenderError):
+        site.update({site.content / "index.md"})
+
+    assert [path.name for path in list_generations(site.output)] == ["000001"]
+    assert (site.output / "index.html").read_text() == (
+        "<div><h1>Home</h1><p>hello</p></div>"
+    )
+
+
+def test_clean_plain_build_replaces_the_symlink(site):
+    site.build()
+    site.generations = None
+
+    site.build(clean=True)
+
+    assert site.output.is_dir() and not site.output.is_symlink()
+    assert [path.name for path in list_generations(site.output)] == ["000001"]
+
+    site.generations = 1
+    site.build()
+    assert [path.name for path in list_generations(site.output)] == [
+        "000002",
+        "000003",
+    ]
+    generation = rollback(site.output)
+    assert generation.name == "000002"
+
+
+def test_rollback_switches_to_the_previous_generation(site):
+    site.build()
+    (site.content / "index.md").write_text("# Home\n\nchanged")
+    site.build()
+
+    generation = rollback(site.output)
+
+    assert generation.name == "000001"
+    assert (site.output / "index.html").read_text() == "<div><h1>Home</h1><p>hello</p></div>"
+    with pytest.raises(ValueError):
+        rollback(site.output)
@@ -0,0 +1,140 @@
+import pytest
+
+from static_server.highlight import Highlighter, unsupported_languages
+from static_server.site import Site
+from static_server.textblock import Block, BlockList
+
+
+@pytest.fixture(autouse=True)
+def reset_highlighter():
+    yield
+    Block.highlighter = None
+
+
+def test_python_tokens():
+    html = Highlighter().highlight("python", "def f(x):\n    return x  # done")
+
+    assert html == (
+        '<span class="token keyword">def</span> '
+        '<span class="token function">f</span>'
+        '<span class="token punctuation">(</span>x'
+        '<span class="token punctuation">)</span>'
+        '<span class="token punctuation">:</span>\n    '
+        '<span class="token keyword">return</span> x  '
+        '<span class="token comment"># done</span>'
+    )
+
+
+def test_strings_hide_keywords_and_comments():
+    html = Highlighter().highlight("js", "let s = 'if // not a comment';")
+
+    assert '<span class="token string">\'if // not a comment\'</span>' in html
+    assert "comment" not in html.replace("not a comment", "")
+
+
+def test_text_is_escaped():
+    html = Highlighter().highlight("js", "a < b && c")
+
+    assert "&lt;" in html and "&amp;&amp;" in html and "<b" not in html
+
+
+def test_markup_tags_match_prism_structure():
+    html = Highlighter().highlight("html", '<a href="/x">')
+
+    assert html == (
+        '<span class="token tag"><span class="token tag">'
+        '<span class="token punctuation">&lt;</span>a</span> '
+        '<span class="token attr-name">href</span>'
+        '<span class="token attr-value">'
+        '<span class="token punctuation attr-equals">=</span>'
+        '<span class="token punctuation">"</span>/x'
+        '<span class="token punctuation">"</span></span>'
+        '<span class="token punctuation">&gt;</span></span>'
+    )
+
+
+def test_unknown_language_is_not_highlighted():
+    assert Highlighter().highlight("elflang", "func main() {}") is None
+
+
+def test_results_are_memoised():
+    highlighter = Highlighter()
+    highlighter.highlight("python", "x = 1")
+    highlighter.highlight("python", "x = 1")
+    highlighter.highlight("js", "x = 1")
+
+    assert (highlighter.cache.stats.hits, highlighter.cache.stats.misses) == (1, 2)
+
+
+def test_code_blocks_use_the_highlighter():
+    Block.highlighter = Highlighter()
+
+    html = BlockList.from_text("```python\nNone\n```").to_html_node().to_html()
+
+    assert html == (
+        '<div><pre><code class="language-python">'
+        '<span class="token boolean">None</span></code></pre></div>'
+    )
+
+
+def test_site_highlights_and_drops_client_script(tmp_path):
+    (tmp_path / "content").mkdir()
+    (tmp_path / "content" / "index.md").write_text("# Home\n\n```js\nlet a\n```")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "template.html").write_text(
+        '<script src="/prism.js"></script>{{ Content }}'
+    )
+    site = Site(
+        content=tmp_path / "content",
+        static=tmp_path / "static",
+        template=tmp_path / "templates" / "template.html",
+        output=tmp_path / "public",
+        highlight=True,
+    )
+
+    site.build()
+
+    html = (site.output / "index.html").read_text()
+    assert "prism.js" not in html
+    assert '<span class="token keyword">let</span> a' in html
+
+    site.highlight = False
+    site.build()
+
+    html = (site.output / "index.html").read_text()
+    assert '<script src="/prism.js"></script>' in html
+    assert "token" not in html
+
+
+def test_unsupported_languages():
+    markdown = "```python\nx\n```\n\n```rust\nfn f()\n```\n\n```\nplain\n```"
+
+    assert unsupported_languages(markdown.splitlines()) == {"rust", "plain"}
+    assert unsupported_languages(["```Python", "x", "```"]) == set()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_pages_with_unsupported_code_keep_the_client_script(tmp_path, capsys, jobs):
+    (tmp_path / "content").mkdir()
+    (tmp_path / "content" / "index.md").write_text("# Home\n\n```js\nlet a\n```")
+    (tmp_path / "content" / "rust.md").write_text("# Rust\n\n```rust\nfn f()\n```")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "template.html").write_text(
+        '<script src="/prism.js"></script>{{ Content }}'
+    )
+    site = Site(
+        content=tmp_path / "content",
+        static=tmp_path / "static",
+        template=tmp_path / "templates" / "template.html",
+        output=tmp_path / "public",
+        highlight=True,
+        jobs=jobs,
+    )
+
+    site.build()
+
+    assert "prism.js" not in (site.output / "index.html").read_text()
+    assert "prism.js" in (site.output / "rust.html").read_text()
+    assert "no server-side highlighting for rust code" in capsys.readouterr().out
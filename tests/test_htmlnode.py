@@ -1,3 +1,5 @@
+import io
+
 import pytest
 
 from md_to_html.htmlnode import HTMLNode, LeafNode, ParentNode
@@ -102,3 +104,34 @@ def test_nested_parent_node():
     )
     assert parent_3.to_html() == expected_html
     
+
+
+def test_iter_html_matches_to_html():
+    inner = ParentNode(tag="p", children=[LeafNode(tag="b", value="bold"), LeafNode("text")])
+    parent = ParentNode(tag="div", props={"class": "outer"}, children=[inner])
+
+    chunks = list(parent.iter_html())
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == parent.to_html()
+
+
+def test_write_to_text_stream():
+    parent = ParentNode(tag="div", children=[LeafNode(tag="i", value="é")])
+    stream = io.StringIO()
+
+    parent.write_to(stream)
+
+    assert stream.getvalue() == "<div><i>é</i></div>"
+
+
+def test_write_to_binary_stream(tmp_path):
+    parent = ParentNode(tag="div", children=[LeafNode(tag="i", value="é")])
+    stream = io.BytesIO()
+
+    parent.write_to(stream)
+    with open(tmp_path / "out.html", "wb") as f:
+        parent.write_to(f)
+
+    assert stream.getvalue() == "<div><i>é</i></div>".encode()
+    assert (tmp_path / "out.html").read_bytes() == stream.getvalue()
@@ -0,0 +1,212 @@
+import os
+import pathlib
+import struct
+
+import pytest
+
+from static_server import images
+from static_server.cache import BlockCache
+from static_server.images import ImageIndex, ImageInfo, build_image_index, image_size
+from static_server.site import Site
+from static_server.textblock import BlockList
+from static_server.textnode import TextNode, TextNodeType
+
+ROOT = pathlib.Path(__file__).parent.parent
+
+
+def png_bytes(width: int, height: int) -> bytes:
+    return b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR" + struct.pack(">II", width, height) + b"\0" * 8
+
+
+def jpeg_bytes(width: int, height: int) -> bytes:
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\0" + b"\0" * 9
+    sof0 = b"\xff\xc0" + struct.pack(">HBHH", 17, 8, height, width) + b"\0" * 10
+    return b"\xff\xd8" + app0 + sof0 + b"\xff\xd9"
+
+
+@pytest.fixture(autouse=True)
+def reset_image_index():
+    yield
+    TextNode.image_index = None
+    TextNode.page_base = ""
+
+
+def test_png_size_of_real_image():
+    assert image_size(ROOT / "static" / "images" / "rivendell.png") == (1344, 896)
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (png_bytes(640, 480), (640, 480)),
+        (b"GIF89a" + struct.pack("<HH", 32, 16) + b"\0" * 20, (32, 16)),
+        (jpeg_bytes(800, 600), (800, 600)),
+        (b"not an image at all", None),
+    ],
+)
+def test_image_size_from_headers(tmp_path, data, expected):
+    (tmp_path / "image").write_bytes(data)
+
+    assert image_size(tmp_path / "image") == expected
+
+
+def test_attributes():
+    index = ImageIndex(
+        "public",
+        {"images/a.png": ImageInfo("hash", 800, 600, [(400, "images/a.400w.png")])},
+    )
+
+    attributes = index.attributes("/images/a.png")
+
+    assert attributes["width"] == "800"
+    assert attributes["height"] == "600"
+    assert attributes["loading"] == "lazy"
+    assert attributes["decoding"] == "async"
+    assert attributes["srcset"] == "/images/a.400w.png 400w, /images/a.png 800w"
+    assert index.attributes("https://example.com/images/a.png") == {}
+    assert index.attributes("/images/missing.png") == {}
+
+
+def test_relative_sources_resolve_against_the_page_directory():
+    index = ImageIndex(
+        "public",
+        {
+            "img/a.png": ImageInfo("hash", 10, 10),
+            "docs/img/a.png": ImageInfo("hash", 20, 20),
+        },
+    )
+
+    assert index.attributes("img/a.png")["width"] == "10"
+    assert index.attributes("img/a.png", "docs")["width"] == "20"
+    assert index.attributes("../img/a.png", "docs")["width"] == "10"
+    assert index.attributes("/img/a.png", "docs")["width"] == "10"
+    assert index.base_for(pathlib.Path("public/docs/page.html")) == "docs"
+    assert index.base_for(pathlib.Path("public/index.html")) == ""
+
+
+def test_image_text_node_gets_dimensions():
+    TextNode.image_index = ImageIndex(
+        "public", {"images/a.png": ImageInfo("hash", 800, 600)}
+    )
+
+    html = TextNode("alt text", TextNodeType.IMG, "/images/a.png").to_html_node()
+
+    assert html.props == {
+        "src": "/images/a.png",
+        "alt": "alt text",
+        "width": "800",
+        "height": "600",
+        "loading": "lazy",
+        "decoding": "async",
+    }
+
+
+def test_unchanged_images_are_not_reprocessed(tmp_path, monkeypatch):
+    (tmp_path / "static").mkdir()
+    (tmp_path / "public").mkdir()
+    (tmp_path / "static" / "a.png").write_bytes(png_bytes(10, 20))
+    build_image_index(tmp_path / "static", tmp_path / "public")
+    calls = []
+    monkeypatch.setattr(images, "image_size", lambda path: calls.append(path))
+    monkeypatch.setattr(images, "file_hash", lambda path: calls.append(path))
+
+    index = build_image_index(tmp_path / "static", tmp_path / "public")
+
+    assert calls == []
+    assert (index.images["a.png"].width, index.images["a.png"].height) == (10, 20)
+
+
+def test_changed_image_is_reprocessed(tmp_path):
+    (tmp_path / "static").mkdir()
+    (tmp_path / "public").mkdir()
+    (tmp_path / "static" / "a.png").write_bytes(png_bytes(10, 20))
+    build_image_index(tmp_path / "static", tmp_path / "public")
+    source = tmp_path / "static" / "a.png"
+    source.write_bytes(png_bytes(30, 40))
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    index = build_image_index(tmp_path / "static", tmp_path / "public")
+
+    assert index.images["a.png"].width == 30
+
+
+def test_touched_image_is_rehashed_but_keeps_the_index_digest(tmp_path):
+    (tmp_path / "static").mkdir()
+    (tmp_path / "public").mkdir()
+    source = tmp_path / "static" / "a.png"
+    source.write_bytes(png_bytes(10, 20))
+    first = build_image_index(tmp_path / "static", tmp_path / "public")
+    os.utime(source, ns=(0, 1_000_000_000))
+
+    second = build_image_index(tmp_path / "static", tmp_path / "public")
+
+    assert second.images["a.png"].mtime_ns == 1_000_000_000
+    assert second.digest() == first.digest()
+    assert ImageIndex.load(tmp_path / "public").images["a.png"].mtime_ns == (
+        1_000_000_000
+    )
+
+
+def test_downscaled_variants(tmp_path):
+    image = pytest.importorskip("PIL.Image")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "public").mkdir()
+    image.new("RGB", (1000, 500)).save(tmp_path / "static" / "a.png")
+
+    index = build_image_index(tmp_path / "static", tmp_path / "public", (250, 2000))
+
+    [(width, name)] = index.images["a.png"].variants
+    assert width == 250
+    assert image_size(tmp_path / "public" / name) == (250, 125)
+
+
+def test_site_build_injects_dimensions(tmp_path):
+    (tmp_path / "content").mkdir()
+    (tmp_path / "content" / "index.md").write_text("# Home\n\n![logo](/logo.png)")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "static" / "logo.png").write_bytes(png_bytes(64, 32))
+    (tmp_path / "template.html").write_text("{{ Content }}")
+    site = Site(
+        content=tmp_path / "content",
+        static=tmp_path / "static",
+        template=tmp_path / "template.html",
+        output=tmp_path / "public",
+        images=True,
+    )
+    site.build()
+    assert 'width="64" height="32"' in (site.output / "index.html").read_text()
+
+    (site.static / "logo.png").write_bytes(png_bytes(128, 64))
+    site.update({site.static / "logo.png"})
+
+    assert 'width="128" height="64"' in (site.output / "index.html").read_text()
+
+
+@pytest.mark.parametrize("block_cache", [False, True])
+def test_nested_pages_get_dimensions_of_their_relative_images(tmp_path, block_cache):
+    (tmp_path / "content" / "docs").mkdir(parents=True)
+    (tmp_path / "content" / "index.md").write_text("# Home\n\n![a](img/a.png)")
+    (tmp_path / "content" / "docs" / "page.md").write_text("# Docs\n\n![a](img/a.png)")
+    (tmp_path / "static" / "img").mkdir(parents=True)
+    (tmp_path / "static" / "docs" / "img").mkdir(parents=True)
+    (tmp_path / "static" / "img" / "a.png").write_bytes(png_bytes(10, 10))
+    (tmp_path / "static" / "docs" / "img" / "a.png").write_bytes(png_bytes(20, 20))
+    (tmp_path / "template.html").write_text("{{ Content }}")
+    site = Site(
+        content=tmp_path / "content",
+        static=tmp_path / "static",
+        template=tmp_path / "template.html",
+        output=tmp_path / "public",
+        images=True,
+    )
+    if block_cache:
+        BlockList.block_cache = BlockCache(1024 * 1024)
+    try:
+        site.build()
+    finally:
+        BlockList.block_cache = None
+
+    assert 'width="10" height="10"' in (site.output / "index.html").read_text()
+    page = (site.output / "docs" / "page.html").read_text()
+    assert 'width="20" height="20"' in page
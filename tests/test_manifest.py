@@ -0,0 +1,98 @@
+import json
+import pathlib
+
+import pytest
+
+from static_server.build import generate_folder
+from static_server.manifest import BuildManifest
+
+
+@pytest.fixture
+def site(tmp_path: pathlib.Path) -> pathlib.Path:
+    (tmp_path / "content" / "nested").mkdir(parents=True)
+    (tmp_path / "content" / "index.md").write_text("# Home\n\nhello")
+    (tmp_path / "content" / "nested" / "page.md").write_text("# Nested\n\nworld")
+    (tmp_path / "template.html").write_text("<h1>{{ Title }}</h1>{{ Content }}")
+    (tmp_path / "public").mkdir()
+    return tmp_path
+
+
+def build(site: pathlib.Path) -> BuildManifest:
+    manifest = BuildManifest.load(site / "public", site / "template.html")
+    generate_folder(site / "content", site / "template.html", site / "public", manifest)
+    manifest.prune()
+    manifest.save()
+    return manifest
+
+
+def test_first_build_records_every_page(site):
+    manifest = build(site)
+
+    assert sorted(manifest.entries) == ["index.html", "nested/page.html"]
+    assert (site / "public" / BuildManifest.FILENAME).exists()
+
+
+def test_unchanged_pages_are_skipped(site, capsys):
+    build(site)
+    capsys.readouterr()
+
+    build(site)
+
+    assert "generating file" not in capsys.readouterr().out
+
+
+def test_changed_source_is_rebuilt(site, capsys):
+    build(site)
+    capsys.readouterr()
+    (site / "content" / "index.md").write_text("# Home\n\nchanged")
+
+    build(site)
+
+    output = capsys.readouterr().out
+    assert "index.md" in output.split("generating file")[1]
+    assert output.count("generating file") == 1
+    assert "changed" in (site / "public" / "index.html").read_text()
+
+
+def test_changed_template_rebuilds_everything(site, capsys):
+    build(site)
+    capsys.readouterr()
+    (site / "template.html").write_text("<h2>{{ Title }}</h2>{{ Content }}")
+
+    build(site)
+
+    assert capsys.readouterr().out.count("generating file") == 2
+
+
+def test_deleted_source_removes_output(site):
+    build(site)
+    (site / "content" / "nested" / "page.md").unlink()
+
+    manifest = build(site)
+
+    assert not (site / "public" / "nested" / "page.html").exists()
+    assert sorted(manifest.entries) == ["index.html"]
+
+
+def test_unreadable_manifest_triggers_full_build(site, capsys):
+    (site / "public" / BuildManifest.FILENAME).write_text("not json")
+
+    build(site)
+
+    assert capsys.readouterr().out.count("generating file") == 2
+
+
+def test_interrupted_save_keeps_the_previous_manifest(site, monkeypatch):
+    manifest = build(site)
+    saved = manifest.path.read_text()
+
+    def interrupted(value, f, **kwargs):
+        f.write("{")
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(json, "dump", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        manifest.save()
+
+    assert manifest.path.read_text() == saved
+    assert [path.name for path in manifest.root.iterdir() if ".tmp" in path.name] == []
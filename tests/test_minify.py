@@ -0,0 +1,158 @@
+import pathlib
+import shutil
+import subprocess
+
+import pytest
+
+from static_server.cache import RenderCache
+from static_server.minify import Minifier, minify_css, minify_html, minify_js
+from static_server.site import Site
+
+
+def test_html_whitespace_is_collapsed():
+    html = "<html>\n  <head>\n    <title> Home </title>\n  </head>\n  <body>\n"
+    html += "    <p>hello   <b>bold</b>\n world</p>\n  </body>\n</html>\n"
+
+    assert minify_html(html) == (
+        "<html><head><title>Home</title></head>"
+        "<body><p>hello <b>bold</b> world</p></body></html>"
+    )
+
+
+def test_html_pre_and_code_are_preserved():
+    html = "<div>\n  <pre><code>def f():\n    return  1\n</code></pre>\n"
+    html += "  <p>use <code>a  =  b</code>  here</p>\n</div>"
+
+    minified = minify_html(html)
+
+    assert "<pre><code>def f():\n    return  1\n</code></pre>" in minified
+    assert "<p>use <code>a  =  b</code> here</p>" in minified
+
+
+def test_html_comments_are_removed_but_conditionals_kept():
+    html = "<p>a</p><!-- note --><!--[if IE]><p>ie</p><![endif]-->"
+
+    assert minify_html(html) == "<p>a</p><!--[if IE]><p>ie</p><![endif]-->"
+
+
+def test_html_inline_style_and_script_are_minified():
+    html = "<style>\n  p { color: red; }\n</style>\n<script>\n  // hi\n  run();\n</script>"
+
+    assert minify_html(html) == "<style>p{color:red}</style><script>run();</script>"
+
+
+def test_css():
+    css = "/* layout */\nbody ,\nmain > p {\n  margin : 0 auto;\n  content: ' ;} ';\n}\n"
+    css += "/*! license */\na:hover { color: red; }\n"
+
+    assert minify_css(css) == (
+        "body,main>p{margin :0 auto;content:' ;} '}/*! license */ a:hover{color:red}"
+    )
+
+
+def test_js_comments_and_indentation_are_removed():
+    js = "/* header */\nfunction f(a, b) {\n    // add\n    return a + b; // sum\n}\n\n"
+
+    assert minify_js(js) == "function f(a, b) {\nreturn a + b;\n}"
+
+
+def test_js_strings_and_regexes_are_preserved():
+    js = "var url = 'http://x//y';\nvar re = /\\/\\/[a-z/]+/g;\n"
+    js += "var t = `a\n  // kept\n${b}`;\nvar half = total / 2; // half\n"
+
+    assert minify_js(js) == (
+        "var url = 'http://x//y';\nvar re = /\\/\\/[a-z/]+/g;\n"
+        "var t = `a\n  // kept\n${b}`;\nvar half = total / 2;"
+    )
+
+
+def test_js_preserves_license_comments():
+    assert minify_js("/*! MIT */\nrun();") == "/*! MIT */\nrun();"
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_minified_prism_is_valid_javascript(tmp_path):
+    prism = pathlib.Path(__file__).parents[1] / "static" / "prism.js"
+    minified = tmp_path / "prism.js"
+    minified.write_text(minify_js(prism.read_text()))
+
+    subprocess.run(["node", "--check", str(minified)], check=True)
+
+
+def test_minifier_uses_render_cache(tmp_path):
+    cache = RenderCache(tmp_path / "cache", 1024 * 1024, "1")
+    Minifier(cache).minify(".css", "p { color: red; }")
+
+    key = cache.key(b"minify.css\0p { color: red; }")
+    assert cache.get_text(key) == "p{color:red}"
+
+
+def test_minify_file_replaces_hardlinks(tmp_path):
+    source = tmp_path / "source.css"
+    source.write_text("p { color: red; }")
+    target = tmp_path / "target.css"
+    target.hardlink_to(source)
+    minifier = Minifier()
+
+    minifier.minify_file(target)
+
+    assert target.read_text() == "p{color:red}"
+    assert source.read_text() == "p { color: red; }"
+    assert minifier.stats.files == 1
+    assert minifier.stats.saved_bytes == 5
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_site_minifies_pages_and_assets(tmp_path, jobs):
+    (tmp_path / "content").mkdir()
+    (tmp_path / "content" / "index.md").write_text("# Home\n\n```\na  =  1\n```")
+    (tmp_path / "content" / "about.md").write_text("# About\n\ntext")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "static" / "style.css").write_text("body {\n  margin: 0;\n}\n")
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "template.html").write_text(
+        "<html>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n"
+    )
+    site = Site(
+        content=tmp_path / "content",
+        static=tmp_path / "static",
+        template=tmp_path / "templates" / "template.html",
+        output=tmp_path / "public",
+        jobs=jobs,
+        minify=True,
+    )
+
+    site.build()
+
+    assert (site.output / "index.html").read_text() == (
+        "<html><body><div><h1>Home</h1>"
+        '<pre><code class="language-plain">a  =  1</code></pre></div></body></html>'
+    )
+    assert (site.output / "style.css").read_text() == "body{margin:0}"
+    assert (site.static / "style.css").read_text() == "body {\n  margin: 0;\n}\n"
+
+
+def test_plain_build_restores_assets_minified_by_an_earlier_build(tmp_path):
+    (tmp_path / "content").mkdir()
+    (tmp_path / "content" / "index.md").write_text("# Home")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "static" / "style.css").write_text("body {\n  margin: 0;\n}\n")
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "template.html").write_text("{{ Content }}")
+    site = Site(
+        content=tmp_path / "content",
+        static=tmp_path / "static",
+        template=tmp_path / "templates" / "template.html",
+        output=tmp_path / "public",
+        minify=True,
+    )
+    site.build()
+    assert (site.output / "style.css").read_text() == "body{margin:0}"
+
+    site.minify = False
+    site.build()
+    assert (site.output / "style.css").read_text() == "body {\n  margin: 0;\n}\n"
+
+    site.minify = True
+    site.build()
+    assert (site.output / "style.css").read_text() == "body{margin:0}"
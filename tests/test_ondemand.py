@@ -0,0 +1,209 @@
+import asyncio
+import http.client
+import os
+import pathlib
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from static_server import __main__
+from static_server.ondemand import RenderServer
+
+
+@pytest.fixture
+def site(tmp_path: pathlib.Path) -> pathlib.Path:
+    (tmp_path / "content" / "docs").mkdir(parents=True)
+    (tmp_path / "content" / "index.md").write_text("# Home\n\nhello")
+    (tmp_path / "content" / "about.md").write_text("# About\n\nus")
+    (tmp_path / "content" / "docs" / "index.md").write_text("# Docs\n\nread")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "static" / "style.css").write_text("body {}")
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "template.html").write_text(
+        "<title>{{ Title }}</title>{{ Content }}"
+    )
+    return tmp_path
+
+
+@pytest.fixture
+def server(site):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    renderer = RenderServer(
+        site / "static",
+        content=site / "content",
+        template=site / "templates" / "template.html",
+        jobs=1,
+    )
+    server = asyncio.run_coroutine_threadsafe(
+        renderer.start("127.0.0.1", 0), loop
+    ).result()
+    renderer.port = server.sockets[0].getsockname()[1]
+    yield renderer
+    server.close()
+    asyncio.run_coroutine_threadsafe(shutdown(server), loop).result()
+    renderer.close()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+async def shutdown(server):
+    await server.wait_closed()
+    tasks = asyncio.all_tasks() - {asyncio.current_task()}
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def get(server, path, **headers):
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+    try:
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        return response, response.read()
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/", "<title>Home</title><div><h1>Home</h1><p>hello</p></div>"),
+        ("/index.html", "<title>Home</title><div><h1>Home</h1><p>hello</p></div>"),
+        ("/about.html", "<title>About</title><div><h1>About</h1><p>us</p></div>"),
+        ("/docs/", "<title>Docs</title><div><h1>Docs</h1><p>read</p></div>"),
+    ],
+)
+def test_pages_are_rendered_on_request(server, path, body):
+    response, data = get(server, path)
+
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "text/html; charset=utf-8"
+    assert data.decode() == body
+
+
+def test_static_files_and_missing_pages_fall_through(server):
+    response, data = get(server, "/style.css")
+    assert response.status == 200
+    assert data == b"body {}"
+
+    response, _ = get(server, "/missing.html")
+    assert response.status == 404
+
+    response, _ = get(server, "/docs")
+    assert response.status == 301
+    assert response.getheader("Location") == "/docs/"
+
+
+def test_rendered_pages_are_cached_until_the_source_changes(server, site):
+    first, _ = get(server, "/about.html")
+    get(server, "/about.html")
+    assert server._pages.stats.misses == 1
+    assert server._pages.stats.hits == 1
+
+    etag = first.getheader("ETag")
+    response, _ = get(server, "/about.html", **{"If-None-Match": etag})
+    assert response.status == 304
+
+    source = site / "content" / "about.md"
+    source.write_text("# About\n\nthem")
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    response, data = get(server, "/about.html", **{"If-None-Match": etag})
+    assert response.status == 200
+    assert data.decode() == "<title>About</title><div><h1>About</h1><p>them</p></div>"
+
+
+def test_cached_pages_are_served_as_encoded_bytes(server):
+    get(server, "/about.html")
+
+    (entry,) = server._pages._entries.values()
+    representation, body = entry
+    assert body == "<title>About</title><div><h1>About</h1><p>us</p></div>".encode()
+    assert representation.size == len(body)
+    assert server._pages.size == len(body) + 64
+
+
+def test_template_changes_invalidate_every_page(server, site):
+    get(server, "/")
+    template = site / "templates" / "template.html"
+    template.write_text("<main>{{ Content }}</main>")
+    stat = template.stat()
+    os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    _, data = get(server, "/")
+
+    assert data.decode() == "<main><div><h1>Home</h1><p>hello</p></div></main>"
+
+
+def test_concurrent_requests_share_one_render(server):
+    renders = []
+    render = server.render
+
+    async def counting_render(key, source, mtime):
+        renders.append(source)
+        return await render(key, source, mtime)
+
+    server.render = counting_render
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(get(server, "/")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [response.status for response, _ in results] == [200] * 8
+    assert len(renders) == 1
+    assert server._rendering == {}
+
+
+def test_render_failures_are_reported_as_server_errors(server, site):
+    (site / "templates" / "template.html").unlink()
+
+    response, _ = get(server, "/")
+
+    assert response.status == 500
+
+
+def test_a_dead_worker_is_replaced(server):
+    broken = server._executor
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result()
+
+    response, _ = get(server, "/")
+    assert response.status == 500
+    assert server._executor is not broken
+
+    response, data = get(server, "/")
+    assert response.status == 200
+    assert data.decode() == "<title>Home</title><div><h1>Home</h1><p>hello</p></div>"
+
+
+def test_ondemand_command_takes_the_site_directories(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(
+        __main__, "serve_rendered", lambda *args, **kwargs: calls.append(args)
+    )
+
+    __main__.main(
+        [
+            "ondemand",
+            "--content",
+            str(tmp_path / "pages"),
+            "--static",
+            str(tmp_path / "assets"),
+            "--template",
+            str(tmp_path / "page.html"),
+        ]
+    )
+
+    assert calls == [
+        (tmp_path / "pages", tmp_path / "assets", tmp_path / "page.html")
+    ]
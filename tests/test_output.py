@@ -0,0 +1,69 @@
+import os
+import stat
+
+import pytest
+
+from static_server.output import FILE_MODE, WriteStats, atomic_write
+
+
+def test_new_file_is_written(tmp_path):
+    stats = WriteStats()
+
+    with atomic_write(tmp_path / "page.html", stats=stats) as f:
+        f.write("<p>hello</p>")
+
+    assert (tmp_path / "page.html").read_text() == "<p>hello</p>"
+    assert stat.S_IMODE((tmp_path / "page.html").stat().st_mode) == FILE_MODE
+    assert (stats.written, stats.unchanged) == (1, 0)
+
+
+def test_identical_contents_are_not_rewritten(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text("<p>hello</p>")
+    os.utime(path, ns=(0, 0))
+    before = path.stat()
+    stats = WriteStats()
+
+    with atomic_write(path, stats=stats) as f:
+        f.write("<p>hello</p>")
+
+    after = path.stat()
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, 0)
+    assert (stats.written, stats.unchanged) == (0, 1)
+    assert os.listdir(tmp_path) == ["page.html"]
+
+
+def test_changed_contents_replace_the_file(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text("<p>hello</p>")
+    linked = tmp_path / "linked.html"
+    os.link(path, linked)
+
+    with atomic_write(path) as f:
+        f.write("<p>world</p>")
+
+    assert path.read_text() == "<p>world</p>"
+    assert linked.read_text() == "<p>hello</p>"
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text("<p>hello</p>")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as f:
+            f.write("<p>half")
+            raise RuntimeError("render failed")
+
+    assert path.read_text() == "<p>hello</p>"
+    assert os.listdir(tmp_path) == ["page.html"]
+
+
+def test_mtime_is_applied_even_when_unchanged(tmp_path):
+    path = tmp_path / "page.html.gz"
+    path.write_bytes(b"data")
+
+    with atomic_write(path, "wb", mtime_ns=10**9) as f:
+        f.write(b"data")
+
+    assert path.stat().st_mtime_ns == 10**9
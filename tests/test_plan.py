@@ -0,0 +1,76 @@
+import pathlib
+
+import pytest
+
+from static_server.assets import CopyJob
+from static_server.build import PageJob
+from static_server.plan import plan_build
+from static_server.site import Site
+
+
+@pytest.fixture
+def site(tmp_path: pathlib.Path) -> Site:
+    (tmp_path / "content" / "blog").mkdir(parents=True)
+    (tmp_path / "content" / "index.md").write_text("# Home\n\nhello")
+    (tmp_path / "content" / "blog" / "post.md").write_text("# Post\n\nworld")
+    (tmp_path / "content" / "notes.txt").write_text("not a page")
+    (tmp_path / "static" / "css").mkdir(parents=True)
+    (tmp_path / "static" / "empty").mkdir()
+    (tmp_path / "static" / "css" / "site.css").write_text("body {}")
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "template.html").write_text("{{ Content }}")
+    return Site(
+        content=tmp_path / "content",
+        static=tmp_path / "static",
+        template=tmp_path / "templates" / "template.html",
+        output=tmp_path / "public",
+    )
+
+
+def test_plan_lists_every_job(site):
+    plan = plan_build(site.content, site.static, site.output)
+
+    assert plan.directories == [
+        site.output,
+        site.output / "blog",
+        site.output / "css",
+        site.output / "empty",
+    ]
+    assert plan.pages == [
+        PageJob(site.content / "blog" / "post.md", site.output / "blog" / "post.html"),
+        PageJob(site.content / "index.md", site.output / "index.html"),
+    ]
+    assert plan.assets == [
+        CopyJob(site.static / "css" / "site.css", site.output / "css" / "site.css")
+    ]
+    assert str(plan) == "4 directories, 2 pages, 1 static files"
+
+
+def test_dry_run_writes_nothing(site, capsys):
+    site.dry_run()
+
+    assert not site.output.exists()
+    lines = capsys.readouterr().out.splitlines()
+    assert f"create {site.output / 'empty'}" in lines
+    assert f"render {site.content / 'index.md'} -> {site.output / 'index.html'}" in lines
+
+
+def test_dry_run_after_build_keeps_everything(site, capsys):
+    site.build()
+    capsys.readouterr()
+    (site.content / "index.md").write_text("# Home\n\nchanged")
+
+    site.dry_run()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert not any(line.startswith("create") for line in lines)
+    assert any(line.startswith("keep") and "site.css" in line for line in lines)
+    assert any(line.startswith("keep") and "post.md" in line for line in lines)
+    assert any(line.startswith("render") and "index.md" in line for line in lines)
+
+
+def test_build_creates_empty_static_directories(site):
+    site.build()
+
+    assert (site.output / "empty").is_dir()
+    assert (site.output / "blog" / "post.html").exists()
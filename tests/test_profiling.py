@@ -0,0 +1,161 @@
+import json
+import pathlib
+import time
+
+import pytest
+
+from static_server.build import generate_folder
+from static_server.cache import BlockCache, RenderCache
+from static_server.htmlnode import ParentNode
+from static_server.profiling import BuildProfile, PageProfile
+from static_server.site import Site
+from static_server.textblock import BlockList
+
+
+@pytest.fixture
+def site(tmp_path: pathlib.Path) -> pathlib.Path:
+    (tmp_path / "content").mkdir()
+    for index in range(4):
+        (tmp_path / "content" / f"page_{index}.md").write_text(
+            f"# Page {index}\n\n" + "Some **bold** text\n\n" * (index + 1) * 50
+        )
+    (tmp_path / "template.html").write_text("<title>{{ Title }}</title>{{ Content }}")
+    return tmp_path
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_profile_records_every_stage_of_every_page(site, jobs):
+    profile = BuildProfile()
+
+    generate_folder(
+        site / "content",
+        site / "template.html",
+        site / "public",
+        jobs=jobs,
+        profile=profile,
+    )
+
+    assert len(profile.pages) == 4
+    assert set(profile.pages[0].stages) == {
+        "read",
+        "block split",
+        "inline parse",
+        "html serialize",
+        "template fill",
+        "write",
+    }
+
+
+def test_profiled_output_matches_plain_output(site):
+    generate_folder(site / "content", site / "template.html", site / "plain")
+    generate_folder(
+        site / "content", site / "template.html", site / "profiled", profile=BuildProfile()
+    )
+
+    for page in (site / "plain").iterdir():
+        assert page.read_text() == (site / "profiled" / page.name).read_text()
+
+
+def test_render_cache_hit_skips_render_stages(site, tmp_path):
+    cache = RenderCache(tmp_path / "cache", 1024 * 1024, "test")
+    generate_folder(
+        site / "content", site / "template.html", site / "public", render_cache=cache
+    )
+    profile = BuildProfile()
+
+    generate_folder(
+        site / "content",
+        site / "template.html",
+        site / "public",
+        render_cache=cache,
+        profile=profile,
+    )
+
+    assert "cache" in profile.pages[0].stages
+    assert "inline parse" not in profile.pages[0].stages
+
+
+def test_block_cache_misses_count_serialization_as_serialize(site, monkeypatch):
+    monkeypatch.setattr(BlockList, "block_cache", BlockCache(1024 * 1024))
+    to_html = ParentNode.to_html
+
+    def slow_to_html(node):
+        time.sleep(0.01)
+        return to_html(node)
+
+    monkeypatch.setattr(ParentNode, "to_html", slow_to_html)
+    profile = BuildProfile()
+
+    generate_folder(
+        site / "content", site / "template.html", site / "public", profile=profile
+    )
+
+    # every page's heading misses the block cache; its serialisation and the
+    # join of the outer div both belong to "html serialize"
+    stages = profile.pages[0].stages
+    assert stages["html serialize"] >= 0.02
+    assert stages["inline parse"] < stages["html serialize"]
+
+
+def test_slowest_pages_and_report():
+    profile = BuildProfile(
+        [
+            PageProfile("fast.md", {"read": 0.001, "write": 0.001}),
+            PageProfile("slow.md", {"read": 0.001, "write": 0.5}),
+        ],
+        {"total": 1.0},
+    )
+
+    assert [page.source for page in profile.slowest(1)] == ["slow.md"]
+    assert profile.page_totals() == {"read": 0.002, "write": 0.501}
+    summary = profile.summary(1)
+    assert "slow.md" in summary
+    assert "fast.md" not in summary
+    assert profile.to_json()["pages"][0]["source"] == "slow.md"
+
+
+def test_site_build_writes_profile(site, tmp_path):
+    profile = BuildProfile()
+    Site(
+        content=site / "content",
+        static=site / "static",
+        template=site / "template.html",
+        output=site / "public",
+        profile=profile,
+    ).build()
+
+    profile.save(tmp_path / "profile.json")
+
+    report = json.loads((tmp_path / "profile.json").read_text())
+    assert {"asset copy", "render", "total"} <= set(report["build"])
+    assert len(report["pages"]) == 4
+
+
+def test_profile_page_dumps_cprofile_stats(site, tmp_path):
+    builder = Site(
+        content=site / "content",
+        static=site / "static",
+        template=site / "template.html",
+        output=site / "public",
+    )
+
+    builder.profile_page(site / "content" / "page_1.md", tmp_path / "page.prof")
+
+    assert (tmp_path / "page.prof").stat().st_size > 0
+    assert (site / "public" / "page_1.html").exists()
+
+
+def test_profile_page_accepts_relative_and_dotted_paths(site, tmp_path, monkeypatch):
+    monkeypatch.chdir(site)
+    builder = Site(output=site / "public", template=site / "template.html")
+
+    builder.profile_page(pathlib.Path("./content/page_2.md"), tmp_path / "page.prof")
+
+    assert (site / "public" / "page_2.html").exists()
+
+
+def test_profile_page_rejects_paths_outside_content(site, tmp_path):
+    builder = Site(content=site / "content", output=site / "public")
+
+    with pytest.raises(ValueError, match="is not a page in"):
+        builder.profile_page(tmp_path / "elsewhere.md", tmp_path / "page.prof")
@@ -0,0 +1,205 @@
+import asyncio
+import email.utils
+import gzip
+import http.client
+import os
+import pathlib
+import threading
+
+import pytest
+
+from static_server.serve import StaticServer, accepts_gzip, parse_request
+
+
+@pytest.fixture
+def root(tmp_path: pathlib.Path) -> pathlib.Path:
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "index.html").write_text("<h1>home</h1>")
+    (tmp_path / "docs" / "index.html").write_text("<h1>docs</h1>")
+    (tmp_path / "data.txt").write_bytes(bytes(range(48, 58)) * 10)
+    (tmp_path / "app.js").write_text("run();" * 100)
+    (tmp_path / "app.js.gz").write_bytes(gzip.compress(b"run();" * 100))
+    return tmp_path
+
+
+@pytest.fixture
+def connection(root):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = asyncio.run_coroutine_threadsafe(
+        StaticServer(root).start("127.0.0.1", 0), loop
+    ).result()
+    port = server.sockets[0].getsockname()[1]
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    yield connection
+    connection.close()
+    server.close()
+    asyncio.run_coroutine_threadsafe(shutdown(server), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+async def shutdown(server):
+    await server.wait_closed()
+    tasks = asyncio.all_tasks() - {asyncio.current_task()}
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def get(connection, path, **headers):
+    connection.request("GET", path, headers=headers)
+    response = connection.getresponse()
+    return response, response.read()
+
+
+def test_serves_files_over_one_keep_alive_connection(connection):
+    response, body = get(connection, "/")
+    assert response.status == 200
+    assert body == b"<h1>home</h1>"
+    assert response.getheader("Content-Type") == "text/html; charset=utf-8"
+
+    response, body = get(connection, "/docs/")
+    assert body == b"<h1>docs</h1>"
+    assert response.getheader("Connection") == "keep-alive"
+
+
+def test_directory_without_slash_redirects(connection):
+    response, _ = get(connection, "/docs")
+
+    assert response.status == 301
+    assert response.getheader("Location") == "/docs/"
+
+
+@pytest.mark.parametrize("path", ["/missing.html", "/../etc/passwd", "/%2e%2e/x"])
+def test_missing_or_escaping_path_is_not_found(connection, path):
+    response, _ = get(connection, path)
+
+    assert response.status == 404
+
+
+def test_matching_etag_is_not_modified(connection):
+    response, _ = get(connection, "/data.txt")
+    etag = response.getheader("ETag")
+
+    response, body = get(connection, "/data.txt", **{"If-None-Match": etag})
+
+    assert response.status == 304
+    assert body == b""
+    assert response.getheader("ETag") == etag
+
+
+def test_etag_changes_with_content(connection, root):
+    response, _ = get(connection, "/data.txt")
+    (root / "data.txt").write_text("changed")
+
+    changed, body = get(connection, "/data.txt")
+
+    assert body == b"changed"
+    assert changed.getheader("ETag") != response.getheader("ETag")
+
+
+def test_if_modified_since(connection, root):
+    mtime = os.stat(root / "data.txt").st_mtime
+    since = email.utils.formatdate(mtime + 60, usegmt=True)
+    before = email.utils.formatdate(mtime - 60, usegmt=True)
+
+    assert get(connection, "/data.txt", **{"If-Modified-Since": since})[0].status == 304
+    assert get(connection, "/data.txt", **{"If-Modified-Since": before})[0].status == 200
+
+
+@pytest.mark.parametrize(
+    "header, content_range, expected",
+    [
+        ("bytes=0-4", "bytes 0-4/100", b"01234"),
+        ("bytes=95-", "bytes 95-99/100", b"56789"),
+        ("bytes=-3", "bytes 97-99/100", b"789"),
+        ("bytes=98-200", "bytes 98-99/100", b"89"),
+    ],
+)
+def test_range_requests(connection, header, content_range, expected):
+    response, body = get(connection, "/data.txt", Range=header)
+
+    assert response.status == 206
+    assert response.getheader("Content-Range") == content_range
+    assert body == expected
+
+
+def test_unsatisfiable_range(connection):
+    response, _ = get(connection, "/data.txt", Range="bytes=100-")
+
+    assert response.status == 416
+    assert response.getheader("Content-Range") == "bytes */100"
+
+
+def test_etags_are_computed_off_the_event_loop(connection, monkeypatch):
+    threads = []
+    etag = StaticServer.etag
+
+    def recording_etag(self, path, stat):
+        threads.append(threading.current_thread())
+        return etag(self, path, stat)
+
+    monkeypatch.setattr(StaticServer, "etag", recording_etag)
+    response, _ = get(connection, "/data.txt")
+
+    assert response.status == 200
+    assert threads
+    assert all(thread.name.startswith("asyncio") for thread in threads)
+
+
+def test_serves_gzip_sibling_when_accepted(connection):
+    plain, plain_body = get(connection, "/app.js")
+    response, body = get(connection, "/app.js", **{"Accept-Encoding": "gzip, br"})
+
+    assert plain.getheader("Content-Encoding") is None
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(body) == plain_body
+    assert response.getheader("ETag") != plain.getheader("ETag")
+
+
+def test_head_has_no_body(connection):
+    connection.request("HEAD", "/data.txt")
+    response = connection.getresponse()
+
+    assert response.getheader("Content-Length") == "100"
+    assert response.read() == b""
+
+
+def test_other_methods_are_not_allowed(connection):
+    connection.request("POST", "/data.txt", body=b"x")
+    response = connection.getresponse()
+    response.read()
+
+    assert response.status == 405
+    assert response.getheader("Allow") == "GET, HEAD"
+
+
+def test_parse_request():
+    request = parse_request(
+        b"GET /a HTTP/1.0\r\nHost: x\r\nConnection: Keep-Alive\r\n\r\n"
+    )
+
+    assert request.target == "/a"
+    assert request.headers["host"] == "x"
+    assert request.keep_alive
+    assert parse_request(b"garbage\r\n\r\n") is None
+
+
+def test_accepts_gzip():
+    assert accepts_gzip("gzip, deflate")
+    assert accepts_gzip("*")
+    assert not accepts_gzip("gzip;q=0, br")
+    assert not accepts_gzip("br")
+
+
+def test_fingerprinted_assets_are_immutable(connection, root):
+    (root / "app.1234abcd.js").write_text("run();")
+
+    fingerprinted, _ = get(connection, "/app.1234abcd.js")
+    plain, _ = get(connection, "/app.js")
+
+    assert "immutable" in fingerprinted.getheader("Cache-Control")
+    assert plain.getheader("Cache-Control") is None
@@ -0,0 +1,129 @@
+import os
+import pathlib
+
+import pytest
+
+from static_server.build import PageJob
+from static_server.site import Site
+
+
+@pytest.fixture
+def site(tmp_path: pathlib.Path) -> Site:
+    (tmp_path / "content" / "nested").mkdir(parents=True)
+    (tmp_path / "content" / "index.md").write_text("# Home\n\nhello")
+    (tmp_path / "content" / "nested" / "page.md").write_text("# Nested\n\nworld")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "static" / "style.css").write_text("body {}")
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "template.html").write_text(
+        "<h1>{{ Title }}</h1>{{ Content }}"
+    )
+    site = Site(
+        content=tmp_path / "content",
+        static=tmp_path / "static",
+        template=tmp_path / "templates" / "template.html",
+        output=tmp_path / "public",
+    )
+    site.build()
+    return site
+
+
+def test_update_renders_only_the_changed_page(site):
+    source = site.content / "index.md"
+    source.write_text("# Home\n\nchanged")
+
+    rendered = site.update({source})
+
+    assert rendered == [PageJob(source, site.output / "index.html")]
+    assert "changed" in (site.output / "index.html").read_text()
+
+
+def test_update_renders_new_directory(site):
+    source = site.content / "new" / "page.md"
+    source.parent.mkdir()
+    source.write_text("# New\n\npage")
+
+    site.update({source.parent})
+
+    assert (site.output / "new" / "page.html").exists()
+
+
+def test_update_removes_output_of_deleted_source(site):
+    (site.content / "nested" / "page.md").unlink()
+
+    site.update({site.content / "nested" / "page.md"})
+
+    assert not (site.output / "nested" / "page.html").exists()
+    assert (site.output / "index.html").exists()
+
+
+def test_update_copies_static_file(site):
+    (site.static / "style.css").write_text("body { margin: 0 }")
+    (site.static / "app.js").write_text("run()")
+
+    site.update({site.static / "style.css", site.static / "app.js"})
+
+    assert (site.output / "style.css").read_text() == "body { margin: 0 }"
+    assert (site.output / "app.js").read_text() == "run()"
+
+
+def test_update_removes_deleted_static_file(site):
+    (site.static / "style.css").unlink()
+
+    site.update({site.static / "style.css"})
+
+    assert not (site.output / "style.css").exists()
+
+
+def test_template_change_rebuilds_every_page(site):
+    site.template.write_text("<h2>{{ Title }}</h2>{{ Content }}")
+
+    rendered = site.update({site.template})
+
+    assert len(rendered) == 2
+    assert (site.output / "index.html").read_text().startswith("<h2>Home</h2>")
+
+
+def test_update_compresses_rendered_pages(site):
+    site.compress = True
+    site.compress_min_size = 0
+    source = site.content / "index.md"
+    source.write_text("# Home\n\n" + "compressible text " * 100)
+
+    site.update({source})
+
+    assert (site.output / "index.html.gz").exists()
+    assert not (site.output / "nested" / "page.html.gz").exists()
+
+
+@pytest.mark.parametrize("rebuild", ["build", "update"])
+def test_builds_without_compression_drop_stale_siblings(site, rebuild):
+    site.compress = True
+    site.compress_min_size = 0
+    source = site.content / "index.md"
+    source.write_text("# Home\n\n" + "compressible text " * 100)
+    site.build()
+    (site.static / "archive.gz").write_bytes(b"static")
+    assert (site.output / "index.html.gz").exists()
+
+    site.compress = False
+    source.write_text("# Home\n\nchanged")
+    if rebuild == "build":
+        site.build()
+    else:
+        site.update({source, site.static / "archive.gz"})
+
+    assert not (site.output / "index.html.gz").exists()
+    assert not (site.output / "index.html.zz").exists()
+    assert (site.output / "archive.gz").read_bytes() == b"static"
+
+
+def test_rebuilding_identical_output_leaves_files_untouched(site, capsys):
+    page = site.output / "index.html"
+    os.utime(page, ns=(0, 0))
+    (site.content / "index.md").write_text("# Home\n\nhello\n")
+
+    site.build()
+
+    assert page.stat().st_mtime_ns == 0
+    assert "pages: 0 written, 1 unchanged, 1 skipped" in capsys.readouterr().out
@@ -0,0 +1,66 @@
+import io
+import os
+
+from static_server.htmlnode import LeafNode, ParentNode
+from static_server.template import Placeholder, Template
+
+
+def test_parse_into_segments():
+    template = Template.parse("<title>{{ Title }}</title><body>{{Content}}</body>")
+
+    assert template.segments == (
+        "<title>",
+        Placeholder("Title", "{{ Title }}"),
+        "</title><body>",
+        Placeholder("Content", "{{Content}}"),
+        "</body>",
+    )
+
+
+def test_render_strings_and_nodes():
+    template = Template.parse("<h1>{{ Title }}</h1>{{ Content }}<p>{{ Author }}</p>")
+    content = ParentNode(tag="div", children=[LeafNode(tag="b", value="bold")])
+
+    html = template.render({"Title": "Hi", "Content": content, "Author": "me"})
+
+    assert html == "<h1>Hi</h1><div><b>bold</b></div><p>me</p>"
+
+
+def test_unknown_placeholders_are_left_untouched():
+    template = Template.parse("{{ Title }} {{ Missing }}")
+    assert template.render({"Title": "Hi"}) == "Hi {{ Missing }}"
+
+
+def test_render_to_stream():
+    stream = io.StringIO()
+    Template.parse("[{{ Title }}]").render_to(stream, {"Title": "Hi"})
+    assert stream.getvalue() == "[Hi]"
+
+
+def test_from_file_is_cached_by_mtime(tmp_path):
+    path = tmp_path / "template.html"
+    path.write_text("first {{ Title }}")
+
+    first = Template.from_file(path)
+    assert Template.from_file(path) is first
+
+    path.write_text("second {{ Title }}")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    second = Template.from_file(path)
+    assert second is not first
+    assert second.render({"Title": "x"}) == "second x"
+
+
+def test_without_script_drops_only_matching_script_tags():
+    template = Template.parse(
+        "<head>\n"
+        '    <script src="/prism.js"></script>\n'
+        "    <script src='/js/app.js'></script>\n"
+        "</head>{{ Content }}"
+    )
+
+    html = template.without_script("prism.js").render({"Content": "body"})
+
+    assert html == "<head>\n    <script src='/js/app.js'></script>\n</head>body"
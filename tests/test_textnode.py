@@ -102,3 +102,27 @@ def test_link_wo_url_error():
     text_node = TextNode("hyperlink", TextNodeType.LINK)
     with pytest.raises(ValueError):
         text_node.to_html_node()
+
+
+def test_nodes_are_slotted():
+    text_node = TextNode("abc")
+    html_node = text_node.to_html_node()
+
+    assert not hasattr(text_node, "__dict__")
+    assert not hasattr(html_node, "__dict__")
+
+
+def test_textnode_is_frozen():
+    text_node = TextNode("abc")
+    with pytest.raises(AttributeError):
+        text_node.content = "def"
+
+
+def test_checkbox_props_are_shared_and_immutable():
+    node_1 = TextNode("", TextNodeType.MARKED_CHECKBOX).to_html_node()
+    node_2 = TextNode("", TextNodeType.MARKED_CHECKBOX).to_html_node()
+
+    assert node_1.props is node_2.props
+    assert node_1.props == {"type": "checkbox", "checked": None, "disabled": None}
+    with pytest.raises(TypeError):
+        node_1.props["type"] = "radio"
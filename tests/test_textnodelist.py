@@ -176,3 +176,41 @@ def test_create_from_text():
         TextNode("code", TextNodeType.CODE),
     )
     assert TextNodeList.from_text(example_text) == expected
+
+
+def test_long_paragraph_does_not_recurse():
+    example_text = "some **bold** and *italic* text with a [link](www.url.com) " * 5000
+
+    nodes = TextNode(example_text).parse_all().nodes
+
+    assert len(nodes) == 6 * 5000 + 1
+    assert nodes[-1] == TextNode(" ")
+
+
+def test_code_content_is_not_parsed():
+    expected = TextNodeList(
+        TextNode("run "),
+        TextNode("a **b** [c](d)", TextNodeType.CODE),
+    )
+    assert TextNode("run `a **b** [c](d)`").parse_all() == expected
+
+
+@pytest.mark.parametrize(
+    "example_text",
+    [
+        "2 * 3 = 6",
+        "an *open\ndelimiter* on another line",
+        "a [ ] checkbox and a [bracket] (not a link)",
+        "an unclosed `code span",
+        "a lonely ![image",
+    ],
+)
+def test_unmatched_markup_stays_text(example_text):
+    assert TextNode(example_text).parse_all() == TextNodeList(TextNode(example_text))
+
+
+def test_individual_passes_still_available():
+    node = TextNode("a **b** c")
+    assert node.parse_bold() == TextNodeList(
+        TextNode("a "), TextNode("b", TextNodeType.BOLD), TextNode(" c")
+    )
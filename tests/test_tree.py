@@ -0,0 +1,62 @@
+import os
+import pathlib
+import sys
+
+from static_server.tree import scan_tree
+
+
+def test_lists_sorted_files_and_directories(tmp_path):
+    (tmp_path / "b" / "c").mkdir(parents=True)
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "b" / "c" / "d.txt").write_text("d")
+    (tmp_path / "b" / "a.txt").write_text("a")
+
+    tree = scan_tree(tmp_path)
+
+    assert tree.directories == [tmp_path / "b", tmp_path / "b" / "c"]
+    assert tree.files == [
+        tmp_path / "a.txt",
+        tmp_path / "b" / "a.txt",
+        tmp_path / "b" / "c" / "d.txt",
+    ]
+    assert tree.files == sorted(path for path in tmp_path.rglob("*") if path.is_file())
+
+
+def test_deep_trees_do_not_hit_the_recursion_limit(tmp_path, monkeypatch):
+    # relative paths and chdir keep every path below PATH_MAX
+    depth = sys.getrecursionlimit() + 10
+    monkeypatch.chdir(tmp_path)
+    for _ in range(depth):
+        os.mkdir("d")
+        os.chdir("d")
+    pathlib.Path("leaf.txt").write_text("leaf")
+    os.chdir(tmp_path)
+    relative = pathlib.Path(*["d"] * depth)
+
+    try:
+        tree = scan_tree("d")
+
+        assert len(tree.directories) == depth - 1
+        assert tree.files == [relative / "leaf.txt"]
+    finally:
+        # shutil.rmtree (used by pytest's tmp_path cleanup) is recursive too
+        (relative / "leaf.txt").unlink()
+        for level in range(depth, 0, -1):
+            os.rmdir(pathlib.Path(*["d"] * level))
+
+
+def test_symlinked_directories_are_not_followed(tmp_path):
+    (tmp_path / "real").mkdir()
+    (tmp_path / "real" / "file.txt").write_text("x")
+    (tmp_path / "real" / "loop").symlink_to(tmp_path / "real")
+
+    tree = scan_tree(tmp_path)
+
+    assert tree.files == [tmp_path / "real" / "file.txt"]
+    assert tmp_path / "real" / "loop" in tree.directories
+
+
+def test_missing_root_is_empty(tmp_path):
+    tree = scan_tree(tmp_path / "missing")
+
+    assert tree.files == [] and tree.directories == []
@@ -0,0 +1,45 @@
+import pathlib
+
+import pytest
+
+from static_server.watch import InotifyWatcher, PollingWatcher, debounce
+
+
+@pytest.fixture(params=["polling", "inotify"])
+def watcher(request, tmp_path: pathlib.Path):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "page.md").write_text("# Page")
+    if request.param == "polling":
+        watcher = PollingWatcher([tmp_path / "docs"], interval=0.01)
+    else:
+        try:
+            watcher = InotifyWatcher([tmp_path / "docs"])
+        except (AttributeError, OSError):
+            pytest.skip("inotify is not available")
+    yield watcher
+    watcher.close()
+
+
+def test_nothing_changed(watcher):
+    assert watcher.wait(0.05) == set()
+
+
+def test_modified_file_is_reported(watcher, tmp_path):
+    (tmp_path / "docs" / "page.md").write_text("# Page\n\nmore text")
+
+    assert tmp_path / "docs" / "page.md" in debounce(watcher)
+
+
+def test_deleted_file_is_reported(watcher, tmp_path):
+    (tmp_path / "docs" / "page.md").unlink()
+
+    assert tmp_path / "docs" / "page.md" in debounce(watcher)
+
+
+def test_files_in_new_directory_are_reported(watcher, tmp_path):
+    (tmp_path / "docs" / "new").mkdir()
+    (tmp_path / "docs" / "new" / "other.md").write_text("# Other")
+
+    changed = debounce(watcher)
+
+    assert changed & {tmp_path / "docs" / "new", tmp_path / "docs" / "new" / "other.md"}